@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""
+Replay benchmark for the agent loop.
+
+Drives AnthropicFC end to end with a deterministic LLM client that replays a
+recorded tool-call trajectory against a synthetic knowledge base, so history
+handling, tool dispatch and event persistence can be measured without calling any
+model API. For each run it reports the framework overhead per turn (wall time
+minus the time spent inside the model client), the tokens sent to the model and
+the peak RSS of the process.
+
+Examples:
+    python benchmarks/agent_loop_benchmark.py --kb-files 500 --repeat 5
+    python benchmarks/agent_loop_benchmark.py --mode async --trajectory my_run.json
+    python benchmarks/agent_loop_benchmark.py --max-overhead-ms 50  # exit 1 if slower
+
+A trajectory file is a JSON list of model turns. Each turn is a list of blocks,
+either {"type": "text", "text": ...} or {"type": "tool_call", "name": ...,
+"input": {...}}. String values may use {search_doc}, {data_file} and {query}.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Tuple
+
+from boss_agent.agents.anthropic_fc import AnthropicFC
+from boss_agent.core.event import EventType, RealtimeEvent
+from boss_agent.db.manager import DatabaseManager
+from boss_agent.llm.base import (
+    AssistantContentBlock,
+    LLMClient,
+    LLMMessages,
+    TextResult,
+    ToolCall,
+    ToolParam,
+)
+from boss_agent.llm.context_manager.llm_summarizing import LLMSummarizingContextManager
+from boss_agent.llm.token_counter import TokenCounter
+from boss_agent.prompts.system_prompt import SYSTEM_PROMPT
+from boss_agent.tools import get_system_tools
+from boss_agent.utils import WorkspaceManager
+from boss_agent.utils.constants import TOKEN_BUDGET
+
+SEARCH_QUERY = "revenue forecast"
+
+# knowledge-base search -> read -> data_analysis -> report_generator
+KB_REPORT_TRAJECTORY: list[list[dict[str, Any]]] = [
+    [
+        {
+            "type": "text",
+            "text": "I will search the knowledge base for the forecast first.",
+        },
+        {"type": "tool_call", "name": "content_search", "input": {"query": "{query}"}},
+    ],
+    [
+        {"type": "tool_call", "name": "read_file", "input": {"path": "{search_doc}"}},
+    ],
+    [
+        {
+            "type": "tool_call",
+            "name": "data_analysis",
+            "input": {"sub_tool": "load_data", "file_path": "{data_file}"},
+        },
+    ],
+    [
+        {
+            "type": "tool_call",
+            "name": "data_analysis",
+            "input": {"sub_tool": "describe_data", "dataframe_id": "df_1"},
+        },
+        {
+            "type": "tool_call",
+            "name": "data_analysis",
+            "input": {
+                "sub_tool": "calculate",
+                "dataframe_id": "df_1",
+                "expression": "sum(revenue)",
+            },
+        },
+    ],
+    [
+        {"type": "text", "text": "Cross-checking the figures against the notes."},
+        {"type": "tool_call", "name": "read_file", "input": {"path": "{search_doc}"}},
+        {"type": "tool_call", "name": "list_files", "input": {"path": "notes"}},
+    ],
+    [
+        {
+            "type": "tool_call",
+            "name": "report_generator",
+            "input": {
+                "title": "Quarterly revenue forecast",
+                "summary": "Revenue totals computed from {data_file}, cross-checked against {search_doc}.",
+                "sections": [
+                    {
+                        "title": "Method",
+                        "content": "Loaded the sales data and summed the revenue column.",
+                    },
+                ],
+            },
+        },
+    ],
+    [
+        {"type": "text", "text": "The report is ready."},
+        {"type": "tool_call", "name": "return_control_to_user", "input": {}},
+    ],
+]
+
+TRAJECTORIES = {"kb_report": KB_REPORT_TRAJECTORY}
+
+
+def build_knowledge_base(
+    root: Path, num_files: int, csv_rows: int, seed: int = 0
+) -> dict[str, str]:
+    """Write a synthetic knowledge base and return the trajectory placeholders."""
+    rng = random.Random(seed)
+    words = "market growth customer churn pipeline margin region quarter segment budget".split()
+    notes_dir, data_dir = root / "notes", root / "data"
+    notes_dir.mkdir(parents=True, exist_ok=True)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    search_doc = None
+    for i in range(num_files):
+        paragraph = " ".join(rng.choice(words) for _ in range(300))
+        # Every tenth note mentions the query, so search results grow with the base.
+        if i % 10 == 0:
+            paragraph += (
+                f"\nThe {SEARCH_QUERY} for this quarter is {rng.randint(1, 100)}M."
+            )
+            search_doc = search_doc or f"notes/note_{i:05d}.txt"
+        (notes_dir / f"note_{i:05d}.txt").write_text(paragraph)
+
+    lines = ["region,quarter,revenue"]
+    for i in range(csv_rows):
+        lines.append(
+            f"{rng.choice(['north', 'south', 'east', 'west'])},Q{i % 4 + 1},{rng.randint(100, 10000)}"
+        )
+    (data_dir / "sales.csv").write_text("\n".join(lines) + "\n")
+
+    return {
+        "search_doc": search_doc or "notes/note_00000.txt",
+        "data_file": "data/sales.csv",
+        "query": SEARCH_QUERY,
+    }
+
+
+def _fill(value: Any, placeholders: dict[str, str]) -> Any:
+    if isinstance(value, str):
+        return value.format(**placeholders)
+    if isinstance(value, list):
+        return [_fill(item, placeholders) for item in value]
+    if isinstance(value, dict):
+        return {key: _fill(item, placeholders) for key, item in value.items()}
+    return value
+
+
+def build_turns(
+    trajectory: list[list[dict[str, Any]]], placeholders: dict[str, str]
+) -> list[list[AssistantContentBlock]]:
+    turns = []
+    for turn_index, turn in enumerate(trajectory):
+        blocks: list[AssistantContentBlock] = []
+        for block_index, block in enumerate(turn):
+            if block["type"] == "text":
+                blocks.append(TextResult(text=_fill(block["text"], placeholders)))
+            elif block["type"] == "tool_call":
+                blocks.append(
+                    ToolCall(
+                        tool_call_id=f"replay_{turn_index}_{block_index}",
+                        tool_name=block["name"],
+                        tool_input=_fill(block["input"], placeholders),
+                    )
+                )
+            else:
+                raise ValueError(f"Unknown block type in trajectory: {block['type']}")
+        turns.append(blocks)
+    return turns
+
+
+class ReplayLLMClient(LLMClient):
+    """Returns recorded model turns in order, recording what it was sent and when."""
+
+    def __init__(
+        self,
+        turns: list[list[AssistantContentBlock]],
+        context_manager_for_counting: LLMSummarizingContextManager,
+        latency: float = 0.0,
+    ):
+        self.turns = turns
+        self.latency = latency
+        self._counter = context_manager_for_counting
+        self.call_spans: list[Tuple[float, float]] = []
+        self.tokens_sent: list[int] = []
+
+    def generate(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> Tuple[list[AssistantContentBlock], dict[str, Any]]:
+        start = time.perf_counter()
+        # Counting is part of the stub, so it is excluded from the framework overhead.
+        tokens = self._counter.count_tokens(messages)
+        tokens += self._counter.token_counter.count_tokens(system_prompt or "")
+        tokens += self._counter.token_counter.count_tokens(
+            json.dumps(
+                [
+                    {
+                        "name": t.name,
+                        "description": t.description,
+                        "input_schema": t.input_schema,
+                    }
+                    for t in tools
+                ]
+            )
+        )
+        self.tokens_sent.append(tokens)
+        index = len(self.call_spans)
+        if index >= len(self.turns):
+            raise RuntimeError(f"Replay exhausted after {len(self.turns)} turns")
+        if self.latency:
+            time.sleep(self.latency)
+        self.call_spans.append((start, time.perf_counter()))
+        return list(self.turns[index]), {"input_tokens": tokens, "output_tokens": 0}
+
+
+class FixedSummaryClient(LLMClient):
+    """Answers context-summarization requests with a fixed summary."""
+
+    def generate(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> Tuple[list[AssistantContentBlock], dict[str, Any]]:
+        return [TextResult(text="Summary of the earlier conversation.")], {}
+
+
+@dataclass
+class RunResult:
+    turns: int
+    total_s: float
+    model_s: float
+    turn_overheads_ms: list[float]
+    tokens_sent: list[int]
+    events_persisted: int
+    persist_drain_ms: float
+    answer: str = ""
+    errors: list[str] = field(default_factory=list)
+
+
+def _turn_overheads(
+    run_start: float, run_end: float, call_spans: list[Tuple[float, float]]
+) -> list[float]:
+    """Attribute the time outside model calls to turns: setup counts towards the first
+    turn, and the time after a call until the next one (or the end) to that call's turn."""
+    overheads = []
+    for i, (_, end) in enumerate(call_spans):
+        next_start = call_spans[i + 1][0] if i + 1 < len(call_spans) else run_end
+        overheads.append((next_start - end) * 1000)
+    if overheads:
+        overheads[0] += (call_spans[0][0] - run_start) * 1000
+    return overheads
+
+
+async def run_once(
+    args: argparse.Namespace,
+    turns: list[list[AssistantContentBlock]],
+    kb_root: Path,
+    work_dir: Path,
+) -> RunResult:
+    logger = logging.getLogger(f"agent_loop_benchmark.{uuid.uuid4().hex[:8]}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(logging.FileHandler(work_dir / "agent_logs.txt"))
+
+    session_id = uuid.uuid4()
+    session_workspace = work_dir / "sessions" / str(session_id)
+    session_workspace.mkdir(parents=True)
+    workspace_manager = WorkspaceManager(
+        root=kb_root, session_workspace=session_workspace
+    )
+
+    context_manager = LLMSummarizingContextManager(
+        client=FixedSummaryClient(),
+        token_counter=TokenCounter(),
+        logger=logger,
+        token_budget=args.token_budget,
+    )
+    client = ReplayLLMClient(
+        turns, context_manager, latency=args.model_latency_ms / 1000
+    )
+
+    db_manager = DatabaseManager()
+    db_manager.create_session(session_uuid=session_id, workspace_path=session_workspace)
+
+    queue: asyncio.Queue = asyncio.Queue()
+    tools = get_system_tools(
+        client=client,
+        workspace_manager=workspace_manager,
+        message_queue=queue,
+        tool_args={"memory_tool": "none"},
+    )
+    agent = AnthropicFC(
+        system_prompt=SYSTEM_PROMPT,
+        client=client,
+        tools=tools,
+        workspace_manager=workspace_manager,
+        message_queue=queue,
+        logger_for_agent_logs=logger,
+        context_manager=context_manager,
+        max_turns=len(turns),
+        session_id=session_id,
+        use_gemini=False,
+        session_summary=False,
+    )
+    message_task = agent.start_message_processing()
+    instruction = "Find the revenue forecast in the knowledge base and write a report."
+    queue.put_nowait(
+        RealtimeEvent(type=EventType.USER_MESSAGE, content={"text": instruction})
+    )
+
+    try:
+        run_start = time.perf_counter()
+        if args.mode == "async":
+            output = await agent.arun_agent(instruction, resume=True)
+        else:
+            loop = asyncio.get_running_loop()
+            output = await loop.run_in_executor(
+                None, lambda: agent.run_agent(instruction, resume=True)
+            )
+        run_end = time.perf_counter()
+
+        await queue.join()
+        persist_drain_ms = (time.perf_counter() - run_end) * 1000
+    finally:
+        message_task.cancel()
+        for handler in list(logger.handlers):
+            handler.close()
+            logger.removeHandler(handler)
+
+    events_persisted = len(db_manager.get_session_events(session_id))
+    model_s = sum(end - start for start, end in client.call_spans)
+    errors = []
+    if len(client.call_spans) != len(turns):
+        errors.append(f"replayed {len(client.call_spans)} of {len(turns)} turns")
+    return RunResult(
+        turns=len(client.call_spans),
+        total_s=run_end - run_start,
+        model_s=model_s,
+        turn_overheads_ms=_turn_overheads(run_start, run_end, client.call_spans),
+        tokens_sent=client.tokens_sent,
+        events_persisted=events_persisted,
+        persist_drain_ms=persist_drain_ms,
+        answer=str(output.tool_output)[:80],
+        errors=errors,
+    )
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(results: list[RunResult]) -> dict[str, Any]:
+    overheads = [value for result in results for value in result.turn_overheads_ms]
+    return {
+        "runs": len(results),
+        "turns_per_run": results[0].turns,
+        "overhead_ms_per_turn": {
+            "mean": round(statistics.fmean(overheads), 3),
+            "p50": round(_percentile(overheads, 0.5), 3),
+            "p95": round(_percentile(overheads, 0.95), 3),
+            "max": round(max(overheads), 3),
+        },
+        "run_total_ms_mean": round(
+            statistics.fmean(r.total_s for r in results) * 1000, 3
+        ),
+        "model_ms_mean": round(statistics.fmean(r.model_s for r in results) * 1000, 3),
+        "tokens_sent_per_run": sum(results[0].tokens_sent),
+        "tokens_sent_last_call": results[0].tokens_sent[-1]
+        if results[0].tokens_sent
+        else 0,
+        "events_persisted_per_run": results[0].events_persisted,
+        "persist_drain_ms_mean": round(
+            statistics.fmean(r.persist_drain_ms for r in results), 3
+        ),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "errors": sorted({error for r in results for error in r.errors}),
+    }
+
+
+async def async_main(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory(prefix="agent_loop_benchmark_") as tmp:
+        work_dir = Path(tmp)
+        kb_root = work_dir / "knowledge_base"
+        placeholders = build_knowledge_base(kb_root, args.kb_files, args.csv_rows)
+        if args.trajectory:
+            trajectory = json.loads(Path(args.trajectory).read_text())
+        else:
+            trajectory = TRAJECTORIES[args.scenario]
+        turns = build_turns(trajectory, placeholders)
+
+        # The agent writes its event database to the working directory.
+        previous_cwd = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            results = []
+            for i in range(args.warmup + args.repeat):
+                result = await run_once(args, turns, kb_root, work_dir)
+                if i >= args.warmup:
+                    results.append(result)
+        finally:
+            os.chdir(previous_cwd)
+
+    summary = {
+        "scenario": args.trajectory or args.scenario,
+        "mode": args.mode,
+        "kb_files": args.kb_files,
+        "csv_rows": args.csv_rows,
+        **summarize(results),
+    }
+    print(json.dumps(summary, indent=2))
+
+    if summary["errors"]:
+        return 1
+    if (
+        args.max_overhead_ms is not None
+        and summary["overhead_ms_per_turn"]["mean"] > args.max_overhead_ms
+    ):
+        print(
+            f"Mean per-turn overhead {summary['overhead_ms_per_turn']['mean']}ms exceeds {args.max_overhead_ms}ms",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay benchmark for the agent loop")
+    parser.add_argument(
+        "--scenario",
+        choices=sorted(TRAJECTORIES),
+        default="kb_report",
+        help="Built-in trajectory to replay",
+    )
+    parser.add_argument(
+        "--trajectory",
+        type=str,
+        default=None,
+        help="JSON trajectory file to replay instead of a built-in one",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["sync", "async"],
+        default="sync",
+        help="Drive run_agent on a worker thread (CLI) or arun_agent on the event loop (server)",
+    )
+    parser.add_argument(
+        "--kb-files",
+        type=int,
+        default=200,
+        help="Number of notes in the synthetic knowledge base",
+    )
+    parser.add_argument(
+        "--csv-rows", type=int, default=5000, help="Rows in the synthetic sales CSV"
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=TOKEN_BUDGET,
+        help="Context budget before truncation",
+    )
+    parser.add_argument(
+        "--model-latency-ms",
+        type=float,
+        default=0.0,
+        help="Simulated time per model call",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Measured runs")
+    parser.add_argument(
+        "--warmup", type=int, default=1, help="Unmeasured runs before measuring"
+    )
+    parser.add_argument(
+        "--max-overhead-ms",
+        type=float,
+        default=None,
+        help="Fail if the mean per-turn overhead exceeds this",
+    )
+    args = parser.parse_args()
+    sys.exit(asyncio.run(async_main(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,13 @@ It instantiates an Agent and prompts the user for input, which is then passed to
 
 import os
 import argparse
+import configparser
 import logging
 import asyncio
 from dotenv import load_dotenv
 
+from boss_agent.core import tracing
+
 load_dotenv()
 
 from boss_agent.core.event import RealtimeEvent, EventType
@@ -24,7 +27,7 @@ from boss_agent.tools import get_system_tools
 from boss_agent.prompts.system_prompt import SYSTEM_PROMPT
 from boss_agent.agents.anthropic_fc import AnthropicFC
 from boss_agent.utils import WorkspaceManager
-from boss_agent.llm import get_client
+from boss_agent.llm import client_registry, get_client, rate_limit, response_cache
 from boss_agent.llm.context_manager.llm_summarizing import LLMSummarizingContextManager
 from boss_agent.llm.token_counter import TokenCounter
 from boss_agent.db.manager import DatabaseManager
@@ -41,6 +44,13 @@ async def async_main():
 
     args = parser.parse_args()
 
+    config = configparser.ConfigParser()
+    config.read("config.ini")
+    tracing.configure_from_config(config)
+    client_registry.configure_from_config(config)
+    rate_limit.configure_from_config(config)
+    response_cache.configure_from_config(config)
+
     if os.path.exists(args.logs_path):
         os.remove(args.logs_path)
     logger_for_agent_logs = logging.getLogger("agent_logs")
@@ -95,7 +105,8 @@ async def async_main():
         "model_name": args.model_name,
     }
     if args.llm_client == "anthropic-direct":
-        client_kwargs["use_caching"] = False # Or a configurable value if needed later
+        client_kwargs["use_caching"] = config.getboolean("llm", "prompt_caching", fallback=False)
+        client_kwargs["cache_layout"] = config.get("llm", "cache_layout", fallback="incremental")
         client_kwargs["project_id"] = args.project_id
         client_kwargs["region"] = args.region
     elif args.llm_client == "openai-direct":
@@ -117,10 +128,11 @@ async def async_main():
 
     # Create context manager based on argument
     context_manager = LLMSummarizingContextManager(
-        client=client,
+        client=response_cache.wrap(client),
         token_counter=token_counter,
         logger=logger_for_agent_logs,
-        token_budget=TOKEN_BUDGET
+        token_budget=TOKEN_BUDGET,
+        prune_tool_outputs=config.getboolean("agent", "prune_tool_outputs", fallback=True),
     )
 
     queue = asyncio.Queue()
@@ -43,6 +43,7 @@ type AppAction =
   | { type: "SET_MESSAGES"; payload: Message[] }
   | { type: "ADD_MESSAGE"; payload: Message }
   | { type: "UPDATE_MESSAGE"; payload: Message }
+  | { type: "APPEND_MESSAGE_DELTA"; payload: Message }
   | { type: "SET_LOADING"; payload: boolean }
   | { type: "SET_ACTIVE_TAB"; payload: TAB }
   | { type: "SET_CURRENT_ACTION_DATA"; payload: ActionStep | undefined }
@@ -128,6 +129,21 @@ function appReducer(state: AppState, action: AppAction): AppState {
       return { ...state, messages: action.payload };
     case "ADD_MESSAGE":
       return { ...state, messages: [...state.messages, action.payload] };
+    case "APPEND_MESSAGE_DELTA": {
+      // Token deltas of one streamed response share an id; grow that message in place.
+      const existing = state.messages.find((msg) => msg.id === action.payload.id);
+      if (!existing) {
+        return { ...state, messages: [...state.messages, action.payload] };
+      }
+      return {
+        ...state,
+        messages: state.messages.map((msg) =>
+          msg.id === action.payload.id
+            ? { ...msg, content: (msg.content || "") + (action.payload.content || "") }
+            : msg
+        ),
+      };
+    }
     case "UPDATE_MESSAGE":
       const newMessages = state.messages.map((message) =>
         message.id === action.payload.id ? action.payload : message
@@ -250,6 +266,18 @@ export function AppProvider({ children }: { children: ReactNode }) {
         break;
 
       case AgentEvent.AGENT_THINKING:
+        if (data.content.delta) {
+          dispatch({
+            type: "APPEND_MESSAGE_DELTA",
+            payload: {
+              id: data.content.stream_id as string,
+              role: "assistant",
+              content: data.content.text as string,
+              timestamp: Date.now(),
+            },
+          });
+          break;
+        }
         dispatch({
           type: "ADD_MESSAGE",
           payload: {
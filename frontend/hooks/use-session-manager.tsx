@@ -64,7 +64,9 @@ export function useSessionManager({
 
         // Start processing events with delay
         await processEventsWithDelay();
+        // Resume the agent of this session rather than starting a new one.
         send("init_agent", {
+          session_id: id,
           model_name: "claude-3-opus-20240229",
           tool_args: {
             "sequential_thinking": true,
@@ -1,21 +1,40 @@
 import asyncio
 import logging
 import os
+from concurrent.futures import Future
 from typing import Any, Optional, Dict
 import uuid
 
 from typing import List
 from fastapi import WebSocket
 from boss_agent.agents.base import BaseAgent
+from boss_agent.core import cancellation, tracing
+from boss_agent.core.cancellation import CancellationToken, OperationCancelled
 from boss_agent.core.event import EventType, RealtimeEvent
-from boss_agent.llm.base import LLMClient, TextResult, ToolCallParameters, TextPrompt
+from boss_agent.llm.base import (
+    LLMClient,
+    StreamEvent,
+    TextResult,
+    ToolCallParameters,
+    ToolParam,
+)
 from boss_agent.llm.context_manager.base import ContextManager
+from boss_agent.llm.history_snapshot import HistorySnapshot
 from boss_agent.llm.message_history import MessageHistory
+from boss_agent.llm import response_cache
+from boss_agent.llm.session_summarizer import SessionSummarizer
 from boss_agent.tools.base import ToolImplOutput, LLMTool
 from boss_agent.tools.utils import encode_image
 from boss_agent.db.manager import DatabaseManager
 from boss_agent.tools import AgentToolManager
-from boss_agent.utils.constants import COMPLETE_MESSAGE, DEFAULT_MODEL
+from boss_agent.tools.output_store import TOOL_OUTPUT_DIR, ToolOutputBlobStore
+from boss_agent.utils.constants import (
+    COMPLETE_MESSAGE,
+    DEFAULT_MODEL,
+    TOOL_OUTPUT_OFFLOAD_CHARS,
+    TOOL_OUTPUT_PREVIEW_CHARS,
+    TURN_TIMEOUT_SECONDS,
+)
 from boss_agent.utils.workspace_manager import WorkspaceManager
 from boss_agent.llm.gemini import GeminiDirectClient
 
@@ -27,6 +46,10 @@ TOOL_CALL_INTERRUPT_FAKE_MODEL_RSP = (
 AGENT_INTERRUPT_FAKE_MODEL_RSP = (
     "Agent interrupted by user. You can resume by providing a new instruction."
 )
+TURN_TIMEOUT_MESSAGE = "Agent turn exceeded its time limit."
+TURN_TIMEOUT_FAKE_MODEL_RSP = (
+    "This turn took longer than its time limit and was stopped. You can resume by providing a new instruction."
+)
 
 
 class AnthropicFC(BaseAgent):
@@ -64,8 +87,16 @@ try breaking down the task into smaller steps. After call this tool to update or
         session_id: Optional[uuid.UUID] = None,
         interactive_mode: bool = True,
         use_gemini: bool = True,
+        session_summary: bool = True,
+        session_summary_client: Optional[LLMClient] = None,
+        turn_timeout_seconds: Optional[float] = TURN_TIMEOUT_SECONDS,
+        snapshot: Optional[HistorySnapshot] = None,
     ):
-        """Initialize the agent."""
+        """Initialize the agent.
+
+        With a ``snapshot``, the history is persisted to it turn by turn, and a
+        session that already has one resumes where it left off.
+        """
         super().__init__()
         self.workspace_manager = workspace_manager
         self.system_prompt = system_prompt
@@ -79,15 +110,36 @@ try breaking down the task into smaller steps. After call this tool to update or
             tools=tools,
             logger_for_agent_logs=logger_for_agent_logs,
             interactive_mode=interactive_mode,
+            output_store=ToolOutputBlobStore(
+                workspace_manager.session_workspace / TOOL_OUTPUT_DIR,
+                threshold_chars=TOOL_OUTPUT_OFFLOAD_CHARS,
+                preview_chars=TOOL_OUTPUT_PREVIEW_CHARS,
+            ),
         )
 
         self.logger_for_agent_logs = logger_for_agent_logs
         self.max_output_tokens = max_output_tokens_per_turn
         self.max_turns = max_turns
+        self.turn_timeout_seconds = turn_timeout_seconds or None
 
         self.interrupted = False
+        # Fired by cancel(); model clients and tools observe it through the
+        # cancellation context, so in-flight work stops instead of running to the end.
+        self._run_token = CancellationToken()
+        self.context_manager = context_manager
         self.history = MessageHistory(context_manager)
         self.session_id = session_id
+        if snapshot is not None:
+            self._restore_snapshot(snapshot)
+
+        # Summaries of tool results are produced off the critical path and folded
+        # into the history at the next turn boundary.
+        self.session_summarizer: Optional[SessionSummarizer] = None
+        if session_summary:
+            self.session_summarizer = SessionSummarizer(
+                client=response_cache.wrap(session_summary_client or self.client),
+                logger=logger_for_agent_logs,
+            )
 
         self.db_manager = DatabaseManager()
 
@@ -100,7 +152,11 @@ try breaking down the task into smaller steps. After call this tool to update or
                 try:
                     message: RealtimeEvent = await self.message_queue.get()
 
-                    if self.session_id is not None:
+                    # Token deltas are only forwarded live; the turn itself is
+                    # persisted through the tool call and response events.
+                    if message.content.get("delta"):
+                        pass
+                    elif self.session_id is not None:
                         self.db_manager.save_event(self.session_id, message)
                     else:
                         self.logger_for_agent_logs.info(
@@ -132,14 +188,8 @@ try breaking down the task into smaller steps. After call this tool to update or
             self.logger_for_agent_logs.error(f"Error in message processor: {str(e)}")
 
     def _validate_tool_parameters(self):
-        """Validate tool parameters and check for duplicates."""
-        tool_params = [tool.get_tool_param() for tool in self.tool_manager.get_tools()]
-        tool_names = [param.name for param in tool_params]
-        sorted_names = sorted(tool_names)
-        for i in range(len(sorted_names) - 1):
-            if sorted_names[i] == sorted_names[i + 1]:
-                raise ValueError(f"Tool {sorted_names[i]} is duplicated")
-        return tool_params
+        """Return the tool parameters, checking for duplicates when the tool set changes."""
+        return self.tool_manager.get_tool_params()
 
     def start_message_processing(self):
         """Start processing the message queue."""
@@ -151,6 +201,127 @@ try breaking down the task into smaller steps. After call this tool to update or
         message_history: Optional[MessageHistory] = None,
         tool_choice: Optional[Dict[str, Any]] = None,
     ) -> ToolImplOutput:
+        run_token = self._new_run_token()
+        with tracing.span("agent.run", session_id=str(self.session_id)), cancellation.scope(run_token):
+            self._add_instruction(tool_input)
+
+            remaining_turns = self.max_turns
+            while remaining_turns > 0:
+                remaining_turns -= 1
+                with (
+                    tracing.span("agent.turn", turn=self.max_turns - remaining_turns),
+                    cancellation.scope(self._new_turn_token(run_token)),
+                ):
+                    try:
+                        self._add_finished_session_summaries()
+                        self.history.truncate()
+
+                        all_tool_params = self._start_turn()
+                        if self.interrupted:
+                            return self._interrupt_before_model_call()
+
+                        request_tokens = self.history.count_tokens()
+                        model_response, metadata, started_tool_calls = self._generate_streaming(
+                            messages=self.history.get_messages_for_llm(),
+                            max_tokens=self.max_output_tokens,
+                            tools=all_tool_params,
+                            system_prompt=self.system_prompt,
+                            tool_choice=tool_choice,
+                        )
+                    except OperationCancelled:
+                        return self._interrupt_before_model_call()
+                    self._record_usage(request_tokens, metadata)
+                    pending_tool_calls = self._add_model_response(model_response)
+                    if not pending_tool_calls:
+                        continue
+
+                    if self.interrupted:
+                        for future in started_tool_calls.values():
+                            future.cancel()
+                        return self._interrupt_tool_calls(pending_tool_calls)
+                    try:
+                        tool_results = self.tool_manager.run_tools(
+                            pending_tool_calls, self.history, started=started_tool_calls
+                        )
+                    except OperationCancelled:
+                        return self._interrupt_tool_calls(pending_tool_calls)
+
+                    output = self._finish_tool_turn(pending_tool_calls, tool_results)
+                    if output is not None:
+                        return output
+
+            return self._max_turns_reached()
+
+    async def arun_impl(
+        self,
+        tool_input: dict[str, Any],
+        message_history: Optional[MessageHistory] = None,
+        tool_choice: Optional[Dict[str, Any]] = None,
+    ) -> ToolImplOutput:
+        """Same loop as run_impl, driven by the event loop instead of a worker thread."""
+        run_token = self._new_run_token()
+        with tracing.span("agent.run", session_id=str(self.session_id)), cancellation.scope(run_token):
+            self._add_instruction(tool_input)
+
+            remaining_turns = self.max_turns
+            while remaining_turns > 0:
+                remaining_turns -= 1
+                with (
+                    tracing.span("agent.turn", turn=self.max_turns - remaining_turns),
+                    cancellation.scope(self._new_turn_token(run_token)),
+                ):
+                    try:
+                        self._add_finished_session_summaries()
+                        # Truncation may call the summarization model synchronously, so
+                        # it is computed in a worker thread but applied here; a run
+                        # cancelled meanwhile leaves the thread's result unapplied.
+                        generation, truncated = await cancellation.run_cancellable(
+                            asyncio.to_thread(self.history.compute_truncation)
+                        )
+                        self.history.apply_truncation(generation, truncated)
+
+                        all_tool_params = self._start_turn()
+                        if self.interrupted:
+                            return self._interrupt_before_model_call()
+
+                        request_tokens = self.history.count_tokens()
+                        model_response, metadata, started_tool_calls = await cancellation.run_cancellable(
+                            self._agenerate_streaming(
+                                messages=self.history.get_messages_for_llm(),
+                                max_tokens=self.max_output_tokens,
+                                tools=all_tool_params,
+                                system_prompt=self.system_prompt,
+                                tool_choice=tool_choice,
+                            )
+                        )
+                    except OperationCancelled:
+                        return self._interrupt_before_model_call()
+                    self._record_usage(request_tokens, metadata)
+                    pending_tool_calls = self._add_model_response(model_response)
+                    if not pending_tool_calls:
+                        continue
+
+                    if self.interrupted:
+                        for task in started_tool_calls.values():
+                            task.cancel()
+                        return self._interrupt_tool_calls(pending_tool_calls)
+                    try:
+                        tool_results = await cancellation.run_cancellable(
+                            self.tool_manager.arun_tools(
+                                pending_tool_calls, self.history, started=started_tool_calls
+                            )
+                        )
+                    except OperationCancelled:
+                        return self._interrupt_tool_calls(pending_tool_calls)
+
+                    output = self._finish_tool_turn(pending_tool_calls, tool_results)
+                    if output is not None:
+                        return output
+
+            return self._max_turns_reached()
+
+    def _add_instruction(self, tool_input: dict[str, Any]):
+        """Add the user instruction, with any attached files and images, to the history."""
         instruction = tool_input["instruction"]
         files = tool_input["files"]
 
@@ -186,58 +357,87 @@ try breaking down the task into smaller steps. After call this tool to update or
         self.history.add_user_prompt(instruction, image_blocks)
         self.interrupted = False
 
-        remaining_turns = self.max_turns
-        while remaining_turns > 0:
-            self.history.truncate()
-            remaining_turns -= 1
+    def _start_turn(self) -> list[ToolParam]:
+        """Log the start of a turn and return the tool params to offer the model."""
+        delimiter = "-" * 45 + " NEW TURN " + "-" * 45
+        self.logger_for_agent_logs.info(f"\n{delimiter}\n")
 
-            delimiter = "-" * 45 + " NEW TURN " + "-" * 45
-            self.logger_for_agent_logs.info(f"\n{delimiter}\n")
-
-            all_tool_params = self._validate_tool_parameters()
-
-            if self.interrupted:
-                self.add_fake_assistant_turn(AGENT_INTERRUPT_FAKE_MODEL_RSP)
-                return ToolImplOutput(
-                    tool_output=AGENT_INTERRUPT_MESSAGE,
-                    tool_result_message=AGENT_INTERRUPT_MESSAGE,
-                )
+        all_tool_params = self._validate_tool_parameters()
+        self.context_manager.set_request_overhead(self.system_prompt, all_tool_params)
 
+        if not self.interrupted:
+            token_count = self.history.count_tokens()
             self.logger_for_agent_logs.info(
-                f"(Current token count: {self.history.count_tokens()})\n"
+                f"(Current token count: {token_count}, "
+                f"estimated request tokens: {self.context_manager.estimate_request_tokens(token_count)})\n"
             )
-
-            response = self.client.generate(
-                messages=self.history.get_messages_for_llm(),
-                max_tokens=self.max_output_tokens,
-                tools=all_tool_params,
-                system_prompt=self.system_prompt,
-                tool_choice=tool_choice,
+        return all_tool_params
+
+    def _record_usage(self, request_tokens: int, metadata: dict[str, Any]):
+        """Calibrate the token estimates with the input tokens the model reported,
+        and record how much of the prompt was served from the provider's cache."""
+        current = tracing.current_span()
+        cache_read = metadata.get("cache_read_input_tokens", -1)
+        cache_creation = metadata.get("cache_creation_input_tokens", -1)
+        if cache_read is not None and cache_read >= 0:
+            self.logger_for_agent_logs.debug(
+                f"Prompt cache: {cache_read} tokens read, {cache_creation} written, "
+                f"{metadata.get('input_tokens')} uncached"
             )
-            if isinstance(response, tuple):
-                model_response, _ = response
-            else:
-                model_response = response
-
-            if len(model_response) == 0:
-                model_response = [TextResult(text=COMPLETE_MESSAGE)]
-
-            self.history.add_assistant_turn(model_response)
+            if current is not None:
+                current.set_attribute("cache_read_input_tokens", cache_read)
+                current.set_attribute("cache_creation_input_tokens", cache_creation)
+
+        model = getattr(self.client, "model_name", None) or type(self.client).__name__
+        error = self.context_manager.record_usage(model, request_tokens, metadata)
+        if error is None:
+            return
+        mean_error = self.context_manager.estimate_error()
+        self.logger_for_agent_logs.debug(
+            f"Token estimate error: {error:+.1%} (mean absolute error {mean_error:.1%})"
+        )
+        if current is not None:
+            current.set_attribute("token_estimate_error", round(error, 4))
+            current.set_attribute("token_estimate_mean_abs_error", round(mean_error, 4))
+
+    def _new_run_token(self) -> CancellationToken:
+        self._run_token = CancellationToken()
+        return self._run_token
+
+    def _new_turn_token(self, run_token: CancellationToken) -> CancellationToken:
+        """A token for one turn: fires on cancel() or when the turn's deadline passes."""
+        return CancellationToken(timeout=self.turn_timeout_seconds, parent=run_token)
+
+    def _interrupt_before_model_call(self) -> ToolImplOutput:
+        # Without a user interrupt, the only other reason to stop is the turn deadline.
+        message, model_rsp = AGENT_INTERRUPT_MESSAGE, AGENT_INTERRUPT_FAKE_MODEL_RSP
+        if not self.interrupted:
+            message, model_rsp = TURN_TIMEOUT_MESSAGE, TURN_TIMEOUT_FAKE_MODEL_RSP
+        self.add_fake_assistant_turn(model_rsp)
+        return ToolImplOutput(
+            tool_output=message,
+            tool_result_message=message,
+        )
 
-            pending_tool_calls = self.history.get_pending_tool_calls()
+    def _add_model_response(self, model_response: list) -> list[ToolCallParameters]:
+        """Record the model's turn and announce its tool calls.
 
-            if len(pending_tool_calls) == 0:
-                self.logger_for_agent_logs.info("[no tools were called, forcing tool use]")
-                self.history.add_user_prompt("You must use a tool to answer the question.")
-                continue
+        Returns the pending tool calls; when there are none, the model is told to use
+        a tool and an empty list is returned.
+        """
+        if len(model_response) == 0:
+            model_response = [TextResult(text=COMPLETE_MESSAGE)]
 
-            if len(pending_tool_calls) > 1:
-                raise ValueError("Only one tool call per turn is supported")
+        self.history.add_assistant_turn(model_response)
 
-            assert len(pending_tool_calls) == 1
+        pending_tool_calls = self.history.get_pending_tool_calls()
 
-            tool_call = pending_tool_calls[0]
+        if len(pending_tool_calls) == 0:
+            self.logger_for_agent_logs.info("[no tools were called, forcing tool use]")
+            self.history.add_user_prompt("You must use a tool to answer the question.")
+            return []
 
+        for tool_call in pending_tool_calls:
             self.message_queue.put_nowait(
                 RealtimeEvent(
                     type=EventType.TOOL_CALL,
@@ -249,42 +449,65 @@ try breaking down the task into smaller steps. After call this tool to update or
                 )
             )
 
-            text_results = [
-                item for item in model_response if isinstance(item, TextResult)
-            ]
-            if len(text_results) > 0:
-                text_result = text_results[0]
-                self.logger_for_agent_logs.info(
-                    f"Top-level agent planning next step: {text_result.text}\n",
-                )
-
-            if self.interrupted:
-                self.add_tool_call_result(tool_call, TOOL_RESULT_INTERRUPT_MESSAGE)
-                self.add_fake_assistant_turn(TOOL_CALL_INTERRUPT_FAKE_MODEL_RSP)
-                return ToolImplOutput(
-                    tool_output=TOOL_RESULT_INTERRUPT_MESSAGE,
-                    tool_result_message=TOOL_RESULT_INTERRUPT_MESSAGE,
-                )
-            tool_result = self.tool_manager.run_tool(tool_call, self.history)
+        text_results = [
+            item for item in model_response if isinstance(item, TextResult)
+        ]
+        if len(text_results) > 0:
+            text_result = text_results[0]
+            self.logger_for_agent_logs.info(
+                f"Top-level agent planning next step: {text_result.text}\n",
+            )
+        return pending_tool_calls
 
-            self.add_tool_call_result(tool_call, tool_result)
+    def _interrupt_tool_calls(
+        self, pending_tool_calls: List[ToolCallParameters]
+    ) -> ToolImplOutput:
+        message, model_rsp = TOOL_RESULT_INTERRUPT_MESSAGE, TOOL_CALL_INTERRUPT_FAKE_MODEL_RSP
+        if not self.interrupted:
+            message, model_rsp = TURN_TIMEOUT_MESSAGE, TURN_TIMEOUT_FAKE_MODEL_RSP
+        self.add_tool_call_results(
+            pending_tool_calls,
+            [message] * len(pending_tool_calls),
+        )
+        self.add_fake_assistant_turn(model_rsp)
+        return ToolImplOutput(
+            tool_output=message,
+            tool_result_message=message,
+        )
 
-            # --- Add Session Summary ---
-            summary_prompt = f"Based on the result of the tool call '{tool_call.tool_name}' which returned '{str(tool_result)[:200]}...', what is the single most important new piece of information or confirmation you have learned? State it as a brief, factual summary."
-            summary_response = self.client.generate(
-                messages=[[TextPrompt(text=summary_prompt)]],
-                max_tokens=100,
+    def _finish_tool_turn(
+        self,
+        pending_tool_calls: List[ToolCallParameters],
+        tool_results: List[str | list[dict[str, Any]]],
+    ) -> Optional[ToolImplOutput]:
+        """Record the tool results; returns the final output if the run should stop."""
+        self.add_tool_call_results(pending_tool_calls, tool_results)
+        if self.history.snapshot is not None:
+            self.history.snapshot.set_tool_state(self.tool_manager.get_session_state())
+
+        if self.session_summarizer is not None:
+            for tool_call, tool_result in zip(pending_tool_calls, tool_results):
+                self.session_summarizer.submit(tool_call.tool_name, tool_result)
+        if self.tool_manager.should_stop():
+            self.add_fake_assistant_turn(self.tool_manager.get_final_answer())
+            return ToolImplOutput(
+                tool_output=self.tool_manager.get_final_answer(),
+                tool_result_message="Task completed",
             )
-            if isinstance(summary_response, tuple) and len(summary_response[0]) > 0:
-                summary_text = summary_response[0][0].text
-                self.history.add_session_summary(f"Summary of last action: {summary_text}")
-            if self.tool_manager.should_stop():
-                self.add_fake_assistant_turn(self.tool_manager.get_final_answer())
-                return ToolImplOutput(
-                    tool_output=self.tool_manager.get_final_answer(),
-                    tool_result_message="Task completed",
-                )
-
+        return None
+
+    def _restore_snapshot(self, snapshot: HistorySnapshot):
+        if not snapshot.exists():
+            self.history.snapshot = snapshot
+            return
+        with tracing.span("agent.restore_snapshot") as span:
+            tool_state = self.history.restore_snapshot(snapshot)
+            self.tool_manager.restore_session_state(tool_state)
+            if span is not None:
+                span.set_attribute("turns", len(self.history))
+        self.logger_for_agent_logs.info(f"Restored {len(self.history)} turns from {snapshot.path}")
+
+    def _max_turns_reached(self) -> ToolImplOutput:
         agent_answer = "Agent did not complete after max turns"
         self.message_queue.put_nowait(
             RealtimeEvent(type=EventType.AGENT_RESPONSE, content={"text": agent_answer})
@@ -293,6 +516,111 @@ try breaking down the task into smaller steps. After call this tool to update or
             tool_output=agent_answer, tool_result_message=agent_answer
         )
 
+    def _generate_streaming(
+        self, **generate_kwargs
+    ) -> tuple[list, dict[str, Any], dict[str, Future]]:
+        """Call the model, forwarding text and thinking deltas to the client as they arrive.
+
+        Parallel-safe tool calls are started as soon as the stream announces them, as
+        long as every earlier call of the turn was parallel-safe too, so they overlap
+        with the rest of the generation.
+
+        Returns the (content blocks, metadata) pair of LLMClient.generate, plus the
+        futures of the tool calls already started, keyed by tool call id.
+        """
+        stream_state = self._new_stream_state()
+        model_response, metadata = [], {}
+        started: dict[str, Future] = {}
+        try:
+            for event in self.client.generate_stream(**generate_kwargs):
+                if event.type == "message":
+                    model_response, metadata = event.content or [], event.metadata or {}
+                    continue
+                tool_call = self._handle_stream_event(event, stream_state)
+                if tool_call is not None:
+                    started[tool_call.tool_call_id] = self.tool_manager.submit_tool(
+                        tool_call, self.history
+                    )
+        except BaseException:
+            for future in started.values():
+                future.cancel()
+            raise
+        return model_response, metadata, started
+
+    async def _agenerate_streaming(
+        self, **generate_kwargs
+    ) -> tuple[list, dict[str, Any], dict[str, asyncio.Task]]:
+        """Async variant of _generate_streaming; early tool calls become tasks."""
+        stream_state = self._new_stream_state()
+        model_response, metadata = [], {}
+        started: dict[str, asyncio.Task] = {}
+        try:
+            async for event in self.client.agenerate_stream(**generate_kwargs):
+                if event.type == "message":
+                    model_response, metadata = event.content or [], event.metadata or {}
+                    continue
+                tool_call = self._handle_stream_event(event, stream_state)
+                if tool_call is not None:
+                    started[tool_call.tool_call_id] = self.tool_manager.start_tool(
+                        tool_call, self.history
+                    )
+        except BaseException:
+            for task in started.values():
+                task.cancel()
+            raise
+        return model_response, metadata, started
+
+    def _new_stream_state(self) -> dict[str, Any]:
+        # Deltas of one response share a stream id so the frontend can grow a single message.
+        return {
+            "stream_ids": {
+                "text_delta": f"{uuid.uuid4()}-text",
+                "thinking_delta": f"{uuid.uuid4()}-thinking",
+            },
+            "can_dispatch": True,
+        }
+
+    def _handle_stream_event(
+        self, event: StreamEvent, stream_state: dict[str, Any]
+    ) -> Optional[ToolCallParameters]:
+        """Forward a delta to the client, or return a tool call that may start now."""
+        if event.type == "tool_call":
+            tool_call = event.tool_call
+            # A call that must not run concurrently is a barrier for every later call.
+            stream_state["can_dispatch"] = stream_state[
+                "can_dispatch"
+            ] and self.tool_manager.can_dispatch_early(tool_call.tool_name)
+            if not stream_state["can_dispatch"] or self.interrupted:
+                return None
+            self.logger_for_agent_logs.info(
+                f"Starting {tool_call.tool_name} before the model response has finished"
+            )
+            return ToolCallParameters(
+                tool_call_id=tool_call.tool_call_id,
+                tool_name=tool_call.tool_name,
+                tool_input=tool_call.tool_input,
+            )
+        if event.text:
+            self.message_queue.put_nowait(
+                RealtimeEvent(
+                    type=EventType.AGENT_THINKING,
+                    content={
+                        "text": event.text,
+                        "delta": True,
+                        "kind": "thinking" if event.type == "thinking_delta" else "text",
+                        "stream_id": stream_state["stream_ids"][event.type],
+                    },
+                )
+            )
+        return None
+
+    def _add_finished_session_summaries(self):
+        """Fold summaries finished by the background summarizer into the history."""
+        if self.session_summarizer is None:
+            return
+        for summary_text in self.session_summarizer.drain():
+            self.history.add_session_summary(summary_text)
+
     def get_tool_start_message(self, tool_input: dict[str, Any]) -> str:
         return f"Agent started with instruction: {tool_input['instruction']}"
 
@@ -305,10 +633,35 @@ try breaking down the task into smaller steps. After call this tool to update or
         orientation_instruction: str | None = None,
     ) -> ToolImplOutput:
         """Start a new agent run."""
+        tool_input = self._prepare_run(instruction, files, resume, orientation_instruction)
+        result = self.run_impl(tool_input, self.history, tool_choice=tool_choice)
+        return result
+
+    async def arun_agent(
+        self,
+        instruction: str,
+        files: list[str] | None = None,
+        resume: bool = False,
+        tool_choice: Optional[Dict[str, Any]] = None,
+        orientation_instruction: str | None = None,
+    ) -> ToolImplOutput:
+        """Start a new agent run on the current event loop."""
+        tool_input = self._prepare_run(instruction, files, resume, orientation_instruction)
+        return await self.arun_impl(tool_input, self.history, tool_choice=tool_choice)
+
+    def _prepare_run(
+        self,
+        instruction: str,
+        files: list[str] | None,
+        resume: bool,
+        orientation_instruction: str | None,
+    ) -> dict[str, Any]:
         self.tool_manager.reset()
         if not resume:
             self.history.clear()
             self.interrupted = False
+            if self.session_summarizer is not None:
+                self.session_summarizer.reset()
 
         tool_input = {
             "instruction": instruction,
@@ -316,33 +669,49 @@ try breaking down the task into smaller steps. After call this tool to update or
         }
         if orientation_instruction:
             tool_input["orientation_instruction"] = orientation_instruction
-        result = self.run_impl(tool_input, self.history, tool_choice=tool_choice)
-        return result
+        return tool_input
 
     def clear(self):
         """Clear the dialog and reset interruption state."""
         self.history.clear()
         self.interrupted = False
+        if self.session_summarizer is not None:
+            self.session_summarizer.reset()
 
     def cancel(self):
-        """Cancel the agent execution."""
+        """Cancel the agent execution.
+
+        In-flight model calls and tools are stopped as well: streams are closed,
+        polling loops end and pending tool calls do not start.
+        """
         self.interrupted = True
+        self._run_token.cancel("cancelled by user")
         self.logger_for_agent_logs.info("Agent cancellation requested")
 
     def add_tool_call_result(self, tool_call: ToolCallParameters, tool_result: str):
         """Add a tool call result to the history and send it to the message queue."""
-        self.history.add_tool_call_result(tool_call, tool_result)
+        self.add_tool_call_results([tool_call], [tool_result])
 
-        self.message_queue.put_nowait(
-            RealtimeEvent(
-                type=EventType.TOOL_RESULT,
-                content={
-                    "tool_call_id": tool_call.tool_call_id,
-                    "tool_name": tool_call.tool_name,
-                    "result": tool_result,
-                },
+    def add_tool_call_results(
+        self,
+        tool_calls: List[ToolCallParameters],
+        tool_results: List[str | list[dict[str, Any]]],
+    ):
+        """Add the results of one turn's tool calls to the history as a single turn
+        and send them to the message queue in call order."""
+        self.history.add_tool_call_results(tool_calls, tool_results)
+
+        for tool_call, tool_result in zip(tool_calls, tool_results):
+            self.message_queue.put_nowait(
+                RealtimeEvent(
+                    type=EventType.TOOL_RESULT,
+                    content={
+                        "tool_call_id": tool_call.tool_call_id,
+                        "tool_name": tool_call.tool_name,
+                        "result": tool_result,
+                    },
+                )
             )
-        )
 
     def add_fake_assistant_turn(self, text: str):
         """Add a fake assistant turn to the history and send it to the message queue."""
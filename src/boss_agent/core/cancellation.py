@@ -0,0 +1,243 @@
+"""Cooperative cancellation with deadlines for agent runs.
+
+A ``CancellationToken`` is made current for the duration of a run (``scope``) and,
+like tracing spans, reaches model clients and tools through a context variable, so
+they observe it without new parameters. Tool calls submitted to the tool pool and
+``asyncio.to_thread`` calls inherit it as well.
+
+Code that can block for a long time observes the current token in one of three
+ways:
+
+* polling loops call ``raise_if_cancelled()`` or sleep with ``sleep()``;
+* blocking I/O registers a callback with ``on_cancel()`` that aborts it, such as
+  closing an HTTP stream, and passes ``timeout_kwargs()`` so the request cannot
+  outlive the deadline;
+* coroutines are awaited through ``run_cancellable()``, which cancels the task.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class OperationCancelled(BaseException):
+    """Raised where work stops because its cancellation token fired.
+
+    Like ``asyncio.CancelledError`` this is not an ``Exception``, so the broad
+    ``except Exception`` handlers in tools and retry loops let it through.
+    """
+
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancellationToken:
+    """A thread-safe, one-shot cancellation signal with an optional deadline.
+
+    A child token fires when its parent fires or when its own deadline passes,
+    whichever comes first; cancelling a child does not affect the parent.
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        parent: Optional["CancellationToken"] = None,
+    ):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: dict[int, Callable[[], Any]] = {}
+        self._next_callback_id = 0
+        self.reason: Optional[str] = None
+
+        self.deadline: Optional[float] = None
+        if timeout is not None:
+            self.deadline = time.monotonic() + timeout
+        if parent is not None and parent.deadline is not None:
+            self.deadline = (
+                parent.deadline
+                if self.deadline is None
+                else min(self.deadline, parent.deadline)
+            )
+
+        self._timer: Optional[threading.Timer] = None
+        if timeout is not None:
+            self._timer = threading.Timer(
+                timeout, self.cancel, args=(f"deadline of {timeout:g}s exceeded",)
+            )
+            self._timer.daemon = True
+            self._timer.start()
+
+        self._detach_from_parent: Optional[Callable[[], None]] = None
+        if parent is not None:
+            self._detach_from_parent = parent.add_callback(
+                lambda: self.cancel(parent.reason or "cancelled")
+            )
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def deadline_exceeded(self) -> bool:
+        return (
+            self.cancelled
+            and self.deadline is not None
+            and time.monotonic() >= self.deadline
+        )
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until the deadline (never negative), or None without one."""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def cancel(self, reason: str = "cancelled"):
+        """Fire the token and run its callbacks. Later calls do nothing."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Cancellation callback failed: {e}")
+
+    def add_callback(self, callback: Callable[[], Any]) -> Callable[[], None]:
+        """Run ``callback`` when the token fires (right away if it already has).
+
+        Callbacks run on the cancelling thread and must not block. Returns a function
+        that unregisters the callback.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                callback_id = self._next_callback_id
+                self._next_callback_id += 1
+                self._callbacks[callback_id] = callback
+                return lambda: self._callbacks.pop(callback_id, None)
+        callback()
+        return lambda: None
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise OperationCancelled(self.reason or "cancelled")
+
+    def sleep(self, seconds: float):
+        """Sleep, waking up early to raise OperationCancelled if the token fires."""
+        if self._event.wait(seconds):
+            raise OperationCancelled(self.reason or "cancelled")
+
+    def close(self):
+        """Stop the deadline timer and detach from the parent."""
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._detach_from_parent is not None:
+            self._detach_from_parent()
+            self._detach_from_parent = None
+
+
+_current_token: ContextVar[Optional[CancellationToken]] = ContextVar(
+    "boss_agent_cancellation_token", default=None
+)
+
+
+def current() -> Optional[CancellationToken]:
+    return _current_token.get()
+
+
+@contextmanager
+def scope(token: CancellationToken) -> Iterator[CancellationToken]:
+    """Make ``token`` current for the block, closing it on exit."""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+        token.close()
+
+
+def raise_if_cancelled():
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def sleep(seconds: float):
+    """``time.sleep`` that ends early with OperationCancelled if the current token fires."""
+    token = _current_token.get()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.sleep(seconds)
+
+
+def remaining() -> Optional[float]:
+    token = _current_token.get()
+    return token.remaining() if token is not None else None
+
+
+def timeout_kwargs() -> dict[str, float]:
+    """``{"timeout": seconds}`` for an HTTP request that must end by the current
+    deadline, or an empty dict to keep the client's default timeout."""
+    seconds = remaining()
+    # A zero timeout would mean "no timeout" to some clients.
+    return {} if seconds is None else {"timeout": max(seconds, 0.001)}
+
+
+@contextmanager
+def on_cancel(callback: Callable[[], Any]) -> Iterator[None]:
+    """Run ``callback`` if the current token fires while the block runs.
+
+    Use it to abort blocking I/O, e.g. by closing a stream. Whatever the aborted I/O
+    raises inside the block is turned into OperationCancelled.
+    """
+    token = _current_token.get()
+    if token is None:
+        yield
+        return
+    remove = token.add_callback(callback)
+    try:
+        yield
+    except Exception as e:
+        if token.cancelled:
+            raise OperationCancelled(token.reason or "cancelled") from e
+        raise
+    finally:
+        remove()
+
+
+async def run_cancellable(
+    awaitable: Awaitable[T], token: Optional[CancellationToken] = None
+) -> T:
+    """Await ``awaitable`` as a task that is cancelled as soon as the token fires.
+
+    Raises OperationCancelled instead of asyncio.CancelledError in that case; a
+    cancellation of the caller's own task propagates unchanged.
+    """
+    token = token or _current_token.get()
+    if token is None:
+        return await awaitable
+    token.raise_if_cancelled()
+    task = asyncio.ensure_future(awaitable)
+    loop = asyncio.get_running_loop()
+    remove = token.add_callback(lambda: loop.call_soon_threadsafe(task.cancel))
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if token.cancelled and task.cancelled():
+            raise OperationCancelled(token.reason or "cancelled")
+        raise
+    finally:
+        remove()
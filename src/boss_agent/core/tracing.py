@@ -0,0 +1,266 @@
+"""Nested timing spans for the agent loop, exported as JSON lines.
+
+Spans nest through a context variable, so a tool or LLM call made during a turn is
+recorded as a child of that turn and inherits its ``session_id`` and ``turn``
+attributes. Records use OTLP field names (trace/span ids, start/end in unix nanos)
+so the file can be converted for OpenTelemetry tooling.
+
+Tracing is off until ``configure`` is given a path. While off, ``span`` returns a
+shared no-op context manager; while on, finishing a span only enqueues a dict, and a
+background thread serializes and writes it.
+"""
+
+import atexit
+import configparser
+import functools
+import inspect
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+TRACE_FILE_ENV = "BOSS_AGENT_TRACE_FILE"
+
+# Attributes copied from a span to all of its descendants.
+INHERITED_ATTRIBUTES = ("session_id", "turn")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Span:
+    """An in-progress timing span. Use ``span()`` rather than creating one directly."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_span_id",
+        "attributes",
+        "_start_ns",
+        "_start_perf",
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent.span_id if parent is not None else None
+        self.attributes: dict[str, Any] = {}
+        if parent is not None:
+            for key in INHERITED_ATTRIBUTES:
+                if key in parent.attributes:
+                    self.attributes[key] = parent.attributes[key]
+        self.attributes.update(attributes)
+        self._start_ns = time.time_ns()
+        self._start_perf = time.perf_counter_ns()
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter_ns() - self._start_perf) / 1e6
+
+    def _record(self, error: Optional[BaseException]) -> dict[str, Any]:
+        duration_ns = time.perf_counter_ns() - self._start_perf
+        record = {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time_unix_nano": self._start_ns,
+            "end_time_unix_nano": self._start_ns + duration_ns,
+            "duration_ms": round(duration_ns / 1e6, 3),
+            "attributes": self.attributes,
+            "status": "ok",
+        }
+        if error is not None:
+            record["status"] = "error"
+            record["error"] = f"{type(error).__name__}: {error}"
+        return record
+
+
+class JsonlSpanExporter:
+    """Appends span records to a file from a background writer thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._queue: "queue.SimpleQueue[Optional[dict[str, Any]]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._write_loop, name="trace-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def export(self, record: dict[str, Any]):
+        self._queue.put(record)
+
+    def shutdown(self, timeout: float = 5.0):
+        """Write everything queued so far and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _write_loop(self):
+        with open(self.path, "a", encoding="utf-8") as trace_file:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    return
+                trace_file.write(json.dumps(record, default=str) + "\n")
+                # Batch writes while records keep arriving; flush once idle.
+                if self._queue.empty():
+                    trace_file.flush()
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar(
+    "boss_agent_current_span", default=None
+)
+_exporter: Optional[JsonlSpanExporter] = None
+_NULL_SPAN = nullcontext(None)
+
+
+def configure(path: Optional[str]) -> bool:
+    """Start exporting spans to ``path``, or stop tracing if it is empty.
+
+    Returns whether tracing is enabled afterwards.
+    """
+    global _exporter
+    if _exporter is not None:
+        _exporter.shutdown()
+        _exporter = None
+    if path:
+        _exporter = JsonlSpanExporter(path)
+    return _exporter is not None
+
+
+def configure_from_config(config: configparser.ConfigParser) -> bool:
+    """Configure tracing from the ``[tracing]`` section, overridable by environment.
+
+    ``BOSS_AGENT_TRACE_FILE`` takes precedence over the config file; an empty value
+    disables tracing.
+    """
+    path = os.environ.get(TRACE_FILE_ENV)
+    if path is None and config.getboolean("tracing", "enabled", fallback=False):
+        path = config.get("tracing", "path", fallback="traces.jsonl")
+    return configure(path)
+
+
+def is_enabled() -> bool:
+    return _exporter is not None
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def span(name: str, **attributes: Any):
+    """Context manager timing a block as a child of the current span.
+
+    Yields the Span (or None when tracing is disabled) so callers can attach
+    attributes that are only known at the end.
+    """
+    if _exporter is None:
+        return _NULL_SPAN
+    return _span(name, attributes)
+
+
+@contextmanager
+def _span(
+    name: str, attributes: dict[str, Any], make_current: bool = True
+) -> Iterator[Span]:
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current) if make_current else None
+    error: Optional[BaseException] = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        if token is not None:
+            _current_span.reset(token)
+        exporter = _exporter
+        if exporter is not None:
+            exporter.export(current._record(error))
+
+
+def traced(
+    name: str, attributes: Optional[Callable[..., dict[str, Any]]] = None
+) -> Callable[[F], F]:
+    """Decorator wrapping each call of a function in a span.
+
+    Works for plain functions, coroutines, generators and async generators; for the
+    latter two the span covers the whole iteration and records how long the first
+    item took as ``first_item_ms``. A generator's span does not become the current
+    span, since the caller runs its own code between items. ``attributes`` receives
+    the call's arguments and returns extra span attributes.
+    """
+
+    def decorator(func: F) -> F:
+        def span_for(args, kwargs, make_current=True):
+            if _exporter is None:
+                return _NULL_SPAN
+            return _span(
+                name, attributes(*args, **kwargs) if attributes else {}, make_current
+            )
+
+        if inspect.isasyncgenfunction(func):
+
+            @functools.wraps(func)
+            async def async_gen_wrapper(*args, **kwargs):
+                with span_for(args, kwargs, make_current=False) as current:
+                    first = True
+                    async for item in func(*args, **kwargs):
+                        if first and current is not None:
+                            current.set_attribute(
+                                "first_item_ms", round(current.elapsed_ms(), 3)
+                            )
+                        first = False
+                        yield item
+
+            return async_gen_wrapper  # type: ignore[return-value]
+
+        if inspect.isgeneratorfunction(func):
+
+            @functools.wraps(func)
+            def gen_wrapper(*args, **kwargs):
+                with span_for(args, kwargs, make_current=False) as current:
+                    first = True
+                    for item in func(*args, **kwargs):
+                        if first and current is not None:
+                            current.set_attribute(
+                                "first_item_ms", round(current.elapsed_ms(), 3)
+                            )
+                        first = False
+                        yield item
+
+            return gen_wrapper  # type: ignore[return-value]
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span_for(args, kwargs):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span_for(args, kwargs):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+@atexit.register
+def _shutdown():
+    if _exporter is not None:
+        _exporter.shutdown()
@@ -4,6 +4,7 @@ import uuid
 from pathlib import Path
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session as DBSession
+from boss_agent.core import tracing
 from boss_agent.db.models import Base, Session, Event
 from boss_agent.core.event import EventType, RealtimeEvent
 
@@ -83,15 +84,16 @@ class DatabaseManager:
         Returns:
             The UUID of the created event
         """
-        with self.get_session() as session:
-            db_event = Event(
-                session_id=session_id,
-                event_type=event.type.value,
-                event_payload=event.model_dump(),
-            )
-            session.add(db_event)
-            session.flush()  # This will populate the id field
-            return uuid.UUID(db_event.id)
+        with tracing.span("db.save_event", session_id=str(session_id), event_type=event.type.value):
+            with self.get_session() as session:
+                db_event = Event(
+                    session_id=session_id,
+                    event_type=event.type.value,
+                    event_payload=event.model_dump(),
+                )
+                session.add(db_event)
+                session.flush()  # This will populate the id field
+                return uuid.UUID(db_event.id)
 
     def get_session_events(self, session_id: uuid.UUID) -> list[Event]:
         """Get all events for a session.
@@ -135,6 +137,19 @@ class DatabaseManager:
         with self.get_session() as session:
             return session.query(Session).filter(Session.id == str(session_id)).first()
 
+    def get_session_workspace(self, session_id: uuid.UUID) -> Optional[str]:
+        """Get the workspace directory of a session.
+
+        Args:
+            session_id: The UUID of the session
+
+        Returns:
+            The workspace directory if the session exists, None otherwise
+        """
+        with self.get_session() as session:
+            db_session = session.query(Session).filter(Session.id == str(session_id)).first()
+            return db_session.workspace_dir if db_session is not None else None
+
     def get_session_by_device_id(self, device_id: str) -> Optional[Session]:
         """Get a session by its device ID.
 
@@ -1,8 +1,7 @@
+import asyncio
 import os
-
-import random
-import time
-from typing import Any, Tuple, cast
+from dataclasses import replace
+from typing import Any, AsyncIterator, Iterator, Tuple, cast
 import anthropic
 from anthropic import (
     NOT_GIVEN as Anthropic_NOT_GIVEN,
@@ -39,9 +38,11 @@ from anthropic.types.message_create_params import (
 )
 
 
+from boss_agent.core import cancellation
 from boss_agent.llm.base import (
     LLMClient,
     AssistantContentBlock,
+    BlockConversionCache,
     ToolParam,
     TextPrompt,
     ToolCall,
@@ -51,18 +52,34 @@ from boss_agent.llm.base import (
     UserContentBlock,
     recursively_remove_invoke_tag,
     ImageBlock,
+    SessionSummary,
+    StreamEvent,
 )
+from boss_agent.llm.client_registry import credential_key, shared_client
+from boss_agent.llm.rate_limit import RequestThrottle, estimate_tokens, get_retry_policy
 from boss_agent.utils.constants import DEFAULT_MODEL
 
 
+# Where prompt-caching breakpoints go when caching is enabled:
+# - "recent": on the last 4 messages.
+# - "incremental": on the system prompt (caching the tool definitions and the
+#   system prompt as a stable prefix), on the conversation summary, and on the last
+#   message of this request and of the previous one, so every request reads the
+#   prefix the previous request wrote and extends it.
+CACHE_LAYOUTS = ("recent", "incremental")
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
 class AnthropicDirectClient(LLMClient):
     """Use Anthropic models via first party API."""
 
     def __init__(
         self,
         model_name=DEFAULT_MODEL,
-        max_retries=2,
+        max_retries: int | None = None,
         use_caching=True,
+        cache_layout: str = "recent",
         thinking_tokens: int = 0,
         project_id: None | str = None,
         region: None | str = None,
@@ -70,30 +87,84 @@ class AnthropicDirectClient(LLMClient):
         """Initialize the Anthropic first party client."""
         # Disable retries since we are handling retries ourselves.
         if (project_id is not None) and (region is not None):
-            self.client = anthropic.AnthropicVertex(
-                project_id=project_id,
-                region=region,
-                timeout=60 * 5,
-                max_retries=1,
+            self.client, self.async_client = shared_client(
+                "anthropic-vertex",
+                (project_id, region),
+                lambda settings: (
+                    anthropic.AnthropicVertex(
+                        project_id=project_id,
+                        region=region,
+                        max_retries=0,
+                        **settings.sdk_client_kwargs(anthropic),
+                    ),
+                    anthropic.AsyncAnthropicVertex(
+                        project_id=project_id,
+                        region=region,
+                        max_retries=0,
+                        **settings.sdk_client_kwargs(anthropic, asynchronous=True),
+                    ),
+                ),
             )
         else:
             api_key = os.getenv("ANTHROPIC_API_KEY")
-            self.client = anthropic.Anthropic(
-                api_key=api_key, max_retries=1, timeout=60 * 5
+            self.client, self.async_client = shared_client(
+                "anthropic",
+                credential_key(api_key),
+                lambda settings: (
+                    anthropic.Anthropic(
+                        api_key=api_key,
+                        max_retries=0,
+                        **settings.sdk_client_kwargs(anthropic),
+                    ),
+                    anthropic.AsyncAnthropic(
+                        api_key=api_key,
+                        max_retries=0,
+                        **settings.sdk_client_kwargs(anthropic, asynchronous=True),
+                    ),
+                ),
             )
             model_name = model_name.replace(
                 "@", "-"
             )  # Quick fix for Anthropic Vertex API
         self.model_name = model_name
-        self.max_retries = max_retries
+        self.throttle = RequestThrottle(
+            "anthropic",
+            model_name,
+            None if max_retries is None else replace(get_retry_policy(), max_attempts=max_retries),
+        )
+        self.max_retries = self.throttle.max_attempts
         self.use_caching = use_caching
+        if cache_layout not in CACHE_LAYOUTS:
+            raise ValueError(f"Unknown cache layout {cache_layout!r}, expected one of {CACHE_LAYOUTS}")
+        self.cache_layout = cache_layout
         if "claude-opus-4" in model_name or "claude-sonnet-4" in model_name: #Use Interleaved Thinking for Sonnet 4 and Opus 4
             self.headers = {"anthropic-beta": "interleaved-thinking-2025-05-14,prompt-caching-2024-07-31"}
         else:
             self.headers = {"anthropic-beta": "prompt-caching-2024-07-31"}
         self.thinking_tokens = thinking_tokens
+        self._conversions = BlockConversionCache(
+            {
+                TextPrompt: lambda block: AnthropicTextBlock(type="text", text=block.text),
+                ImageBlock: lambda block: AnthropicImageBlockParam(type="image", source=block.source.to_dict()),
+                TextResult: lambda block: AnthropicTextBlock(type="text", text=block.text),
+                ToolCall: lambda block: AnthropicToolUseBlock(
+                    type="tool_use",
+                    id=block.tool_call_id,
+                    name=block.tool_name,
+                    input=block.tool_input,
+                ),
+                ToolFormattedResult: lambda block: AnthropicToolResultBlockParam(
+                    type="tool_result",
+                    tool_use_id=block.tool_call_id,
+                    content=block.plain_tool_output(),
+                ),
+                # Thinking blocks are sent back exactly as the model produced them.
+                AnthropicRedactedThinkingBlock: lambda block: block,
+                AnthropicThinkingBlock: lambda block: block,
+            }
+        )
 
-    def generate(
+    def _build_request(
         self,
         messages: LLMMessages,
         max_tokens: int,
@@ -102,84 +173,32 @@ class AnthropicDirectClient(LLMClient):
         tools: list[ToolParam] = [],
         tool_choice: dict[str, str] | None = None,
         thinking_tokens: int | None = None,
-    ) -> Tuple[list[AssistantContentBlock], dict[str, Any]]:
-        """Generate responses.
-
-        Args:
-            messages: A list of messages.
-            max_tokens: The maximum number of tokens to generate.
-            system_prompt: A system prompt.
-            temperature: The temperature.
-            tools: A list of tools.
-            tool_choice: A tool choice.
-
-        Returns:
-            A generated response.
-        """
-
+    ) -> dict[str, Any]:
+        """Build the keyword arguments shared by messages.create and messages.stream."""
         # Turn GeneralContentBlock into Anthropic message format
+        self._conversions.new_request()
         anthropic_messages = []
+        summary_position: int | None = None
         for idx, message_list in enumerate(messages):
+            # Session summaries are bookkeeping for the agent and are not sent to the model.
+            message_list = [
+                message for message in message_list if not isinstance(message, SessionSummary)
+            ]
+            if not message_list:
+                continue
             role = (
                 "user" if isinstance(message_list[0], UserContentBlock) else "assistant"
             )
-            message_content_list = []
-            for message in message_list:
-                # Check string type to avoid import issues particularly with reloads.
-                if str(type(message)) == str(TextPrompt):
-                    message = cast(TextPrompt, message)
-                    message_content = AnthropicTextBlock(
-                        type="text",
-                        text=message.text,
-                    )
-                elif str(type(message)) == str(ImageBlock):
-                    message = cast(ImageBlock, message)
-                    message_content = AnthropicImageBlockParam(
-                        type="image",
-                        source=message.source,
-                    )
-                elif str(type(message)) == str(TextResult):
-                    message = cast(TextResult, message)
-                    message_content = AnthropicTextBlock(
-                        type="text",
-                        text=message.text,
-                    )
-                elif str(type(message)) == str(ToolCall):
-                    message = cast(ToolCall, message)
-                    message_content = AnthropicToolUseBlock(
-                        type="tool_use",
-                        id=message.tool_call_id,
-                        name=message.tool_name,
-                        input=message.tool_input,
-                    )
-                elif str(type(message)) == str(ToolFormattedResult):
-                    message = cast(ToolFormattedResult, message)
-                    message_content = AnthropicToolResultBlockParam(
-                        type="tool_result",
-                        tool_use_id=message.tool_call_id,
-                        content=message.tool_output,
-                    )
-                elif str(type(message)) == str(AnthropicRedactedThinkingBlock):
-                    message = cast(AnthropicRedactedThinkingBlock, message)
-                    message_content = message
-                elif str(type(message)) == str(AnthropicThinkingBlock):
-                    message = cast(AnthropicThinkingBlock, message)
-                    message_content = message
-                else:
-                    print(
-                        f"Unknown message type: {type(message)}, expected one of {str(TextPrompt)}, {str(TextResult)}, {str(ToolCall)}, {str(ToolFormattedResult)}"
-                    )
-                    raise ValueError(
-                        f"Unknown message type: {type(message)}, expected one of {str(TextPrompt)}, {str(TextResult)}, {str(ToolCall)}, {str(ToolFormattedResult)}"
-                    )
-                message_content_list.append(message_content)
+            message_content_list = [self._conversions.convert(message) for message in message_list]
 
             # Anthropic supports up to 4 cache breakpoints, so we put them on the last 4 messages.
-            if self.use_caching and idx >= len(messages) - 4:
-                if isinstance(message_content_list[-1], dict):
-                    message_content_list[-1]["cache_control"] = {"type": "ephemeral"}
-                else:
-                    message_content_list[-1].cache_control = {"type": "ephemeral"}
+            if self.use_caching and self.cache_layout == "recent" and idx >= len(messages) - 4:
+                message_content_list[-1] = _with_cache_control(message_content_list[-1])
+            if (
+                isinstance(message_list[0], TextResult)
+                and message_list[0].text.startswith("Conversation Summary:")
+            ):
+                summary_position = len(anthropic_messages)
 
             anthropic_messages.append(
                 {
@@ -188,6 +207,14 @@ class AnthropicDirectClient(LLMClient):
                 }
             )
 
+        if self.use_caching and self.cache_layout == "incremental":
+            # The last message of the previous request sits two messages back
+            # (before the assistant reply and the new user turn).
+            for position in {summary_position, len(anthropic_messages) - 3, len(anthropic_messages) - 1}:
+                if position is not None and position >= 0:
+                    content = anthropic_messages[position]["content"]
+                    content[-1] = _with_cache_control(content[-1])
+
         if self.use_caching:
             extra_headers = self.headers
         else:
@@ -219,7 +246,14 @@ class AnthropicDirectClient(LLMClient):
                 for tool in tools
             ]
 
-        response = None
+        system: Any = system_prompt or Anthropic_NOT_GIVEN
+        if self.use_caching and self.cache_layout == "incremental":
+            # Tools precede the system prompt in the cached prefix, so one breakpoint
+            # after the system prompt covers both.
+            if system_prompt:
+                system = [{"type": "text", "text": system_prompt, "cache_control": dict(CACHE_CONTROL)}]
+            elif tools:
+                tool_params[-1]["cache_control"] = dict(CACHE_CONTROL)
 
         if thinking_tokens is None:
             thinking_tokens = self.thinking_tokens
@@ -231,19 +265,58 @@ class AnthropicDirectClient(LLMClient):
         else:
             extra_body = None
 
+        return dict(
+            max_tokens=max_tokens,
+            messages=anthropic_messages,
+            model=self.model_name,
+            temperature=temperature,
+            system=system,
+            tool_choice=tool_choice_param,  # type: ignore
+            tools=tool_params,
+            extra_headers=extra_headers,
+            extra_body=extra_body,
+        )
+
+    def generate(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> Tuple[list[AssistantContentBlock], dict[str, Any]]:
+        """Generate responses.
+
+        Args:
+            messages: A list of messages.
+            max_tokens: The maximum number of tokens to generate.
+            system_prompt: A system prompt.
+            temperature: The temperature.
+            tools: A list of tools.
+            tool_choice: A tool choice.
+
+        Returns:
+            A generated response.
+        """
+        request = self._build_request(
+            messages,
+            max_tokens,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            tools=tools,
+            tool_choice=tool_choice,
+            thinking_tokens=thinking_tokens,
+        )
+        tokens = estimate_tokens(messages, system_prompt)
+
+        response = None
         for retry in range(self.max_retries):
             try:
-                response = self.client.messages.create(  # type: ignore
-                    max_tokens=max_tokens,
-                    messages=anthropic_messages,
-                    model=self.model_name,
-                    temperature=temperature,
-                    system=system_prompt or Anthropic_NOT_GIVEN,
-                    tool_choice=tool_choice_param,  # type: ignore
-                    tools=tool_params,
-                    extra_headers=extra_headers,
-                    extra_body=extra_body,
-                )
+                cancellation.raise_if_cancelled()
+                self.throttle.limiter.acquire(tokens)
+                response = self.client.messages.create(**request, **cancellation.timeout_kwargs())  # type: ignore
                 break
             except (
                 AnthropicAPIConnectionError,
@@ -255,15 +328,195 @@ class AnthropicDirectClient(LLMClient):
                     print(f"Failed Anthropic request after {retry + 1} retries")
                     raise e
                 else:
-                    print(f"Retrying LLM request: {retry + 1}/{self.max_retries}")
-                    # Sleep 12-18 seconds with jitter to avoid thundering herd.
-                    time.sleep(15 * random.uniform(0.8, 1.2))
+                    cancellation.sleep(self.throttle.backoff(retry, e))
             except Exception as e:
                 raise e
 
+        assert response is not None
+        content, metadata = self._parse_response(response)
+        self.throttle.limiter.settle(tokens, metadata)
+        return content, metadata
+
+    def generate_stream(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> Iterator[StreamEvent]:
+        """Stream a response as text/thinking deltas followed by the full message."""
+        request = self._build_request(
+            messages,
+            max_tokens,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            tools=tools,
+            tool_choice=tool_choice,
+            thinking_tokens=thinking_tokens,
+        )
+        tokens = estimate_tokens(messages, system_prompt)
+
+        response = None
+        for retry in range(self.max_retries):
+            emitted = False
+            try:
+                cancellation.raise_if_cancelled()
+                self.throttle.limiter.acquire(tokens)
+                with (
+                    self.client.messages.stream(**request, **cancellation.timeout_kwargs()) as stream,  # type: ignore
+                    # Closing the stream aborts the blocking read and frees the connection.
+                    cancellation.on_cancel(stream.close),
+                ):
+                    for event in stream:
+                        stream_event = self._to_stream_event(
+                            event, stream.current_message_snapshot
+                        )
+                        if stream_event is not None:
+                            emitted = True
+                            yield stream_event
+                    response = stream.get_final_message()
+                break
+            except (
+                AnthropicAPIConnectionError,
+                AnthropicInternalServerError,
+                AnthropicRateLimitError,
+                AnthropicOverloadedError,
+            ) as e:
+                # Deltas already handed to the caller cannot be taken back.
+                if emitted or retry == self.max_retries - 1:
+                    print(f"Failed Anthropic request after {retry + 1} retries")
+                    raise e
+                else:
+                    cancellation.sleep(self.throttle.backoff(retry, e))
+
+        assert response is not None
+        content, metadata = self._parse_response(response)
+        self.throttle.limiter.settle(tokens, metadata)
+        yield StreamEvent(type="message", content=content, metadata=metadata)
+
+    async def agenerate(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> Tuple[list[AssistantContentBlock], dict[str, Any]]:
+        """Async variant of ``generate`` on the async Anthropic client."""
+        request = self._build_request(
+            messages,
+            max_tokens,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            tools=tools,
+            tool_choice=tool_choice,
+            thinking_tokens=thinking_tokens,
+        )
+        tokens = estimate_tokens(messages, system_prompt)
+
+        response = None
+        for retry in range(self.max_retries):
+            try:
+                await self.throttle.limiter.aacquire(tokens)
+                response = await self.async_client.messages.create(**request, **cancellation.timeout_kwargs())  # type: ignore
+                break
+            except (
+                AnthropicAPIConnectionError,
+                AnthropicInternalServerError,
+                AnthropicRateLimitError,
+                AnthropicOverloadedError,
+            ) as e:
+                if retry == self.max_retries - 1:
+                    print(f"Failed Anthropic request after {retry + 1} retries")
+                    raise e
+                else:
+                    await asyncio.sleep(self.throttle.backoff(retry, e))
+
+        assert response is not None
+        content, metadata = self._parse_response(response)
+        self.throttle.limiter.settle(tokens, metadata)
+        return content, metadata
+
+    async def agenerate_stream(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> AsyncIterator[StreamEvent]:
+        """Async variant of ``generate_stream`` on the async Anthropic client."""
+        request = self._build_request(
+            messages,
+            max_tokens,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            tools=tools,
+            tool_choice=tool_choice,
+            thinking_tokens=thinking_tokens,
+        )
+        tokens = estimate_tokens(messages, system_prompt)
+
+        response = None
+        for retry in range(self.max_retries):
+            emitted = False
+            try:
+                await self.throttle.limiter.aacquire(tokens)
+                async with self.async_client.messages.stream(**request, **cancellation.timeout_kwargs()) as stream:  # type: ignore
+                    async for event in stream:
+                        stream_event = self._to_stream_event(
+                            event, stream.current_message_snapshot
+                        )
+                        if stream_event is not None:
+                            emitted = True
+                            yield stream_event
+                    response = await stream.get_final_message()
+                break
+            except (
+                AnthropicAPIConnectionError,
+                AnthropicInternalServerError,
+                AnthropicRateLimitError,
+                AnthropicOverloadedError,
+            ) as e:
+                if emitted or retry == self.max_retries - 1:
+                    print(f"Failed Anthropic request after {retry + 1} retries")
+                    raise e
+                else:
+                    await asyncio.sleep(self.throttle.backoff(retry, e))
+
+        assert response is not None
+        content, metadata = self._parse_response(response)
+        self.throttle.limiter.settle(tokens, metadata)
+        yield StreamEvent(type="message", content=content, metadata=metadata)
+
+    def _to_stream_event(self, event: Any, snapshot: Any) -> StreamEvent | None:
+        """Map one event of a messages.stream to a StreamEvent, if it carries one."""
+        if event.type == "text":
+            return StreamEvent(type="text_delta", text=event.text)
+        if event.type == "thinking":
+            return StreamEvent(type="thinking_delta", text=event.thinking)
+        if event.type == "content_block_stop":
+            block = snapshot.content[event.index]
+            if str(type(block)) == str(AnthropicToolUseBlock):
+                return StreamEvent(
+                    type="tool_call",
+                    tool_call=self._to_tool_call(cast(AnthropicToolUseBlock, block)),
+                )
+        return None
+
+    def _parse_response(
+        self, response: Any
+    ) -> Tuple[list[AssistantContentBlock], dict[str, Any]]:
+        """Convert an Anthropic message into internal blocks and usage metadata."""
         # Convert messages back to internal format
         internal_messages = []
-        assert response is not None
         for message in response.content:
             if "</invoke>" in str(message):
                 warning_msg = "\n".join(
@@ -281,13 +534,7 @@ class AnthropicDirectClient(LLMClient):
                 internal_messages.append(message)
             elif str(type(message)) == str(AnthropicToolUseBlock):
                 message = cast(AnthropicToolUseBlock, message)
-                internal_messages.append(
-                    ToolCall(
-                        tool_call_id=message.id,
-                        tool_name=message.name,
-                        tool_input=recursively_remove_invoke_tag(message.input),
-                    )
-                )
+                internal_messages.append(self._to_tool_call(message))
             else:
                 raise ValueError(f"Unknown message type: {type(message)}")
 
@@ -304,3 +551,23 @@ class AnthropicDirectClient(LLMClient):
         }
 
         return internal_messages, message_metadata
+
+    def _to_tool_call(self, block: AnthropicToolUseBlock) -> ToolCall:
+        return ToolCall(
+            tool_call_id=block.id,
+            tool_name=block.name,
+            tool_input=recursively_remove_invoke_tag(block.input),
+        )
+
+
+def _with_cache_control(block: Any) -> Any:
+    """A copy of ``block`` marked as a cache breakpoint.
+
+    Converted blocks are shared between requests (and thinking blocks are the history's
+    own objects), so the breakpoint must not be set on the block itself.
+    """
+    if isinstance(block, dict):
+        return {**block, "cache_control": dict(CACHE_CONTROL)}
+    block = block.model_copy()
+    block.cache_control = dict(CACHE_CONTROL)
+    return block
@@ -1,7 +1,13 @@
 from abc import ABC, abstractmethod
+import asyncio
+import base64
+import binascii
 import json
-from dataclasses import dataclass
-from typing import Any, Tuple
+import sys
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass, field, fields
+from typing import Any, AsyncIterator, Callable, Iterator, Tuple
 from dataclasses_json import DataClassJsonMixin
 from anthropic.types import (
     ThinkingBlock as AnthropicThinkingBlock,
@@ -9,6 +15,9 @@ from anthropic.types import (
 )
 from typing import Literal
 
+from boss_agent.core import tracing
+from boss_agent.llm.token_counter import ImageMetadata
+
 
 import logging
 
@@ -31,14 +40,120 @@ class ToolParam(DataClassJsonMixin):
     input_schema: dict[str, Any]
 
 
-@dataclass
-class ToolCall(DataClassJsonMixin):
+# Field metadata of derived fields that ``ContentBlock.to_dict`` leaves out.
+NOT_SERIALIZED = {"not_serialized": True}
+
+
+class ContentBlock:
+    """Base of the blocks a conversation history is made of.
+
+    Blocks are frozen, slotted dataclasses: a history holds many of them for as long
+    as its session lives, and clients cache their converted form by identity (see
+    ``BlockConversionCache``), which relies on blocks never changing.
+    """
+
+    __slots__ = ()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            block_field.name: _to_plain(getattr(self, block_field.name))
+            for block_field in fields(self)  # type: ignore[arg-type]
+            if not block_field.metadata.get("not_serialized")
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]):
+        return cls(
+            **{
+                block_field.name: data[block_field.name]
+                for block_field in fields(cls)  # type: ignore[arg-type]
+                if block_field.name in data and not block_field.metadata.get("not_serialized")
+            }
+        )
+
+    def to_json(self, **kwargs: Any) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+
+def _to_plain(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {key: _to_plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_to_plain(item) for item in value]
+    return value
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class ImageSource(Mapping):
+    """An image ``source`` dict as the providers take it, with compact base64 data.
+
+    Base64 ``data`` is kept as the raw bytes it encodes, a quarter smaller, and is
+    encoded again each time it is read. Request builders encode it once per block
+    with ``to_dict`` and keep the result in their ``BlockConversionCache``. Other
+    sources (e.g. URLs) and data that is not valid base64 are kept as given.
+    """
+
+    __slots__ = ("raw", "_items")
+
+    def __init__(self, source: Mapping[str, Any]):
+        items = dict(source)
+        self.raw: bytes | None = None
+        data = items.get("data")
+        if items.get("type") == "base64" and isinstance(data, str):
+            try:
+                self.raw = base64.b64decode(data, validate=True)
+                del items["data"]
+            except binascii.Error:
+                pass
+        self._items = items
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "data" and self.raw is not None:
+            return base64.b64encode(self.raw).decode("ascii")
+        return self._items[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._items
+        if self.raw is not None:
+            yield "data"
+
+    def __len__(self) -> int:
+        return len(self._items) + (self.raw is not None)
+
+    def to_dict(self) -> dict[str, Any]:
+        """The plain source dict, with ``data`` encoded as base64."""
+        if self.raw is None:
+            return dict(self._items)
+        return {**self._items, "data": base64.b64encode(self.raw).decode("ascii")}
+
+    def metadata(self) -> ImageMetadata:
+        """The measured image, read from the raw bytes when there are any."""
+        if self.raw is not None:
+            return ImageMetadata.from_bytes(self.raw)
+        return ImageMetadata.from_source(self._items)
+
+    def __repr__(self) -> str:
+        if self.raw is None:
+            return f"ImageSource({self._items!r})"
+        return f"ImageSource({self._items!r}, {len(self.raw)} bytes)"
+
+
+@dataclass(frozen=True, slots=True)
+class ToolCall(ContentBlock):
     """Internal representation of LLM-generated tool call."""
 
     tool_call_id: str
     tool_name: str
     tool_input: Any
 
+    def __post_init__(self):
+        # Tool names repeat across a session and every ID appears in a call and its result.
+        object.__setattr__(self, "tool_call_id", _intern(self.tool_call_id))
+        object.__setattr__(self, "tool_name", _intern(self.tool_name))
+
     def __str__(self) -> str:
         return f"{self.tool_name} with input: {self.tool_input}"
 
@@ -52,13 +167,40 @@ class ToolResult(DataClassJsonMixin):
     tool_output: Any
 
 
-@dataclass
-class ToolFormattedResult(DataClassJsonMixin):
+@dataclass(frozen=True, slots=True)
+class ToolFormattedResult(ContentBlock):
     """Internal representation of formatted LLM tool result."""
 
     tool_call_id: str
     tool_name: str
+    # Image items of a list are stored with their source as an ImageSource.
     tool_output: list[dict[str, Any]] | str
+    # Measured images of tool_output, in order.
+    image_metadata: list[ImageMetadata] = field(
+        default_factory=list, compare=False, repr=False, metadata=NOT_SERIALIZED
+    )
+
+    def __post_init__(self):
+        object.__setattr__(self, "tool_call_id", _intern(self.tool_call_id))
+        object.__setattr__(self, "tool_name", _intern(self.tool_name))
+        if isinstance(self.tool_output, list):
+            tool_output = [_with_image_source(item) for item in self.tool_output]
+            object.__setattr__(self, "tool_output", tool_output)
+            if not self.image_metadata:
+                object.__setattr__(
+                    self,
+                    "image_metadata",
+                    [item["source"].metadata() for item in tool_output if _is_image_item(item)],
+                )
+
+    def plain_tool_output(self) -> list[dict[str, Any]] | str:
+        """``tool_output`` as the providers take it, with image data encoded as base64."""
+        if isinstance(self.tool_output, str):
+            return self.tool_output
+        return [
+            {**item, "source": item["source"].to_dict()} if _is_image_item(item) else item
+            for item in self.tool_output
+        ]
 
     def __str__(self) -> str:
         if isinstance(self.tool_output, list):
@@ -83,17 +225,41 @@ class ToolFormattedResult(DataClassJsonMixin):
             return f"Name: {self.tool_name}\nOutput: {self.tool_output}"
 
 
-@dataclass
-class TextPrompt(DataClassJsonMixin):
+def _is_image_item(item: Any) -> bool:
+    return isinstance(item, dict) and item.get("type") == "image" and isinstance(item.get("source"), ImageSource)
+
+
+def _with_image_source(item: Any) -> Any:
+    """A tool output item, with the source of an image as an ImageSource."""
+    if (
+        isinstance(item, dict)
+        and item.get("type") == "image"
+        and isinstance(item.get("source"), Mapping)
+        and not isinstance(item["source"], ImageSource)
+    ):
+        return {**item, "source": ImageSource(item["source"])}
+    return item
+
+
+@dataclass(frozen=True, slots=True)
+class TextPrompt(ContentBlock):
     """Internal representation of user-generated text prompt."""
 
     text: str
 
 
-@dataclass
-class ImageBlock(DataClassJsonMixin):
+@dataclass(frozen=True, slots=True)
+class ImageBlock(ContentBlock):
     type: Literal["image"]
-    source: dict[str, Any]
+    # Given as a source dict, stored as an ImageSource.
+    source: ImageSource
+    metadata: ImageMetadata | None = field(default=None, compare=False, repr=False, metadata=NOT_SERIALIZED)
+
+    def __post_init__(self):
+        if not isinstance(self.source, ImageSource):
+            object.__setattr__(self, "source", ImageSource(self.source))
+        if self.metadata is None:
+            object.__setattr__(self, "metadata", self.source.metadata())
 
     def __str__(self) -> str:
         source = self.source
@@ -107,13 +273,20 @@ class ImageBlock(DataClassJsonMixin):
             return f"[Image attached - {media_type}, source: {source_type}]"
 
 
-@dataclass
-class TextResult(DataClassJsonMixin):
+@dataclass(frozen=True, slots=True)
+class TextResult(ContentBlock):
     """Internal representation of LLM-generated text result."""
 
     text: str
 
 
+@dataclass(frozen=True, slots=True)
+class SessionSummary(ContentBlock):
+    """Internal representation of a summary of the session so far."""
+
+    text: str
+
+
 AssistantContentBlock = (
     TextResult | ToolCall | AnthropicRedactedThinkingBlock | AnthropicThinkingBlock
 )
@@ -122,9 +295,46 @@ GeneralContentBlock = UserContentBlock | AssistantContentBlock
 LLMMessages = list[list[GeneralContentBlock]]
 
 
+@dataclass
+class StreamEvent:
+    """One event of a streamed LLM response.
+
+    ``text_delta`` and ``thinking_delta`` events carry a piece of text as soon as the
+    provider produces it. A ``tool_call`` event carries a tool call as soon as its
+    input is complete, which may be well before the model finishes its turn. The
+    stream always ends with a single ``message`` event whose ``content`` and
+    ``metadata`` are what ``generate`` would have returned (including every tool call
+    already announced by a ``tool_call`` event).
+    """
+
+    type: Literal["text_delta", "thinking_delta", "tool_call", "message"]
+    text: str = ""
+    tool_call: ToolCall | None = None
+    content: list[AssistantContentBlock] | None = None
+    metadata: dict[str, Any] | None = None
+
+
+def _llm_span_attributes(client: "LLMClient", messages=None, *args, **kwargs) -> dict[str, Any]:
+    return {
+        "client": type(client).__name__,
+        "model": getattr(client, "model_name", None),
+        "message_turns": len(messages) if messages is not None else None,
+    }
+
+
 class LLMClient(ABC):
     """A client for LLM APIs for the use in agents."""
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every model call is timed, whichever client implements it.
+        for method_name in ("generate", "agenerate", "generate_stream", "agenerate_stream"):
+            method = cls.__dict__.get(method_name)
+            if method is not None and not getattr(method, "_traced", False):
+                wrapped = tracing.traced(f"llm.{method_name}", _llm_span_attributes)(method)
+                wrapped._traced = True
+                setattr(cls, method_name, wrapped)
+
     @abstractmethod
     def generate(
         self,
@@ -151,6 +361,148 @@ class LLMClient(ABC):
         """
         raise NotImplementedError
 
+    def generate_stream(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> Iterator[StreamEvent]:
+        """Generate a response as a stream of events.
+
+        Takes the same arguments as ``generate``. Clients without native streaming
+        support fall back to a single ``generate`` call, replayed as one delta per
+        text block followed by the final ``message`` event.
+        """
+        content, metadata = self.generate(
+            messages=messages,
+            max_tokens=max_tokens,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            tools=tools,
+            tool_choice=tool_choice,
+            thinking_tokens=thinking_tokens,
+        )
+        for block in content:
+            if isinstance(block, TextResult):
+                yield StreamEvent(type="text_delta", text=block.text)
+        yield StreamEvent(type="message", content=content, metadata=metadata)
+
+    async def agenerate(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> Tuple[list[AssistantContentBlock], dict[str, Any]]:
+        """Async variant of ``generate``.
+
+        Clients with an async SDK override this; the default runs ``generate`` in a
+        worker thread so that it never blocks the event loop.
+        """
+        return await asyncio.to_thread(
+            self.generate,
+            messages=messages,
+            max_tokens=max_tokens,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            tools=tools,
+            tool_choice=tool_choice,
+            thinking_tokens=thinking_tokens,
+        )
+
+    async def agenerate_stream(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> AsyncIterator[StreamEvent]:
+        """Async variant of ``generate_stream``, with the same fallback behaviour."""
+        content, metadata = await self.agenerate(
+            messages=messages,
+            max_tokens=max_tokens,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            tools=tools,
+            tool_choice=tool_choice,
+            thinking_tokens=thinking_tokens,
+        )
+        for block in content:
+            if isinstance(block, TextResult):
+                yield StreamEvent(type="text_delta", text=block.text)
+        yield StreamEvent(type="message", content=content, metadata=metadata)
+
+
+class BlockConversionCache:
+    """Provider form of history blocks, converted once and reused across requests.
+
+    Blocks do not change once they are in the history, so the converted form of a
+    block is cached by block identity and each request only converts the blocks that
+    are new since the last one. ``converters`` maps block types to conversion
+    functions; a type missing from it is looked up by name, as a class reloaded
+    since the table was built is a different object with the same name.
+
+    Entries live in two generations: ``new_request`` starts a new one, and a block
+    not used by the request before or the current one is dropped. That keeps the
+    blocks of an interleaved request, such as a background summary, from evicting
+    the agent's history.
+    """
+
+    def __init__(self, converters: dict[type, Callable[[Any], Any]]):
+        self._converters = dict(converters)
+        self._converters_by_name = {_type_name(block_type): convert for block_type, convert in converters.items()}
+        self._lock = threading.Lock()
+        # id(block) -> (block, converted); holding the block keeps its id from being reused.
+        self._current: dict[int, tuple[Any, Any]] = {}
+        self._previous: dict[int, tuple[Any, Any]] = {}
+
+    def new_request(self):
+        with self._lock:
+            self._previous = self._current
+            self._current = {}
+
+    def convert(self, block: Any) -> Any:
+        """The converted form of ``block``; raises ValueError for an unknown type."""
+        key = id(block)
+        with self._lock:
+            entry = self._current.get(key) or self._previous.pop(key, None)
+            if entry is not None and entry[0] is block:
+                self._current[key] = entry
+                return entry[1]
+        converted = self._converter(block)(block)
+        with self._lock:
+            self._current[key] = (block, converted)
+        return converted
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._current.keys() | self._previous.keys())
+
+    def _converter(self, block: Any) -> Callable[[Any], Any]:
+        convert = self._converters.get(type(block))
+        if convert is None:
+            convert = self._converters_by_name.get(_type_name(type(block)))
+        if convert is None:
+            raise ValueError(
+                f"Unknown message type: {type(block)}, expected one of "
+                f"{', '.join(_type_name(block_type) for block_type in self._converters)}"
+            )
+        return convert
+
+
+def _type_name(block_type: type) -> str:
+    return f"{block_type.__module__}.{block_type.__qualname__}"
+
 
 def recursively_remove_invoke_tag(obj):
     """Recursively remove the </invoke> tag from a dictionary or list."""
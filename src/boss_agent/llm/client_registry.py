@@ -0,0 +1,165 @@
+"""Process-wide registry of provider SDK clients, so sessions share HTTP connection pools.
+
+Every ``LLMClient`` (one or more per session) used to build its own
+``anthropic.Anthropic``, ``openai.OpenAI`` or ``genai.Client``, each with a fresh
+connection pool, so every session paid new TLS handshakes. The SDK clients are
+stateless apart from their pool, so they are now created once per provider endpoint
+and credentials and shared; the ``LLMClient`` wrappers, which hold per-session state
+such as the block conversion cache, stay per session.
+
+Pool sizes and timeouts come from the ``[llm]`` section of config.ini, see
+``configure_from_config``; they apply to SDK clients created afterwards.
+
+Async SDK clients are shared too, which assumes the process runs one event loop (as
+the websocket server and the CLI do).
+"""
+
+import configparser
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Any, Callable, Hashable, Optional, TypeVar
+
+import httpx
+
+from boss_agent.utils.constants import (
+    LLM_CONNECT_TIMEOUT_SECONDS,
+    LLM_KEEPALIVE_EXPIRY_SECONDS,
+    LLM_POOL_MAX_CONNECTIONS,
+    LLM_POOL_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_REQUEST_TIMEOUT_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class HttpPoolSettings:
+    """Connection pool limits and timeouts of the shared SDK clients."""
+
+    max_connections: int = LLM_POOL_MAX_CONNECTIONS
+    max_keepalive_connections: int = LLM_POOL_MAX_KEEPALIVE_CONNECTIONS
+    keepalive_expiry: float = LLM_KEEPALIVE_EXPIRY_SECONDS
+    timeout: float = LLM_REQUEST_TIMEOUT_SECONDS
+    connect_timeout: float = LLM_CONNECT_TIMEOUT_SECONDS
+
+    def limits(self, limits_type: type = httpx.Limits) -> Any:
+        return limits_type(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeouts(self, timeout_type: type = httpx.Timeout) -> Any:
+        return timeout_type(self.timeout, connect=self.connect_timeout)
+
+    def sdk_client_kwargs(
+        self, sdk: ModuleType, asynchronous: bool = False
+    ) -> dict[str, Any]:
+        """``timeout`` and ``http_client`` arguments for an ``anthropic`` or ``openai`` client.
+
+        These SDKs may bundle their own copy of httpx, so the limits and timeouts are
+        built from the types the SDK exports.
+        """
+        http_client_type = (
+            sdk.DefaultAsyncHttpxClient if asynchronous else sdk.DefaultHttpxClient
+        )
+        return {
+            "timeout": self.timeouts(sdk.Timeout),
+            "http_client": http_client_type(
+                limits=self.limits(type(sdk.DEFAULT_CONNECTION_LIMITS))
+            ),
+        }
+
+
+class ClientRegistry:
+    """SDK clients by (provider, key), created on first use by a factory."""
+
+    def __init__(self, settings: Optional[HttpPoolSettings] = None):
+        self.settings = settings or HttpPoolSettings()
+        self._clients: dict[tuple[str, Hashable], Any] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self, provider: str, key: Hashable, factory: Callable[[HttpPoolSettings], T]
+    ) -> T:
+        """The client for ``provider`` and ``key``, calling ``factory(settings)`` the first time."""
+        with self._lock:
+            registry_key = (provider, key)
+            client = self._clients.get(registry_key)
+            if client is None:
+                client = factory(self.settings)
+                self._clients[registry_key] = client
+                logger.info(
+                    f"Created shared {provider} client ({len(self._clients)} in total)"
+                )
+            return client
+
+    def configure(self, settings: HttpPoolSettings):
+        with self._lock:
+            self.settings = settings
+
+    def clear(self):
+        """Forget all clients; the next ``get`` of each key creates a new one."""
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+_registry = ClientRegistry()
+
+
+def shared_client(
+    provider: str, key: Hashable, factory: Callable[[HttpPoolSettings], T]
+) -> T:
+    """The process-wide client for ``provider`` and ``key``, see ``ClientRegistry.get``.
+
+    ``key`` must identify the endpoint and credentials; pass secrets through
+    ``credential_key`` rather than as they are.
+    """
+    return _registry.get(provider, key, factory)
+
+
+def credential_key(secret: Optional[str]) -> str:
+    """A digest identifying ``secret`` in a registry key without keeping it there."""
+    if not secret:
+        return ""
+    return hashlib.sha256(secret.encode()).hexdigest()[:16]
+
+
+def get_registry() -> ClientRegistry:
+    return _registry
+
+
+def configure(settings: HttpPoolSettings):
+    _registry.configure(settings)
+
+
+def configure_from_config(config: configparser.ConfigParser) -> HttpPoolSettings:
+    """Configure the pools from the ``[llm]`` section, falling back to the defaults."""
+    defaults = HttpPoolSettings()
+    settings = HttpPoolSettings(
+        max_connections=config.getint(
+            "llm", "pool_max_connections", fallback=defaults.max_connections
+        ),
+        max_keepalive_connections=config.getint(
+            "llm",
+            "pool_max_keepalive_connections",
+            fallback=defaults.max_keepalive_connections,
+        ),
+        keepalive_expiry=config.getfloat(
+            "llm", "pool_keepalive_expiry", fallback=defaults.keepalive_expiry
+        ),
+        timeout=config.getfloat("llm", "request_timeout", fallback=defaults.timeout),
+        connect_timeout=config.getfloat(
+            "llm", "connect_timeout", fallback=defaults.connect_timeout
+        ),
+    )
+    configure(settings)
+    return settings
@@ -1,7 +1,8 @@
 import json
 import logging
 from abc import ABC, abstractmethod
-from typing import final
+from typing import Any, Optional, final
+from boss_agent.core import tracing
 from boss_agent.llm.base import (
     GeneralContentBlock,
     TextPrompt,
@@ -9,6 +10,8 @@ from boss_agent.llm.base import (
     ToolCall,
     ToolFormattedResult,
     ImageBlock,
+    SessionSummary,
+    ToolParam,
 )
 from boss_agent.llm.token_counter import TokenCounter
 from boss_agent.llm.base import (
@@ -30,76 +33,194 @@ class ContextManager(ABC):
         self.token_counter = token_counter
         self.logger = logger
         self._token_budget = token_budget
+        # Model whose reported usage calibrates the estimates, see ``record_usage``.
+        self._model: Optional[str] = None
+        # Estimated tokens of the system prompt and tool definitions sent with every
+        # request, see ``set_request_overhead``.
+        self._request_overhead_tokens = 0
+        self._request_overhead_key: Optional[tuple] = None
 
     @property
     def token_budget(self) -> int:
         """Return the token budget."""
         return self._token_budget
 
+    def set_request_overhead(self, system_prompt: Optional[str], tool_definitions: list[ToolParam]):
+        """Account for the system prompt and tool definitions sent alongside the history.
+
+        The tools are counted by the schema the provider receives, not their repr.
+        """
+        key = (system_prompt, id(tool_definitions), len(tool_definitions))
+        if key == self._request_overhead_key:
+            return
+        overhead = self.token_counter.count_tokens(system_prompt or "")
+        if tool_definitions:
+            overhead += self.token_counter.count_tokens(json.dumps([tool.to_dict() for tool in tool_definitions]))
+        self._request_overhead_tokens = overhead
+        self._request_overhead_key = key
+
+    def estimate_request_tokens(self, token_count: int) -> int:
+        """Estimated input tokens of a request whose history has ``token_count`` raw tokens.
+
+        Adds the system prompt and tool definitions and applies the correction factor
+        learned from the model's reported usage.
+        """
+        return self.token_counter.calibrate(token_count + self._request_overhead_tokens, self._model)
+
+    def record_usage(self, model: str, token_count: int, metadata: dict) -> Optional[float]:
+        """Calibrate the estimates with the input token count a provider reported.
+
+        ``token_count`` is the raw token count of the history that was sent. Returns
+        the relative error of the estimate for that request, or None if ``metadata``
+        has no usable count.
+        """
+        actual_tokens = metadata.get("input_tokens", -1)
+        if actual_tokens is None or actual_tokens < 0:
+            return None
+        # Anthropic reports cached prompt tokens separately from input_tokens.
+        for key in ("cache_creation_input_tokens", "cache_read_input_tokens"):
+            actual_tokens += max(metadata.get(key) or 0, 0)
+        self._model = model
+        return self.token_counter.record_usage(
+            model, token_count + self._request_overhead_tokens, actual_tokens
+        )
+
+    def estimate_error(self) -> Optional[float]:
+        """Mean absolute relative error of the request token estimates so far."""
+        return self.token_counter.estimate_error(self._model)
+
     def count_tokens(self, message_lists: list[list[GeneralContentBlock]]) -> int:
         """Counts tokens, ignoring thinking blocks except in the very last message."""
         total_tokens = 0
-        num_turns = len(message_lists)
-        for i, message_list in enumerate(message_lists):
-            is_last_turn = i == num_turns - 1
-            for message in message_list:
-                if isinstance(message, (TextPrompt, TextResult)):
-                    total_tokens += self.token_counter.count_tokens(message.text)
-                elif isinstance(message, ToolFormattedResult):
-                    # Count truncated output if already truncated
-                    total_tokens += self.token_counter.count_tokens(message.tool_output)
-                elif isinstance(message, ToolCall):
-                    # Basic counting of input JSON
-                    try:
-                        input_str = json.dumps(message.tool_input)
-                        total_tokens += self.token_counter.count_tokens(input_str)
-                    except TypeError:
-                        self.logger.warning(
-                            f"Could not serialize tool input for token counting: {message.tool_input}"
-                        )
-                        total_tokens += 100  # Add arbitrary penalty
-                elif isinstance(message, ImageBlock):
-                    # Images are expensive - assign a reasonable token count
-                    # Typical image tokens range from 85-1700+ depending on size and detail
-                    # Using a conservative estimate of 1000 tokens per image
-                    total_tokens += 1000
-                elif isinstance(message, AnthropicRedactedThinkingBlock):
-                    pass  # Always 0 tokens
-                elif isinstance(message, AnthropicThinkingBlock):
-                    # Only count thinking if it's in the very last message list
-                    if is_last_turn:
-                        total_tokens += self.token_counter.count_tokens(
-                            message.thinking
-                        )
-                else:
+        thinking_tokens = 0
+        for message_list in message_lists:
+            turn_tokens, thinking_tokens = self.count_turn_tokens(message_list)
+            total_tokens += turn_tokens
+        # Only the thinking of the very last message list is counted.
+        return total_tokens + thinking_tokens
+
+    def count_turn_tokens(self, message_list: list[GeneralContentBlock]) -> tuple[int, int]:
+        """Counts the tokens of one message list.
+
+        Returns (tokens, thinking tokens); the thinking tokens only count towards the
+        total while the message list is the last one, see ``count_tokens``.
+        """
+        total_tokens = 0
+        thinking_tokens = 0
+        for message in message_list:
+            if isinstance(message, (TextPrompt, TextResult, SessionSummary)):
+                total_tokens += self.token_counter.count_tokens(message.text)
+            elif isinstance(message, ToolFormattedResult):
+                # Count truncated output if already truncated
+                total_tokens += self.token_counter.count_tokens(
+                    message.tool_output, message.image_metadata
+                )
+            elif isinstance(message, ToolCall):
+                # Basic counting of input JSON
+                try:
+                    input_str = json.dumps(message.tool_input)
+                    total_tokens += self.token_counter.count_tokens(input_str)
+                except TypeError:
                     self.logger.warning(
-                        f"Unhandled message type for token counting: {type(message)}"
+                        f"Could not serialize tool input for token counting: {message.tool_input}"
                     )
-        return total_tokens
+                    total_tokens += 100  # Add arbitrary penalty
+            elif isinstance(message, ImageBlock):
+                # Measured once when the block was created
+                total_tokens += message.metadata.tokens
+            elif isinstance(message, AnthropicRedactedThinkingBlock):
+                pass  # Always 0 tokens
+            elif isinstance(message, AnthropicThinkingBlock):
+                thinking_tokens += self.token_counter.count_tokens(message.thinking)
+            else:
+                self.logger.warning(
+                    f"Unhandled message type for token counting: {type(message)}"
+                )
+        return total_tokens, thinking_tokens
+
+    def should_truncate(
+        self,
+        message_lists: list[list[GeneralContentBlock]],
+        token_count: Optional[int] = None,
+    ) -> bool:
+        """Check if truncation is needed based on the estimated request size.
 
-    def should_truncate(self, message_lists: list[list[GeneralContentBlock]]) -> bool:
-        """Check if truncation is needed based on the number of message lists."""
-        return self.count_tokens(message_lists) > self._token_budget
+        ``token_count`` is the already known token count of ``message_lists``, if any.
+        """
+        if token_count is None:
+            token_count = self.count_tokens(message_lists)
+        return self.estimate_request_tokens(token_count) > self._token_budget
 
     @final
     def apply_truncation_if_needed(
-        self, message_lists: list[list[GeneralContentBlock]]
+        self,
+        message_lists: list[list[GeneralContentBlock]],
+        token_count: Optional[int] = None,
     ) -> list[list[GeneralContentBlock]]:
-        if not self.should_truncate(message_lists):
+        """Truncates ``message_lists`` if they exceed the budget.
+
+        Callers that keep a running token count (see MessageHistory) pass it as
+        ``token_count`` so the history is not measured again. Strategies that
+        condense ahead of time (see ``take_precomputed_truncation``) have their
+        result swapped in here, at the turn boundary; as it was computed from an
+        older prefix, it is truncated further if the turns added since leave it
+        over budget.
+        """
+        precomputed = self.take_precomputed_truncation(message_lists)
+        if precomputed is not None:
+            with tracing.span("context.truncate", context_manager=type(self).__name__, precomputed=True) as current:
+                new_token_count = self.count_tokens(precomputed)
+                if current is not None:
+                    current.set_attribute("tokens_after", new_token_count)
+            self.logger.info(
+                f"Applied precomputed truncation: {len(message_lists)} message lists to "
+                f"{len(precomputed)}. New count: {new_token_count}"
+            )
+            if not self.should_truncate(precomputed, new_token_count):
+                return precomputed
+            self.logger.warning("Precomputed truncation is still over budget; truncating further")
+            message_lists, token_count = precomputed, new_token_count
+
+        if not self.should_truncate(message_lists, token_count):
+            self.prepare_truncation(message_lists, token_count)
             return message_lists
 
-        current_tokens = self.count_tokens(message_lists)
-        self.logger.warning(
-            f"Token count {current_tokens}."
-        )
-        truncated_message_lists = self.apply_truncation(message_lists)
-        new_token_count = self.count_tokens(truncated_message_lists)
+        with tracing.span("context.truncate", context_manager=type(self).__name__) as current:
+            current_tokens = token_count if token_count is not None else self.count_tokens(message_lists)
+            self.logger.warning(
+                f"Token count {current_tokens}."
+            )
+            truncated_message_lists = self.apply_truncation(message_lists)
+            new_token_count = self.count_tokens(truncated_message_lists)
+            if current is not None:
+                current.set_attribute("tokens_before", current_tokens)
+                current.set_attribute("tokens_after", new_token_count)
         tokens_saved = current_tokens - new_token_count
         self.logger.info(
             f"Truncation saved ~{tokens_saved} tokens. New count: {new_token_count}"
         )
         return truncated_message_lists
 
+    def take_precomputed_truncation(
+        self, message_lists: list[list[GeneralContentBlock]]
+    ) -> Optional[list[list[GeneralContentBlock]]]:
+        """Return a truncation of ``message_lists`` computed ahead of time, if one is ready."""
+        return None
+
+    def prepare_truncation(
+        self,
+        message_lists: list[list[GeneralContentBlock]],
+        token_count: Optional[int] = None,
+    ) -> None:
+        """Called while ``message_lists`` are within budget; may start condensing early."""
+
+    def get_state(self, message_lists: list[list[GeneralContentBlock]]) -> dict[str, Any]:
+        """State to keep in a session snapshot along with ``message_lists``; JSON-serializable."""
+        return {}
+
+    def restore_state(self, state: dict[str, Any], message_lists: list[list[GeneralContentBlock]]) -> None:
+        """Restore what ``get_state`` returned, for the restored ``message_lists``."""
+
     @abstractmethod
     def apply_truncation(
         self, message_lists: list[list[GeneralContentBlock]]
@@ -1,9 +1,68 @@
 import logging
+import threading
+from typing import Any, Optional
+from boss_agent.core import tracing
 from boss_agent.llm.base import GeneralContentBlock, TextPrompt, TextResult, AnthropicThinkingBlock, AnthropicRedactedThinkingBlock
 from boss_agent.llm.context_manager.base import ContextManager
 from boss_agent.llm.token_counter import TokenCounter
 from boss_agent.llm.base import LLMClient
-from boss_agent.utils.constants import TOKEN_BUDGET, SUMMARY_MAX_TOKENS
+from boss_agent.llm.context_manager.output_pruner import ToolOutputPruner
+from boss_agent.llm.context_manager.summary_store import SummaryStore, SummaryTiers
+from boss_agent.utils.constants import (
+    TOKEN_BUDGET,
+    PRUNE_KEEP_RECENT_TURNS,
+    PRUNE_MIN_TOKENS,
+    PRUNE_PREVIEW_CHARS,
+    PRUNE_RELEVANCE_FLOOR,
+    SUMMARY_CHUNK_TOKENS,
+    SUMMARY_FAN_IN,
+    SUMMARY_MAX_TOKENS,
+    SUMMARY_SOFT_WATERMARK,
+)
+
+
+SUMMARY_INSTRUCTIONS = """You are maintaining a context-aware state summary for an interactive agent. You will be given either a list of events corresponding to actions taken by the agent, or consecutive summaries of earlier events to merge. Track:
+
+USER_CONTEXT: (Preserve essential user requirements, goals, and clarifications in concise form)
+
+COMPLETED: (Tasks completed so far, with brief results)
+PENDING: (Tasks that still need to be done)
+CURRENT_STATE: (Current variables, data structures, or relevant state)
+
+For code-specific tasks, also include:
+CODE_STATE: {File paths, function signatures, data structures}
+TESTS: {Failing cases, error messages, outputs}
+CHANGES: {Code edits, variable updates}
+DEPS: {Dependencies, imports, external calls}
+VERSION_CONTROL_STATUS: {Repository state, current branch, PR status, commit history}
+
+PRIORITIZE:
+1. Adapt tracking format to match the actual task type
+2. Capture key user requirements and goals
+3. Distinguish between completed and pending tasks
+4. Keep all sections concise and relevant
+
+SKIP: Tracking irrelevant details for the current task type
+
+Example formats:
+
+For code tasks:
+USER_CONTEXT: Fix FITS card float representation issue
+COMPLETED: Modified mod_float() in card.py, all tests passing
+PENDING: Create PR, update documentation
+CODE_STATE: mod_float() in card.py updated
+TESTS: test_format() passed
+CHANGES: str(val) replaces f"{val:.16G}"
+DEPS: None modified
+VERSION_CONTROL_STATUS: Branch: fix-float-precision, Latest commit: a1b2c3d
+
+For other tasks:
+USER_CONTEXT: Write 20 haikus based on coin flip results
+COMPLETED: 15 haikus written for results [T,H,T,H,T,H,T,T,H,T,H,T,H,T,H]
+PENDING: 5 more haikus needed
+CURRENT_STATE: Last flip: Heads, Haiku count: 15/20
+
+"""
 
 
 class LLMSummarizingContextManager(ContextManager):
@@ -22,6 +81,10 @@ class LLMSummarizingContextManager(ContextManager):
         token_budget: int = TOKEN_BUDGET,
         max_size: int = 100,
         max_event_length: int = 10_000,
+        soft_watermark: Optional[float] = SUMMARY_SOFT_WATERMARK,
+        summary_chunk_tokens: int = SUMMARY_CHUNK_TOKENS,
+        summary_fan_in: int = SUMMARY_FAN_IN,
+        prune_tool_outputs: bool = True,
     ):
         if max_size < 1:
             raise ValueError(f"max_size ({max_size}) cannot be non-positive")
@@ -31,6 +94,29 @@ class LLMSummarizingContextManager(ContextManager):
         self.max_size = max_size
         self.keep_first = 1
         self.max_event_length = max_event_length
+        # Fraction of the budget (and of max_size) past which the oldest span is
+        # summarized in the background; None summarizes only once over budget.
+        self.soft_watermark = soft_watermark
+        self._background_summary: Optional[_BackgroundSummary] = None
+        self._summary_store = SummaryStore(
+            summarize_events=self._request_summary,
+            merge_summaries=self._request_merge,
+            token_counter=token_counter,
+            chunk_tokens=summary_chunk_tokens,
+            fan_in=summary_fan_in,
+        )
+        # The summary currently in the history and the message list carrying it.
+        self._summary_tiers = SummaryTiers()
+        self._summary_message: Optional[list[GeneralContentBlock]] = None
+        # Shrinks stale tool outputs first, so that many truncations need no summary.
+        self._pruner: Optional[ToolOutputPruner] = None
+        if prune_tool_outputs:
+            self._pruner = ToolOutputPruner(
+                count_tokens=lambda block: self.count_turn_tokens([block])[0],
+                min_tokens=PRUNE_MIN_TOKENS,
+                preview_chars=PRUNE_PREVIEW_CHARS,
+                relevance_floor=PRUNE_RELEVANCE_FLOOR,
+            )
 
     def _truncate_content(self, content: str) -> str:
         """Truncate the content to fit within the specified maximum event length."""
@@ -54,10 +140,14 @@ class LLMSummarizingContextManager(ContextManager):
                 parts.append(f"{type(message).__name__}: {str(message)}")
         return "\n".join(parts)
 
-    def should_truncate(self, message_lists: list[list[GeneralContentBlock]]) -> bool:
+    def should_truncate(
+        self,
+        message_lists: list[list[GeneralContentBlock]],
+        token_count: Optional[int] = None,
+    ) -> bool:
         """Check if condensation is needed based on the number of message lists."""
         return len(message_lists) > self.max_size or super().should_truncate(
-            message_lists
+            message_lists, token_count
         )
 
     def _has_thinking_blocks(self, message_lists: list[list[GeneralContentBlock]]) -> bool:
@@ -79,60 +169,171 @@ class LLMSummarizingContextManager(ContextManager):
     def apply_truncation(
         self, message_lists: list[list[GeneralContentBlock]]
     ) -> list[list[GeneralContentBlock]]:
-        """Apply truncation with LLM summarization when needed."""
+        """Apply truncation with LLM summarization when needed.
+
+        Stale tool outputs are pruned first; if that is enough, no summary is made.
+        Otherwise a background summary already under way is waited for rather than
+        started again, and summarizing the pruned history synchronously is the fallback.
+        """
+        pruned, fits = self._prune_tool_outputs(message_lists, self.token_budget)
+        if fits:
+            self.logger.info("Pruned stale tool outputs; no summary needed")
+            return pruned
+
+        precomputed = self._take_background_summary(message_lists, wait=True)
+        if precomputed is not None:
+            return precomputed
+
+        message_lists = pruned
+        plan = self._plan_summary(message_lists)
+        if plan is None:
+            return message_lists
+        start, end, previous_summary = plan
+        events = message_lists[start:end]
+        try:
+            tiers = self._summarize_span(events, previous_summary)
+        except Exception as e:
+            self.logger.error(f"Failed to generate summary: {e}")
+            tiers, new_events = self._split_span(events, previous_summary)
+            tiers = tiers.with_summary(
+                f"Failed to summarize {len(new_events)} events due to error: {str(e)}"
+            )
+        return self._condense(message_lists, start, end, tiers)
+
+    def take_precomputed_truncation(
+        self, message_lists: list[list[GeneralContentBlock]]
+    ) -> Optional[list[list[GeneralContentBlock]]]:
+        return self._take_background_summary(message_lists, wait=False)
+
+    def get_state(self, message_lists: list[list[GeneralContentBlock]]) -> dict[str, Any]:
+        """The summary tiers and the position of the message list carrying them."""
+        for index, message_list in enumerate(message_lists):
+            if message_list is self._summary_message:
+                return {
+                    "summary_tiers": [list(tier) for tier in self._summary_tiers.tiers],
+                    "summary_index": index,
+                }
+        return {}
+
+    def restore_state(self, state: dict[str, Any], message_lists: list[list[GeneralContentBlock]]) -> None:
+        index = state.get("summary_index")
+        if index is None or index >= len(message_lists):
+            return
+        self._summary_tiers = SummaryTiers(tuple(tuple(tier) for tier in state["summary_tiers"]))
+        self._summary_message = message_lists[index]
+
+    def prepare_truncation(
+        self,
+        message_lists: list[list[GeneralContentBlock]],
+        token_count: Optional[int] = None,
+    ) -> None:
+        """Start summarizing the oldest span in the background past the soft watermark."""
+        if self.soft_watermark is None or self._background_summary is not None:
+            return
+        if token_count is None:
+            token_count = self.count_tokens(message_lists)
+        if len(message_lists) < self.soft_watermark * self.max_size:
+            if self.estimate_request_tokens(token_count) < self.soft_watermark * self.token_budget:
+                return
+            # Pruning will be enough once the budget is reached; no summary is needed.
+            if self._prune_tool_outputs(message_lists, self.soft_watermark * self.token_budget, token_count)[1]:
+                return
+        plan = self._plan_summary(message_lists)
+        if plan is None:
+            return
+        start, end, previous_summary = plan
+        self.logger.info(
+            f"Soft watermark reached; summarizing message lists {start}-{end} in the background"
+        )
+        self._background_summary = _BackgroundSummary(
+            self, message_lists[:end], start, previous_summary
+        )
+
+    def _prune_tool_outputs(
+        self,
+        message_lists: list[list[GeneralContentBlock]],
+        target_tokens: float,
+        token_count: Optional[int] = None,
+    ) -> tuple[list[list[GeneralContentBlock]], bool]:
+        """Prune stale tool outputs until the estimated request fits ``target_tokens``.
+
+        Returns the pruned message lists and whether they fit without summarizing.
+        The newest PRUNE_KEEP_RECENT_TURNS message lists are left alone.
+        """
+        if self._pruner is None or len(message_lists) > self.max_size:
+            return message_lists, False
+        if token_count is None:
+            token_count = self.count_tokens(message_lists)
+        # The largest raw history whose estimated request fits the target.
+        allowed_tokens = (
+            int(target_tokens / self.token_counter.correction_factor(self._model))
+            - self._request_overhead_tokens
+        )
+        end = len(message_lists) - PRUNE_KEEP_RECENT_TURNS
+        if end <= self.keep_first:
+            return message_lists, False
+        with tracing.span("context.prune_tool_outputs") as current:
+            pruned, freed = self._pruner.prune(
+                message_lists, self.keep_first, end, token_count - allowed_tokens
+            )
+            if current is not None:
+                current.set_attribute("tokens_freed", freed)
+        return pruned, freed > 0 and token_count - freed <= allowed_tokens
+
+    def _take_background_summary(
+        self, message_lists: list[list[GeneralContentBlock]], wait: bool
+    ) -> Optional[list[list[GeneralContentBlock]]]:
+        """Swap a finished background summary into ``message_lists``.
+
+        Returns None if there is none, it is still running (and ``wait`` is false) or
+        the history changed under it, in which case it is dropped.
+        """
+        background = self._background_summary
+        if background is None or not (wait or background.done.is_set()):
+            return None
+        if not background.applies_to(self, message_lists):
+            self._background_summary = None
+            return None
+        background.done.wait()
+        self._background_summary = None
+        if background.tiers is None:
+            return None
+        return self._condense(message_lists, background.start, background.end, background.tiers)
+
+    def _plan_summary(
+        self, message_lists: list[list[GeneralContentBlock]]
+    ) -> Optional[tuple[int, int, str]]:
+        """Choose the span to summarize: (start, end, previous summary), or None."""
         # Check if we have thinking blocks and route to appropriate method
-        has_thinking_blocks = self._has_thinking_blocks(message_lists)
-        
-        if has_thinking_blocks:
-            return self._apply_truncation_with_thinking_blocks(message_lists)
-        else:
-            return self._apply_truncation_without_thinking_blocks(message_lists)
-
-    def _apply_truncation_with_thinking_blocks(
+        if self._has_thinking_blocks(message_lists):
+            return self._plan_with_thinking_blocks(message_lists)
+        return self._plan_without_thinking_blocks(message_lists)
+
+    def _plan_with_thinking_blocks(
         self, message_lists: list[list[GeneralContentBlock]]
-    ) -> list[list[GeneralContentBlock]]:
-        """Apply truncation when thinking blocks are present - only truncate before last TextPrompt."""
-        # New logic: only truncate before the last user message (TextPrompt)
+    ) -> Optional[tuple[int, int, str]]:
+        """When thinking blocks are present, only summarize before the last TextPrompt."""
         last_prompt_index = self._find_last_text_prompt_index(message_lists)
-        
+
         # If we only have one or no TextPrompt, don't truncate
         if last_prompt_index <= 0:
-            return message_lists
-            
+            return None
+
         # target size is half of the max size but we must keep from last text prompt onwards
         target_size = min(self.max_size, len(message_lists)) // 2
         last_summary_index = min(last_prompt_index, self.keep_first + target_size)
-        events_to_summarize = message_lists[self.keep_first:last_summary_index]
-        events_to_keep = message_lists[last_summary_index:]
 
-        
-        if len(events_to_summarize) <= 1: # If there is only one event to summarize, don't summarize
+        if last_summary_index - self.keep_first <= 1: # If there is only one event to summarize, don't summarize
             self.logger.info(
                 "No events to summarize, returning original message lists"
             )
-            return message_lists
-            
-        # Generate summary for events before the last TextPrompt
-        summary = self._generate_summary(events_to_summarize)
-        
-        # Create condensed message list with summary + events from last TextPrompt
-        condensed_messages = []
-        condensed_messages.extend(message_lists[:self.keep_first])
-        summary_message = [TextResult(text=f"Conversation Summary: {summary}")]
-        condensed_messages.append(summary_message)
-        condensed_messages.extend(events_to_keep)
-        
-        self.logger.info(
-            f"Condensed {len(message_lists)} message lists to {len(condensed_messages)} "
-            f"(kept {self.keep_first} head + 1 summary + {len(events_to_keep)} from last TextPrompt onwards)"
-        )
-        
-        return condensed_messages
+            return None
+        return self.keep_first, last_summary_index, "No events summarized"
 
-    def _apply_truncation_without_thinking_blocks(
+    def _plan_without_thinking_blocks(
         self, message_lists: list[list[GeneralContentBlock]]
-    ) -> list[list[GeneralContentBlock]]:
-        """Apply truncation when no thinking blocks are present - use original logic."""
+    ) -> Optional[tuple[int, int, str]]:
+        """Summarize everything between the head and the most recent half."""
         head = message_lists[: self.keep_first]
         target_size = min(self.max_size, len(message_lists)) // 2
         events_from_tail = target_size - len(head) - 1
@@ -153,121 +354,133 @@ class LLMSummarizingContextManager(ContextManager):
             summary_start_idx = self.keep_first + 1
 
         # Identify events to be forgotten (those not in head or tail)
-        forgotten_events = (
-            message_lists[summary_start_idx:-events_from_tail]
-            if events_from_tail > 0
-            else message_lists[summary_start_idx:]
-        )
+        end = len(message_lists) - events_from_tail if events_from_tail > 0 else len(message_lists)
+        if end <= summary_start_idx:
+            return None
+        return summary_start_idx, end, summary_content
 
-        if not forgotten_events:
-            return message_lists
-
-        # Generate summary using existing logic
-        summary = self._generate_summary(forgotten_events, summary_content)
-
-        # Create new condensed message list
+    def _condense(
+        self,
+        message_lists: list[list[GeneralContentBlock]],
+        start: int,
+        end: int,
+        tiers: SummaryTiers,
+    ) -> list[list[GeneralContentBlock]]:
+        """Replace message lists ``start:end`` (and any summary before them) with ``tiers``."""
         condensed_messages = []
-
-        # Add head messages
-        condensed_messages.extend(head)
-
-        # Add summary as a new message
-        summary_message = [TextResult(text=f"Conversation Summary: {summary}")]
+        condensed_messages.extend(message_lists[: self.keep_first])
+        summary_message: list[GeneralContentBlock] = [
+            TextResult(text=f"Conversation Summary: {tiers.render()}")
+        ]
         condensed_messages.append(summary_message)
-
-        # Add tail messages
-        if events_from_tail > 0:
-            condensed_messages.extend(message_lists[-events_from_tail:])
+        # The next truncation extends these tiers rather than re-summarizing them.
+        self._summary_tiers = tiers
+        self._summary_message = summary_message
+        condensed_messages.extend(message_lists[end:])
 
         self.logger.info(
             f"Condensed {len(message_lists)} message lists to {len(condensed_messages)} "
-            f"(kept {len(head)} head + 1 summary + {events_from_tail} tail)"
+            f"(kept {self.keep_first} head + 1 summary + {len(message_lists) - end} tail)"
         )
-
         return condensed_messages
 
-    def _generate_summary(self, forgotten_events: list[list[GeneralContentBlock]], previous_summary_content: str = "No events summarized") -> str:
-        """Generate a summary for the given forgotten events."""
-        # Construct prompt for summarization
-        prompt = """You are maintaining a context-aware state summary for an interactive agent. You will be given a list of events corresponding to actions taken by the agent, and the most recent previous summary if one exists. Track:
-
-USER_CONTEXT: (Preserve essential user requirements, goals, and clarifications in concise form)
-
-COMPLETED: (Tasks completed so far, with brief results)
-PENDING: (Tasks that still need to be done)
-CURRENT_STATE: (Current variables, data structures, or relevant state)
-
-For code-specific tasks, also include:
-CODE_STATE: {File paths, function signatures, data structures}
-TESTS: {Failing cases, error messages, outputs}
-CHANGES: {Code edits, variable updates}
-DEPS: {Dependencies, imports, external calls}
-VERSION_CONTROL_STATUS: {Repository state, current branch, PR status, commit history}
+    def _summarize_span(
+        self, events: list[list[GeneralContentBlock]], previous_summary: str
+    ) -> SummaryTiers:
+        """Fold the message lists being evicted into the summary tiers; errors propagate."""
+        tiers, new_events = self._split_span(events, previous_summary)
+        return self._summary_store.extend(
+            tiers,
+            [self._truncate_content(self._message_list_to_string(event)) for event in new_events],
+        )
 
-PRIORITIZE:
-1. Adapt tracking format to match the actual task type
-2. Capture key user requirements and goals
-3. Distinguish between completed and pending tasks
-4. Keep all sections concise and relevant
+    def _split_span(
+        self, events: list[list[GeneralContentBlock]], previous_summary: str
+    ) -> tuple[SummaryTiers, list[list[GeneralContentBlock]]]:
+        """Split a span into the summary it builds on and the newly evicted message lists."""
+        if self._summary_message is not None and any(event is self._summary_message for event in events):
+            return self._summary_tiers, [event for event in events if event is not self._summary_message]
+        if previous_summary != "No events summarized":
+            previous_summary = previous_summary.replace("Conversation Summary: ", "")
+            return SummaryTiers().with_summary(previous_summary), events
+        return SummaryTiers(), events
+
+    def _request_summary(self, events: list[str]) -> str:
+        """Ask the model to summarize a chunk of rendered events."""
+        parts = [SUMMARY_INSTRUCTIONS]
+        parts.extend(f"<EVENT id={i}>\n{event}\n</EVENT>\n" for i, event in enumerate(events))
+        parts.append("\nNow summarize the events using the rules above.")
+        summary = self._generate("".join(parts))
+        self.logger.info(f"Generated summary for {len(events)} forgotten events")
+        return summary
 
-SKIP: Tracking irrelevant details for the current task type
+    def _request_merge(self, summaries: list[str]) -> str:
+        """Ask the model to merge consecutive summaries, oldest first, into one."""
+        parts = [SUMMARY_INSTRUCTIONS]
+        parts.extend(
+            f"<SUMMARY id={i}>\n{summary}\n</SUMMARY>\n" for i, summary in enumerate(summaries)
+        )
+        parts.append(
+            "\nThe summaries above cover consecutive parts of the conversation, oldest first. "
+            "Now merge them into a single summary using the rules above."
+        )
+        summary = self._generate("".join(parts))
+        self.logger.info(f"Merged {len(summaries)} summaries")
+        return summary
 
-Example formats:
+    def _generate(self, prompt: str) -> str:
+        model_response, _ = self.client.generate(
+            messages=[[TextPrompt(text=prompt)]],
+            max_tokens=SUMMARY_MAX_TOKENS,
+            thinking_tokens=0,
+        )
+        return "".join(
+            message.text for message in model_response if isinstance(message, TextResult)
+        )
 
-For code tasks:
-USER_CONTEXT: Fix FITS card float representation issue
-COMPLETED: Modified mod_float() in card.py, all tests passing
-PENDING: Create PR, update documentation
-CODE_STATE: mod_float() in card.py updated
-TESTS: test_format() passed
-CHANGES: str(val) replaces f"{val:.16G}"
-DEPS: None modified
-VERSION_CONTROL_STATUS: Branch: fix-float-precision, Latest commit: a1b2c3d
 
-For other tasks:
-USER_CONTEXT: Write 20 haikus based on coin flip results
-COMPLETED: 15 haikus written for results [T,H,T,H,T,H,T,T,H,T,H,T,H,T,H]
-PENDING: 5 more haikus needed
-CURRENT_STATE: Last flip: Heads, Haiku count: 15/20
+class _BackgroundSummary:
+    """A summary of ``message_lists[start:end]`` generated on a worker thread.
 
-"""
+    It remembers the message lists up to ``end`` and the summary tiers it was started
+    from, so it is only swapped into a history that still begins with exactly those
+    lists and has not been summarized since.
+    """
 
-        # Add the previous summary if it exists
-        previous_summary = (
-            previous_summary_content.replace("Conversation Summary: ", "")
-            if previous_summary_content != "No events summarized"
-            else ""
+    def __init__(
+        self,
+        context_manager: LLMSummarizingContextManager,
+        prefix: list[list[GeneralContentBlock]],
+        start: int,
+        previous_summary: str,
+    ):
+        self.prefix = list(prefix)
+        self.start = start
+        self.end = len(prefix)
+        self.base_tiers = context_manager._summary_tiers
+        self.tiers: Optional[SummaryTiers] = None
+        self.done = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(context_manager, previous_summary),
+            name="background-summary",
+            daemon=True,
         )
-        prompt += f"<PREVIOUS SUMMARY>\n{self._truncate_content(previous_summary)}\n</PREVIOUS SUMMARY>\n\n"
+        self._thread.start()
 
-        # Add all events that are being forgotten
-        for i, forgotten_event in enumerate(forgotten_events):
-            event_content = self._truncate_content(
-                self._message_list_to_string(forgotten_event)
-            )
-            prompt += f"<EVENT id={i}>\n{event_content}\n</EVENT>\n"
+    def applies_to(self, context_manager: LLMSummarizingContextManager, message_lists: list[list[GeneralContentBlock]]) -> bool:
+        return (
+            context_manager._summary_tiers is self.base_tiers
+            and len(message_lists) >= self.end
+            and all(current is original for current, original in zip(message_lists, self.prefix))
+        )
 
-        prompt += "\nNow summarize the events using the rules above."
-        
-        # Generate summary using LLM
+    def _run(self, context_manager: LLMSummarizingContextManager, previous_summary: str):
         try:
-            summary_messages = [[TextPrompt(text=prompt)]]
-            model_response, _ = self.client.generate(
-                messages=summary_messages,
-                max_tokens=SUMMARY_MAX_TOKENS,
-                thinking_tokens=0,
-            )
-            summary = ""
-            for message in model_response:
-                if isinstance(message, TextResult):
-                    summary += message.text
-
-            self.logger.info(
-                f"Generated summary for {len(forgotten_events)} forgotten events"
-            )
-
+            with tracing.span("context.background_summary", events=self.end - self.start):
+                self.tiers = context_manager._summarize_span(self.prefix[self.start:], previous_summary)
         except Exception as e:
-            self.logger.error(f"Failed to generate summary: {e}")
-            summary = f"Failed to summarize {len(forgotten_events)} events due to error: {str(e)}"
-
-        return summary
+            # Leave it to the blocking path once the budget is actually exceeded.
+            context_manager.logger.warning(f"Background summary failed: {e}")
+        finally:
+            self.done.set()
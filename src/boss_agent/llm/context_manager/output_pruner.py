@@ -0,0 +1,343 @@
+"""Pruning of stale tool outputs, tried before a history is summarized.
+
+Old tool outputs are often the bulk of a long history, and many are no longer
+useful: a file listing that was taken again later, a browser screenshot of a page the
+browser has since left, a web page the conversation never came back to. Shrinking
+those is free, whereas a summary costs a model call, so the summarizing context
+manager prunes first and only summarizes what pruning could not make fit.
+
+Outputs are pruned in this order until enough tokens are freed:
+
+1. outputs superseded by a later call of the same tool with the same input;
+2. screenshots superseded by a later screenshot (the text of the result stays);
+3. outputs that score low against the current goal, with BM25 over the latest user
+   prompt and the recent assistant text, least relevant first. Chinese, Japanese and
+   Korean text has no spaces between words, so it is indexed as character bigrams.
+"""
+
+import json
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable
+
+from boss_agent.llm.base import (
+    AnthropicThinkingBlock,
+    GeneralContentBlock,
+    TextPrompt,
+    TextResult,
+    ToolCall,
+    ToolFormattedResult,
+)
+
+# Replaces the output of a pruned tool result; also marks it as pruned already.
+PRUNED_OUTPUT_PREFIX = "[Output pruned to save context"
+
+# Kana, CJK ideographs and Hangul syllables.
+_CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_TERM_PATTERN = re.compile(rf"[{_CJK_CHARS}]+|[^\W{_CJK_CHARS}]+")
+_CJK_PATTERN = re.compile(rf"[{_CJK_CHARS}]")
+
+
+def tokenize(text: str) -> list[str]:
+    """Words of ``text``, with runs of CJK characters split into character bigrams."""
+    terms = []
+    for run in _TERM_PATTERN.findall(text.lower()):
+        if len(run) > 1 and _CJK_PATTERN.match(run):
+            terms.extend(run[i : i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run)
+    return terms
+
+
+class BM25:
+    """Okapi BM25 scores of a query against a fixed set of documents."""
+
+    def __init__(self, documents: list[Counter], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.lengths = [sum(document.values()) for document in documents]
+        self.average_length = (sum(self.lengths) / len(documents)) if documents else 0.0
+        document_frequencies: Counter = Counter()
+        for document in documents:
+            document_frequencies.update(document.keys())
+        count = len(documents)
+        self.idf = {
+            term: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequencies.items()
+        }
+
+    def score(self, query_terms: set[str], index: int) -> float:
+        document = self.documents[index]
+        length_norm = self.k1 * (
+            1 - self.b + self.b * self.lengths[index] / (self.average_length or 1)
+        )
+        score = 0.0
+        for term in query_terms:
+            frequency = document.get(term)
+            if frequency:
+                score += (
+                    self.idf[term]
+                    * frequency
+                    * (self.k1 + 1)
+                    / (frequency + length_norm)
+                )
+        return score
+
+
+@dataclass
+class _Candidate:
+    turn_index: int
+    block_index: int
+    block: ToolFormattedResult
+    tokens: int
+
+
+class ToolOutputPruner:
+    """Shrinks the least useful tool outputs of a history until enough tokens are freed.
+
+    ``count_tokens`` measures one tool result. Outputs smaller than ``min_tokens``
+    are never pruned, nor are outputs scoring at least ``relevance_floor`` times the
+    best-scoring candidate.
+    """
+
+    def __init__(
+        self,
+        count_tokens: Callable[[ToolFormattedResult], int],
+        min_tokens: int,
+        preview_chars: int,
+        relevance_floor: float,
+    ):
+        self.count_tokens = count_tokens
+        self.min_tokens = min_tokens
+        self.preview_chars = preview_chars
+        self.relevance_floor = relevance_floor
+        # Token and term counts of tool outputs by block identity; blocks are
+        # immutable, so each output is measured once while it stays in the history.
+        self._tokens: dict[int, tuple[ToolFormattedResult, int]] = {}
+        self._terms: dict[int, tuple[ToolFormattedResult, Counter]] = {}
+
+    def prune(
+        self,
+        message_lists: list[list[GeneralContentBlock]],
+        start: int,
+        end: int,
+        tokens_to_free: int,
+    ) -> tuple[list[list[GeneralContentBlock]], int]:
+        """Prune tool outputs in ``message_lists[start:end]``.
+
+        Returns the new message lists, sharing every unchanged message list with
+        ``message_lists``, and the number of tokens freed.
+        """
+        if tokens_to_free <= 0:
+            return message_lists, 0
+
+        tool_inputs = {
+            block.tool_call_id: block
+            for message_list in message_lists
+            for block in message_list
+            if isinstance(block, ToolCall)
+        }
+        candidates = self._candidates(message_lists, start, end)
+        replacements: dict[tuple[int, int], ToolFormattedResult] = {}
+        freed = 0
+        for candidate, replacement in self._prunings(
+            message_lists, candidates, tool_inputs, end
+        ):
+            key = (candidate.turn_index, candidate.block_index)
+            if key in replacements:
+                continue
+            replacements[key] = replacement
+            freed += candidate.tokens - self.count_tokens(replacement)
+            if freed >= tokens_to_free:
+                break
+
+        if not replacements:
+            return message_lists, 0
+        pruned = list(message_lists)
+        for (turn_index, block_index), replacement in replacements.items():
+            if pruned[turn_index] is message_lists[turn_index]:
+                pruned[turn_index] = list(message_lists[turn_index])
+            pruned[turn_index][block_index] = replacement
+        return pruned, freed
+
+    def _candidates(
+        self, message_lists: list[list[GeneralContentBlock]], start: int, end: int
+    ) -> list[_Candidate]:
+        candidates = []
+        measured = {}
+        for turn_index in range(start, end):
+            for block_index, block in enumerate(message_lists[turn_index]):
+                if not isinstance(block, ToolFormattedResult) or _is_pruned(block):
+                    continue
+                entry = self._tokens.get(id(block))
+                if entry is None or entry[0] is not block:
+                    entry = (block, self.count_tokens(block))
+                measured[id(block)] = entry
+                if entry[1] >= self.min_tokens:
+                    candidates.append(
+                        _Candidate(turn_index, block_index, block, entry[1])
+                    )
+        self._tokens = measured
+        return candidates
+
+    def _prunings(
+        self,
+        message_lists: list[list[GeneralContentBlock]],
+        candidates: list[_Candidate],
+        tool_inputs: dict[str, ToolCall],
+        end: int,
+    ):
+        """Yield (candidate, replacement) pairs, most prunable first."""
+        later_calls: dict[tuple[str, str], int] = {}
+        last_screenshot_turn = -1
+        for turn_index, message_list in enumerate(message_lists):
+            for block in message_list:
+                if isinstance(block, ToolFormattedResult):
+                    later_calls[_call_key(block, tool_inputs)] = turn_index
+                    if block.image_metadata:
+                        last_screenshot_turn = turn_index
+
+        for candidate in candidates:
+            if (
+                later_calls[_call_key(candidate.block, tool_inputs)]
+                > candidate.turn_index
+            ):
+                yield (
+                    candidate,
+                    self._replacement(
+                        candidate.block, "the same call was made again later"
+                    ),
+                )
+
+        for candidate in candidates:
+            if (
+                candidate.block.image_metadata
+                and last_screenshot_turn > candidate.turn_index
+            ):
+                yield candidate, _without_images(candidate.block)
+
+        yield from self._irrelevant(message_lists, candidates, end)
+
+    def _irrelevant(
+        self,
+        message_lists: list[list[GeneralContentBlock]],
+        candidates: list[_Candidate],
+        end: int,
+    ):
+        query = _query_terms(message_lists, end)
+        if not candidates or not query:
+            return
+        terms = self._document_terms([candidate.block for candidate in candidates])
+        bm25 = BM25(terms)
+        scores = [bm25.score(query, index) for index in range(len(candidates))]
+        best = max(scores)
+        if best <= 0:
+            # Nothing matches the goal at all, so the scores say nothing about relevance.
+            return
+        ranked = sorted(
+            range(len(candidates)),
+            key=lambda index: (scores[index], candidates[index].turn_index),
+        )
+        for index in ranked:
+            if scores[index] >= self.relevance_floor * best:
+                break
+            yield (
+                candidates[index],
+                self._replacement(
+                    candidates[index].block, "it is unrelated to the current task"
+                ),
+            )
+
+    def _document_terms(self, blocks: list[ToolFormattedResult]) -> list[Counter]:
+        terms = {}
+        documents = []
+        for block in blocks:
+            entry = self._terms.get(id(block))
+            if entry is None or entry[0] is not block:
+                entry = (block, Counter(tokenize(_output_text(block))))
+            terms[id(block)] = entry
+            documents.append(entry[1])
+        # Keep only the outputs still in the history.
+        self._terms = terms
+        return documents
+
+    def _replacement(
+        self, block: ToolFormattedResult, reason: str
+    ) -> ToolFormattedResult:
+        preview = _output_text(block)[: self.preview_chars]
+        return ToolFormattedResult(
+            tool_call_id=block.tool_call_id,
+            tool_name=block.tool_name,
+            tool_output=f"{PRUNED_OUTPUT_PREFIX} because {reason}. It began with:]\n{preview}",
+        )
+
+
+def _call_key(
+    block: ToolFormattedResult, tool_inputs: dict[str, ToolCall]
+) -> tuple[str, str]:
+    call = tool_inputs.get(block.tool_call_id)
+    if call is None:
+        # Without its call, a result can only be superseded by itself.
+        return block.tool_name, block.tool_call_id
+    return block.tool_name, json.dumps(call.tool_input, sort_keys=True, default=str)
+
+
+def _is_pruned(block: ToolFormattedResult) -> bool:
+    return isinstance(block.tool_output, str) and block.tool_output.startswith(
+        PRUNED_OUTPUT_PREFIX
+    )
+
+
+def _output_text(block: ToolFormattedResult) -> str:
+    if isinstance(block.tool_output, str):
+        return block.tool_output
+    return "\n".join(
+        item.get("text", "")
+        for item in block.tool_output
+        if isinstance(item, dict) and item.get("type") == "text"
+    )
+
+
+def _without_images(block: ToolFormattedResult) -> ToolFormattedResult:
+    tool_output = [
+        item
+        for item in block.tool_output
+        if not (isinstance(item, dict) and item.get("type") == "image")
+    ]
+    tool_output.append(
+        {
+            "type": "text",
+            "text": "[Screenshot removed; a later screenshot supersedes it.]",
+        }
+    )
+    return ToolFormattedResult(
+        tool_call_id=block.tool_call_id,
+        tool_name=block.tool_name,
+        tool_output=tool_output,
+    )
+
+
+def _query_terms(message_lists: list[list[GeneralContentBlock]], end: int) -> set[str]:
+    """Terms of the latest user prompt and the assistant text after ``end``."""
+    texts = []
+    for message_list in reversed(message_lists):
+        prompts = [
+            block.text for block in message_list if isinstance(block, TextPrompt)
+        ]
+        if prompts:
+            texts.extend(prompts)
+            break
+    for message_list in message_lists[end:]:
+        for block in message_list:
+            if isinstance(block, TextResult) and not block.text.startswith(
+                "Conversation Summary:"
+            ):
+                texts.append(block.text)
+            elif isinstance(block, AnthropicThinkingBlock):
+                texts.append(block.thinking)
+            elif isinstance(block, ToolCall):
+                texts.append(json.dumps(block.tool_input, default=str))
+    return set(tokenize("\n".join(texts)))
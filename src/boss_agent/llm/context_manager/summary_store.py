@@ -0,0 +1,87 @@
+"""Tiered rolling summaries of the turns evicted from the history.
+
+Evicted turns are summarized once, in chunks of roughly ``chunk_tokens``; whenever
+``fan_in`` summaries pile up in a tier they are merged into one summary of the next
+tier, like the carries of a counter. A truncation therefore only pays for the turns
+it evicts plus the occasional merge, instead of re-summarizing the previous summary
+together with everything forgotten so far.
+"""
+
+from dataclasses import dataclass
+from typing import Callable
+
+from boss_agent.llm.token_counter import TokenCounter
+
+
+@dataclass(frozen=True)
+class SummaryTiers:
+    """Immutable summary state; ``tiers[0]`` holds chunk summaries, oldest first."""
+
+    tiers: tuple[tuple[str, ...], ...] = ()
+
+    def with_summary(self, summary: str) -> "SummaryTiers":
+        """These tiers with ``summary`` appended to the first, without merging."""
+        first = self.tiers[0] if self.tiers else ()
+        return SummaryTiers((first + (summary,),) + self.tiers[1:])
+
+    def render(self) -> str:
+        # Higher tiers summarize older turns, so they come first.
+        return "\n\n".join(summary for tier in reversed(self.tiers) for summary in tier)
+
+
+class SummaryStore:
+    """Folds evicted turns into ``SummaryTiers``.
+
+    ``summarize_events`` turns a chunk of rendered events into a summary and
+    ``merge_summaries`` condenses consecutive summaries into one; both may raise, in
+    which case the tiers passed to ``extend`` are left as they were.
+    """
+
+    def __init__(
+        self,
+        summarize_events: Callable[[list[str]], str],
+        merge_summaries: Callable[[list[str]], str],
+        token_counter: TokenCounter,
+        chunk_tokens: int,
+        fan_in: int,
+    ):
+        if fan_in < 2:
+            raise ValueError(f"fan_in ({fan_in}) must be at least 2")
+        self.summarize_events = summarize_events
+        self.merge_summaries = merge_summaries
+        self.token_counter = token_counter
+        self.chunk_tokens = chunk_tokens
+        self.fan_in = fan_in
+
+    def extend(self, tiers: SummaryTiers, events: list[str]) -> SummaryTiers:
+        """Return ``tiers`` with the newly evicted ``events`` summarized into it."""
+        for chunk in self._chunks(events):
+            tiers = self.add_summary(tiers, self.summarize_events(chunk))
+        return tiers
+
+    def add_summary(
+        self, tiers: SummaryTiers, summary: str, level: int = 0
+    ) -> SummaryTiers:
+        """Append a summary to tier ``level``, merging the tier once it is full."""
+        levels = list(tiers.tiers) + [()] * (level + 1 - len(tiers.tiers))
+        levels[level] = levels[level] + (summary,)
+        if len(levels[level]) < self.fan_in:
+            return SummaryTiers(tuple(levels))
+        merged = self.merge_summaries(list(levels[level]))
+        levels[level] = ()
+        return self.add_summary(SummaryTiers(tuple(levels)), merged, level + 1)
+
+    def _chunks(self, events: list[str]) -> list[list[str]]:
+        chunks: list[list[str]] = []
+        current: list[str] = []
+        current_tokens = 0
+        for event in events:
+            tokens = self.token_counter.count_tokens(event)
+            if current and current_tokens + tokens > self.chunk_tokens:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(event)
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks
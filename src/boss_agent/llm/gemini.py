@@ -1,13 +1,17 @@
+import asyncio
 import os
 import time
 import random
+from dataclasses import replace
 
-from typing import Any, Tuple
+from typing import Any, AsyncIterator, Iterator, Tuple, cast
 from google import genai
 from google.genai import types, errors
+from boss_agent.core import cancellation
 from boss_agent.llm.base import (
     LLMClient,
     AssistantContentBlock,
+    BlockConversionCache,
     ToolParam,
     TextPrompt,
     ToolCall,
@@ -15,8 +19,11 @@ from boss_agent.llm.base import (
     LLMMessages,
     ToolFormattedResult,
     ImageBlock,
+    SessionSummary,
+    StreamEvent,
 )
-from boss_agent.llm.message_history import SessionSummary
+from boss_agent.llm.client_registry import HttpPoolSettings, credential_key, shared_client
+from boss_agent.llm.rate_limit import RETRYABLE_STATUS_CODES, RequestThrottle, estimate_tokens, get_retry_policy
 
 def generate_tool_call_id() -> str:
     """Generate a unique ID for a tool call.
@@ -29,23 +36,82 @@ def generate_tool_call_id() -> str:
     return f"call_{timestamp}_{random_num}"
 
 
+def _to_function_response(message: ToolFormattedResult) -> types.Part | None:
+    if isinstance(message.tool_output, (str, list)):
+        return types.Part.from_function_response(
+            name=message.tool_name,
+            response={"result": message.plain_tool_output()}
+        )
+    return None
+
+
+def _http_options(settings: HttpPoolSettings) -> types.HttpOptions:
+    return types.HttpOptions(
+        # Milliseconds.
+        timeout=int(settings.timeout * 1000),
+        client_args={"limits": settings.limits()},
+        async_client_args={"limits": settings.limits()},
+    )
+
+
 class GeminiDirectClient(LLMClient):
     """Use Gemini models via first party API."""
 
-    def __init__(self, model_name: str, max_retries: int = 2, project_id: None | str = None, region: None | str = None):
+    def __init__(
+        self,
+        model_name: str,
+        max_retries: int | None = None,
+        project_id: None | str = None,
+        region: None | str = None,
+    ):
         self.model_name = model_name
 
         if project_id and region:
-            self.client = genai.Client(vertexai=True, project=project_id, location=region)
+            self.client = shared_client(
+                "gemini-vertex",
+                (project_id, region),
+                lambda settings: genai.Client(
+                    vertexai=True, project=project_id, location=region, http_options=_http_options(settings)
+                ),
+            )
             print(f"====== Using Gemini through Vertex AI API with project_id: {project_id} and region: {region} ======")
         else:
             api_key = os.getenv("GEMINI_API_KEY")
             if not api_key:
                 raise ValueError("GEMINI_API_KEY is not set")
-            self.client = genai.Client(api_key=api_key)
+            self.client = shared_client(
+                "gemini",
+                credential_key(api_key),
+                lambda settings: genai.Client(api_key=api_key, http_options=_http_options(settings)),
+            )
             print(f"====== Using Gemini directly ======")
             
-        self.max_retries = max_retries
+        self.throttle = RequestThrottle(
+            "gemini",
+            model_name,
+            None if max_retries is None else replace(get_retry_policy(), max_attempts=max_retries),
+        )
+        self.max_retries = self.throttle.max_attempts
+        # Each block converts to (the turn it belongs to, its Gemini part).
+        self._conversions = BlockConversionCache(
+            {
+                TextPrompt: lambda block: ("user", types.Part(text=block.text)),
+                ImageBlock: lambda block: (
+                    "user",
+                    types.Part.from_bytes(
+                        data=block.source.raw if block.source.raw is not None else block.source["data"],
+                        mime_type=block.source["media_type"],
+                    ),
+                ),
+                TextResult: lambda block: ("model", types.Part(text=block.text)),
+                ToolCall: lambda block: (
+                    "model",
+                    types.Part.from_function_call(name=block.tool_name, args=block.tool_input),
+                ),
+                ToolFormattedResult: lambda block: ("tool_response", _to_function_response(block)),
+                SessionSummary: lambda block: ("skip", None),
+            }
+        )
 
     def generate(
         self,
@@ -55,8 +121,175 @@ class GeminiDirectClient(LLMClient):
         temperature: float = 0.0,
         tools: list[ToolParam] = [],
         tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
     ) -> Tuple[list[AssistantContentBlock], dict[str, Any]]:
+        request = self._build_request(
+            messages, max_tokens, system_prompt, temperature, tools, tool_choice
+        )
+        tokens = estimate_tokens(messages, system_prompt)
+
+        for retry in range(self.max_retries):
+            try:
+                cancellation.raise_if_cancelled()
+                self.throttle.limiter.acquire(tokens)
+                response = self.client.models.generate_content(**self._with_deadline(request))
+                break
+            except errors.APIError as e:
+                # E.g. 503: the service is overloaded or down; 429: the request was throttled.
+                if e.code in RETRYABLE_STATUS_CODES:
+                    if retry == self.max_retries - 1:
+                        print(f"Failed Gemini request after {retry + 1} retries")
+                        raise e
+                    else:
+                        cancellation.sleep(self.throttle.backoff(retry, e))
+                else:
+                    raise e
+
+        internal_messages = self._parse_response(response.text, response.function_calls)
+
+        message_metadata = {
+            "raw_response": response,
+            "input_tokens": response.usage_metadata.prompt_token_count,
+            "output_tokens": response.usage_metadata.candidates_token_count,
+        }
+        self.throttle.limiter.settle(tokens, message_metadata)
         
+        return internal_messages, message_metadata
+
+    def generate_stream(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> Iterator[StreamEvent]:
+        """Generate a response, yielding text and thought deltas as they arrive."""
+        request = self._build_request(
+            messages, max_tokens, system_prompt, temperature, tools, tool_choice
+        )
+        tokens = estimate_tokens(messages, system_prompt)
+
+        for retry in range(self.max_retries):
+            state = _GeminiStreamState(self)
+            try:
+                cancellation.raise_if_cancelled()
+                self.throttle.limiter.acquire(tokens)
+                for chunk in self.client.models.generate_content_stream(**self._with_deadline(request)):
+                    # The SDK's stream cannot be closed from another thread; stop at the
+                    # next chunk, and rely on the request timeout for a stalled stream.
+                    cancellation.raise_if_cancelled()
+                    yield from state.feed(chunk)
+                break
+            except errors.APIError as e:
+                # Deltas already shown to the user cannot be taken back, so only a
+                # stream that failed before producing anything is retried.
+                if e.code in RETRYABLE_STATUS_CODES and not state.emitted:
+                    if retry == self.max_retries - 1:
+                        print(f"Failed Gemini request after {retry + 1} retries")
+                        raise e
+                    else:
+                        cancellation.sleep(self.throttle.backoff(retry, e))
+                else:
+                    raise e
+
+        message = state.message()
+        self.throttle.limiter.settle(tokens, message.metadata)
+        yield message
+
+    async def agenerate(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> Tuple[list[AssistantContentBlock], dict[str, Any]]:
+        """Async variant of ``generate`` on the genai async client."""
+        request = self._build_request(
+            messages, max_tokens, system_prompt, temperature, tools, tool_choice
+        )
+        tokens = estimate_tokens(messages, system_prompt)
+
+        for retry in range(self.max_retries):
+            try:
+                await self.throttle.limiter.aacquire(tokens)
+                response = await self.client.aio.models.generate_content(**self._with_deadline(request))
+                break
+            except errors.APIError as e:
+                if e.code in RETRYABLE_STATUS_CODES:
+                    if retry == self.max_retries - 1:
+                        print(f"Failed Gemini request after {retry + 1} retries")
+                        raise e
+                    else:
+                        await asyncio.sleep(self.throttle.backoff(retry, e))
+                else:
+                    raise e
+
+        internal_messages = self._parse_response(response.text, response.function_calls)
+
+        message_metadata = {
+            "raw_response": response,
+            "input_tokens": response.usage_metadata.prompt_token_count,
+            "output_tokens": response.usage_metadata.candidates_token_count,
+        }
+        self.throttle.limiter.settle(tokens, message_metadata)
+
+        return internal_messages, message_metadata
+
+    async def agenerate_stream(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> AsyncIterator[StreamEvent]:
+        """Async variant of ``generate_stream`` on the genai async client."""
+        request = self._build_request(
+            messages, max_tokens, system_prompt, temperature, tools, tool_choice
+        )
+        tokens = estimate_tokens(messages, system_prompt)
+
+        for retry in range(self.max_retries):
+            state = _GeminiStreamState(self)
+            try:
+                await self.throttle.limiter.aacquire(tokens)
+                async for chunk in await self.client.aio.models.generate_content_stream(**self._with_deadline(request)):
+                    for event in state.feed(chunk):
+                        yield event
+                break
+            except errors.APIError as e:
+                if e.code in RETRYABLE_STATUS_CODES and not state.emitted:
+                    if retry == self.max_retries - 1:
+                        print(f"Failed Gemini request after {retry + 1} retries")
+                        raise e
+                    else:
+                        await asyncio.sleep(self.throttle.backoff(retry, e))
+                else:
+                    raise e
+
+        message = state.message()
+        self.throttle.limiter.settle(tokens, message.metadata)
+        yield message
+
+    def _build_request(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None,
+        temperature: float,
+        tools: list[ToolParam],
+        tool_choice: dict[str, str] | None,
+    ) -> dict[str, Any]:
+        """Convert internal messages and tools into generate_content kwargs."""
+        self._conversions.new_request()
         gemini_messages = []
         
         # This new loop will create valid Gemini turns from the flat message list.
@@ -68,58 +301,28 @@ class GeminiDirectClient(LLMClient):
             user_turn_parts = []
 
             for message in message_list:
-                if isinstance(message, (TextPrompt, ImageBlock)):
+                role, part = self._conversions.convert(message)
+                if role == "user":
                     # This starts a new user turn if the previous turn was from the model.
                     if model_turn_parts:
                         gemini_messages.append(types.Content(role='model', parts=model_turn_parts))
                         model_turn_parts = []
-                    
-                    if isinstance(message, TextPrompt):
-                        user_turn_parts.append(types.Part(text=message.text))
-                    else: # ImageBlock
-                        user_turn_parts.append(types.Part.from_bytes(
-                            data=message.source["data"],
-                            mime_type=message.source["media_type"],
-                        ))
-
-                elif isinstance(message, (TextResult, ToolCall)):
+                    user_turn_parts.append(part)
+
+                elif role == "model":
                      # This starts a new model turn if the previous turn was from the user.
                     if user_turn_parts:
                         gemini_messages.append(types.Content(role='user', parts=user_turn_parts))
                         user_turn_parts = []
-                    
-                    if isinstance(message, TextResult):
-                        model_turn_parts.append(types.Part(text=message.text))
-                    else: # ToolCall
-                        model_turn_parts.append(types.Part.from_function_call(
-                            name=message.tool_name,
-                            args=message.tool_input,
-                        ))
-
-                elif isinstance(message, ToolFormattedResult):
+                    model_turn_parts.append(part)
+
+                elif role == "tool_response":
                     # A tool response always follows a model turn. Finalize the model turn.
                     if model_turn_parts:
                         gemini_messages.append(types.Content(role='model', parts=model_turn_parts))
                         model_turn_parts = []
-                    
-                    response_part = None
-                    if isinstance(message.tool_output, str):
-                        response_part = types.Part.from_function_response(
-                            name=message.tool_name,
-                            response={"result": message.tool_output}
-                        )
-                    elif isinstance(message.tool_output, list):
-                        response_part = types.Part.from_function_response(
-                            name=message.tool_name,
-                            response={"result": message.tool_output}
-                        )
-                    if response_part:
-                        user_turn_parts.append(response_part)
-
-                elif isinstance(message, SessionSummary):
-                    continue
-                else:
-                    raise ValueError(f"Unknown message type: {type(message)}")
+                    if part:
+                        user_turn_parts.append(part)
 
             # Append any remaining parts at the end of the message list
             if model_turn_parts:
@@ -149,41 +352,36 @@ class GeminiDirectClient(LLMClient):
         else:
             raise ValueError(f"Unknown tool_choice type for Gemini: {tool_choice['type']}")
 
-        for retry in range(self.max_retries):
-            try:
-                response = self.client.models.generate_content(
-                    model=self.model_name,
-                    config=types.GenerateContentConfig(
-                        tools=tool_params,
-                        system_instruction=system_prompt,
-                        temperature=temperature,
-                        max_output_tokens=max_tokens,
-                        tool_config={'function_calling_config': {'mode': mode}}
-                        ),
-                    contents=gemini_messages,
-                )
-                break
-            except errors.APIError as e:
-                # 503: The service may be temporarily overloaded or down.
-                # 429: The request was throttled.
-                if e.code in [503, 429]:
-                    if retry == self.max_retries - 1:
-                        print(f"Failed Gemini request after {retry + 1} retries")
-                        raise e
-                    else:
-                        print(f"Error: {e}")
-                        print(f"Retrying Gemini request: {retry + 1}/{self.max_retries}")
-                        # Sleep 12-18 seconds with jitter to avoid thundering herd.
-                        time.sleep(15 * random.uniform(0.8, 1.2))
-                else:
-                    raise e
+        return dict(
+            model=self.model_name,
+            config=types.GenerateContentConfig(
+                tools=tool_params,
+                system_instruction=system_prompt,
+                temperature=temperature,
+                max_output_tokens=max_tokens,
+                tool_config={'function_calling_config': {'mode': mode}}
+                ),
+            contents=gemini_messages,
+        )
 
+    def _with_deadline(self, request: dict[str, Any]) -> dict[str, Any]:
+        """The request with an HTTP timeout that ends at the current cancellation deadline."""
+        timeout = cancellation.remaining()
+        if timeout is None:
+            return request
+        http_options = types.HttpOptions(timeout=max(int(timeout * 1000), 1))
+        return {**request, "config": request["config"].model_copy(update={"http_options": http_options})}
+
+    def _parse_response(
+        self, text: str | None, function_calls: list[types.FunctionCall] | None
+    ) -> list[AssistantContentBlock]:
+        """Convert response text and function calls back to internal blocks."""
         internal_messages = []
-        if response.text:
-            internal_messages.append(TextResult(text=response.text))
+        if text:
+            internal_messages.append(TextResult(text=text))
 
-        if response.function_calls:
-            for fn_call in response.function_calls:
+        if function_calls:
+            for fn_call in function_calls:
                 response_message_content = ToolCall(
                     tool_call_id=fn_call.id if fn_call.id else generate_tool_call_id(),
                     tool_name=fn_call.name,
@@ -191,10 +389,48 @@ class GeminiDirectClient(LLMClient):
                 )
                 internal_messages.append(response_message_content)
 
+        return internal_messages
+
+
+class _GeminiStreamState:
+    """Accumulates one streamed generate_content response into StreamEvents."""
+
+    def __init__(self, client: GeminiDirectClient):
+        self.client = client
+        self.emitted = False
+        self.text_parts: list[str] = []
+        self.tool_calls: list[ToolCall] = []
+        self.usage_metadata = None
+
+    def feed(self, chunk: types.GenerateContentResponse) -> list[StreamEvent]:
+        """Consume one chunk and return the events it carries."""
+        events: list[StreamEvent] = []
+        if chunk.usage_metadata is not None:
+            self.usage_metadata = chunk.usage_metadata
+        if not chunk.candidates or chunk.candidates[0].content is None:
+            return events
+        for part in chunk.candidates[0].content.parts or []:
+            if part.function_call is not None:
+                # Function calls arrive whole, so they can be announced at once.
+                tool_call = cast(ToolCall, self.client._parse_response(None, [part.function_call])[0])
+                self.tool_calls.append(tool_call)
+                events.append(StreamEvent(type="tool_call", tool_call=tool_call))
+            elif part.text and part.thought:
+                events.append(StreamEvent(type="thinking_delta", text=part.text))
+            elif part.text:
+                self.text_parts.append(part.text)
+                events.append(StreamEvent(type="text_delta", text=part.text))
+        self.emitted = self.emitted or bool(events)
+        return events
+
+    def message(self) -> StreamEvent:
+        """The final message event, reusing the tool calls already announced."""
+        internal_messages = self.client._parse_response("".join(self.text_parts), None)
+        internal_messages += self.tool_calls
+        usage_metadata = self.usage_metadata
         message_metadata = {
-            "raw_response": response,
-            "input_tokens": response.usage_metadata.prompt_token_count,
-            "output_tokens": response.usage_metadata.candidates_token_count,
+            "raw_response": None,
+            "input_tokens": usage_metadata.prompt_token_count if usage_metadata else 0,
+            "output_tokens": usage_metadata.candidates_token_count if usage_metadata else 0,
         }
-        
-        return internal_messages, message_metadata
+        return StreamEvent(type="message", content=internal_messages, metadata=message_metadata)
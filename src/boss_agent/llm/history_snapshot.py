@@ -0,0 +1,160 @@
+"""On-disk snapshots of a session's message history, for resuming the session later.
+
+A snapshot is a JSON lines file with one record per line:
+
+* ``{"turn": [...]}`` - a message list appended to the history, one object per block;
+* ``{"context": {...}}`` - the context manager's state (e.g. the summary tiers);
+* ``{"tools": {...}}`` - the session state of the agent's tools (e.g. dataframe sources).
+
+Appending a turn writes one line. When the history is rewritten (truncation, clearing)
+the whole file is replaced by the current turns and the latest state, which also keeps
+it compact. On load, turns accumulate in order and the last state record of each kind
+wins; a partially written line from an interrupted write is skipped.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+from anthropic.types import (
+    RedactedThinkingBlock as AnthropicRedactedThinkingBlock,
+    ThinkingBlock as AnthropicThinkingBlock,
+)
+
+from boss_agent.llm.base import (
+    ContentBlock,
+    GeneralContentBlock,
+    ImageBlock,
+    SessionSummary,
+    TextPrompt,
+    TextResult,
+    ToolCall,
+    ToolFormattedResult,
+)
+
+logger = logging.getLogger(__name__)
+
+_CONTENT_BLOCK_TYPES: dict[str, type[ContentBlock]] = {
+    block_type.__name__: block_type
+    for block_type in (
+        TextPrompt,
+        TextResult,
+        ToolCall,
+        ToolFormattedResult,
+        ImageBlock,
+        SessionSummary,
+    )
+}
+_THINKING_BLOCK_TYPES = {
+    "thinking": AnthropicThinkingBlock,
+    "redacted_thinking": AnthropicRedactedThinkingBlock,
+}
+
+
+def block_to_dict(block: GeneralContentBlock) -> dict[str, Any]:
+    """The JSON form of a history block, tagged with its type under ``"block"``."""
+    if isinstance(block, ContentBlock):
+        return {"block": type(block).__name__, **block.to_dict()}
+    if isinstance(block, (AnthropicThinkingBlock, AnthropicRedactedThinkingBlock)):
+        return {"block": block.type, **block.model_dump()}
+    raise ValueError(f"Unknown message type: {type(block)}")
+
+
+def block_from_dict(data: dict[str, Any]) -> GeneralContentBlock:
+    data = dict(data)
+    tag = data.pop("block")
+    if tag in _CONTENT_BLOCK_TYPES:
+        return _CONTENT_BLOCK_TYPES[tag].from_dict(data)
+    if tag in _THINKING_BLOCK_TYPES:
+        return _THINKING_BLOCK_TYPES[tag].model_validate(data)
+    raise ValueError(f"Unknown block type in snapshot: {tag}")
+
+
+class HistorySnapshot:
+    """The snapshot file of one session; see the module docstring for the format."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        # The latest tool state, rewritten along with the turns.
+        self._tool_state: dict[str, Any] = {}
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def append_turn(self, turn: list[GeneralContentBlock]):
+        self._append({"turn": [block_to_dict(block) for block in turn]})
+
+    def set_tool_state(self, tool_state: dict[str, Any]):
+        """Record the tools' session state, if it changed since it was last recorded."""
+        if tool_state == self._tool_state:
+            return
+        self._tool_state = tool_state
+        self._append({"tools": tool_state})
+
+    def rewrite(
+        self,
+        message_lists: list[list[GeneralContentBlock]],
+        context_state: dict[str, Any],
+    ):
+        """Replace the snapshot with ``message_lists`` and the latest state."""
+        lines = [
+            json.dumps({"context": context_state}),
+            json.dumps({"tools": self._tool_state}),
+        ]
+        lines.extend(
+            json.dumps({"turn": [block_to_dict(block) for block in turn]})
+            for turn in message_lists
+        )
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary name first so a crash never leaves half a snapshot.
+            temporary_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            temporary_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+            os.replace(temporary_path, self.path)
+
+    def load(
+        self,
+    ) -> tuple[list[list[GeneralContentBlock]], dict[str, Any], dict[str, Any]]:
+        """Return (message lists, context state, tool state); empty if there is no snapshot."""
+        message_lists: list[list[GeneralContentBlock]] = []
+        context_state: dict[str, Any] = {}
+        tool_state: dict[str, Any] = {}
+        try:
+            lines = self.path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return message_lists, context_state, tool_state
+
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Ignoring a partially written record in {self.path}")
+                continue
+            if "turn" in record:
+                message_lists.append(
+                    [block_from_dict(block) for block in record["turn"]]
+                )
+            elif "context" in record:
+                context_state = record["context"]
+            elif "tools" in record:
+                tool_state = record["tools"]
+
+        self._tool_state = tool_state
+        return message_lists, context_state, tool_state
+
+    def _append(self, record: dict[str, Any]):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as snapshot_file:
+                snapshot_file.write(line)
+
+
+def snapshot_path(snapshot_dir: Path | str, session_id: Any) -> Path:
+    return Path(snapshot_dir) / f"{session_id}.jsonl"
@@ -4,21 +4,16 @@ from boss_agent.llm.base import (
     AssistantContentBlock,
     GeneralContentBlock,
     LLMMessages,
-    DataClassJsonMixin,
-    dataclass,
     TextPrompt,
     TextResult,
     ToolCall,
     ToolCallParameters,
     ToolFormattedResult,
     ImageBlock,
+    SessionSummary,
 )
 from boss_agent.llm.context_manager.base import ContextManager
-
-@dataclass
-class SessionSummary(DataClassJsonMixin):
-    """Internal representation of a summary of the session so far."""
-    text: str
+from boss_agent.llm.history_snapshot import HistorySnapshot
 
 
 class MessageHistory:
@@ -30,6 +25,22 @@ class MessageHistory:
         self._last_user_prompt_index: int | None = (
             None  # Track the last user prompt index
         )
+        # Running token tally: (tokens, thinking tokens) per message list, measured
+        # once when the list is added, and the sum of the first column.
+        self._turn_tokens: list[tuple[int, int]] = []
+        self._total_tokens = 0
+        # Tool call/result pairing, kept up to date as turns are appended so that
+        # the full integrity pass only runs when the pairing is actually broken or
+        # the message lists were replaced.
+        self._tool_call_ids: set[str] = set()
+        self._tool_result_ids: set[str] = set()
+        self._unpaired_ids: set[str] = set()
+        self._needs_integrity_pass = False
+        # Where the history is persisted as it changes, if anywhere.
+        self.snapshot: Optional[HistorySnapshot] = None
+        # Bumped by every change, so that a truncation computed off the event loop is
+        # only applied to the history it was computed from.
+        self._generation = 0
 
     @classmethod
     def _ensure_tool_call_integrity(
@@ -127,30 +138,22 @@ class MessageHistory:
         for msg in messages:
             if not isinstance(msg, (TextPrompt, ToolFormattedResult, ImageBlock, SessionSummary)):
                 raise TypeError(f"Invalid message type for user turn: {type(msg)}")
-        self._message_lists.append(messages)
+        self._append_turn(messages)
 
     def add_session_summary(self, summary_text: str):
         """Adds a session summary message."""
         self.add_user_turn([SessionSummary(text=summary_text)])
 
     def add_assistant_turn(self, messages: list[AssistantContentBlock]):
-        """Adds an assistant turn (text response and/or tool calls)."""
-        messages_with_one_tool_call = []
-        has_tool_call = False
-        for message in messages:
-            if isinstance(message, ToolCall) and not has_tool_call:
-                has_tool_call = True
-                messages_with_one_tool_call.append(message)
-            elif isinstance(message, ToolCall) and has_tool_call:
-                print("WARNING: Multiple tool calls in one turn are not supported, selecting the first tool call")
-            else:
-                messages_with_one_tool_call.append(message)
-        self._message_lists.append(cast(list[GeneralContentBlock], messages_with_one_tool_call))
+        """Adds an assistant turn (text response and/or any number of tool calls)."""
+        self._append_turn(cast(list[GeneralContentBlock], list(messages)))
 
     def get_messages_for_llm(self) -> LLMMessages:  # TODO: change name to get_messages
-        """Returns messages formatted for the LLM client."""
-        # Return a copy to prevent modification
-        return list(self._message_lists)
+        """Returns messages formatted for the LLM client.
+
+        This is the history's own list, not a copy; callers must not modify it.
+        """
+        return self._message_lists
 
     def get_pending_tool_calls(self) -> list[ToolCallParameters]:
         """Returns tool calls from the last assistant turn, if any."""
@@ -167,15 +170,19 @@ class MessageHistory:
                 )
         return tool_calls
 
-    def add_tool_call_result(self, parameters: ToolCallParameters, result: str):
+    def add_tool_call_result(
+        self, parameters: ToolCallParameters, result: str | list[dict[str, Any]]
+    ):
         """Add the result of a tool call to the dialog."""
         self.add_tool_call_results([parameters], [result])
 
     def add_tool_call_results(
-        self, parameters: list[ToolCallParameters], results: list[str]
+        self,
+        parameters: list[ToolCallParameters],
+        results: list[str | list[dict[str, Any]]],
     ):
-        """Add the result of a tool call to the dialog."""
-        self._message_lists.append(
+        """Add the results of one turn's tool calls to the dialog as a single user turn."""
+        self._append_turn(
             [
                 ToolFormattedResult(
                     tool_call_id=params.tool_call_id,
@@ -199,8 +206,13 @@ class MessageHistory:
 
     def clear(self):
         """Removes all messages."""
+        self._generation += 1
         self._message_lists = []
         self._last_user_prompt_index = None
+        self._turn_tokens = []
+        self._total_tokens = 0
+        self._reset_tool_pairing()
+        self._rewrite_snapshot()
 
     def clear_from_last_to_user_message(self):
         """Clears messages from the last turn backwards to the last user prompt (inclusive).
@@ -210,7 +222,12 @@ class MessageHistory:
             return
 
         # Keep messages up to and excluding the last user prompt
+        self._generation += 1
         self._message_lists = self._message_lists[: self._last_user_prompt_index]
+        self._turn_tokens = self._turn_tokens[: self._last_user_prompt_index]
+        self._total_tokens = sum(tokens for tokens, _ in self._turn_tokens)
+        self._rebuild_tool_pairing()
+        self._rewrite_snapshot()
         # Reset the last user prompt index since we've cleared after it
         self._last_user_prompt_index = None
 
@@ -254,16 +271,139 @@ class MessageHistory:
 
     def set_message_list(self, message_list: list[list[GeneralContentBlock]]):
         """Sets the message list and ensures tool call integrity."""
+        # Message lists that come through unchanged keep their tally; only new or
+        # filtered ones (summaries, dropped tool calls) are measured.
+        known_tokens = {
+            tuple(map(id, turn)): tokens
+            for turn, tokens in zip(self._message_lists, self._turn_tokens)
+        }
+        self._generation += 1
         self._message_lists = MessageHistory._ensure_tool_call_integrity(message_list)
+        self._turn_tokens = [
+            known_tokens.get(tuple(map(id, turn))) or self._measure_turn(turn)
+            for turn in self._message_lists
+        ]
+        self._total_tokens = sum(tokens for tokens, _ in self._turn_tokens)
+        self._rebuild_tool_pairing()
+        self._rewrite_snapshot()
+
+    def restore_snapshot(self, snapshot: HistorySnapshot) -> dict[str, Any]:
+        """Replace the history with the contents of ``snapshot`` and keep persisting to it.
+
+        Returns the tool state recorded in the snapshot.
+        """
+        message_lists, context_state, tool_state = snapshot.load()
+        self.snapshot = snapshot
+        if self._context_manager is not None:
+            self._context_manager.restore_state(context_state, message_lists)
+        self.set_message_list(message_lists)
+        self._last_user_prompt_index = None
+        return tool_state
 
     def count_tokens(self):
-        """Counts the tokens in the message list."""
-        return self._context_manager.count_tokens(self.get_messages_for_llm())
+        """Counts the tokens in the message list, from the running tally."""
+        if not self._turn_tokens:
+            return 0
+        # Thinking only counts in the last message list, as in ContextManager.count_tokens.
+        return self._total_tokens + self._turn_tokens[-1][1]
 
     def truncate(self) -> None:
         """Remove oldest messages when context window limit is exceeded."""
+        self.apply_truncation(*self.compute_truncation())
+
+    def compute_truncation(self) -> tuple[int, Optional[LLMMessages]]:
+        """Compute what ``truncate`` would do, without changing the history.
+
+        May run in a worker thread, as it may call the summarization model. Returns
+        the history's generation and the truncated message lists, or None if the
+        history needs no change; pass both to ``apply_truncation``.
+        """
+        generation = self._generation
+        # A copy, as the history may be appended to while this runs.
+        message_lists = list(self._message_lists)
         truncated_messages_for_llm = self._context_manager.apply_truncation_if_needed(
-            self.get_messages_for_llm()
+            message_lists, self.count_tokens()
         )
+        if truncated_messages_for_llm is message_lists and self.tool_calls_paired():
+            return generation, None
+        return generation, truncated_messages_for_llm
+
+    def apply_truncation(self, generation: int, truncated: Optional[LLMMessages]) -> bool:
+        """Apply a truncation from ``compute_truncation``.
+
+        It is discarded if the history changed since it was computed, e.g. a
+        cancelled run added its placeholder turn; returns whether it was applied.
+        """
+        if truncated is None:
+            return True
+        if generation != self._generation:
+            return False
+        self.set_message_list(truncated)
+        return True
+
+    def tool_calls_paired(self) -> bool:
+        """Whether every tool call has its result and every result its call.
 
-        self.set_message_list(truncated_messages_for_llm)
+        When this holds, ``_ensure_tool_call_integrity`` would not change the history.
+        """
+        return not self._unpaired_ids and not self._needs_integrity_pass
+
+    def _append_turn(self, turn: list[GeneralContentBlock]):
+        tokens = self._measure_turn(turn)
+        self._generation += 1
+        self._message_lists.append(turn)
+        self._turn_tokens.append(tokens)
+        self._total_tokens += tokens[0]
+        self._track_tool_pairing(turn)
+        if self.snapshot is not None:
+            self.snapshot.append_turn(turn)
+
+    def _rewrite_snapshot(self):
+        if self.snapshot is None:
+            return
+        context_state = (
+            self._context_manager.get_state(self._message_lists) if self._context_manager is not None else {}
+        )
+        self.snapshot.rewrite(self._message_lists, context_state)
+
+    def _track_tool_pairing(self, turn: list[GeneralContentBlock]):
+        has_results = False
+        has_other_blocks = False
+        for block in turn:
+            if isinstance(block, ToolCall):
+                self._pair(block.tool_call_id, self._tool_call_ids, self._tool_result_ids)
+            elif isinstance(block, ToolFormattedResult):
+                has_results = True
+                self._pair(block.tool_call_id, self._tool_result_ids, self._tool_call_ids)
+            else:
+                has_other_blocks = True
+        # The integrity pass drops anything but tool results from a turn with results.
+        if has_results and has_other_blocks:
+            self._needs_integrity_pass = True
+
+    def _pair(self, tool_call_id: Optional[str], own_ids: set[str], counterpart_ids: set[str]):
+        if tool_call_id is None:
+            # Blocks without an id can never be paired; leave them to the full pass.
+            self._needs_integrity_pass = True
+            return
+        own_ids.add(tool_call_id)
+        if tool_call_id in counterpart_ids:
+            self._unpaired_ids.discard(tool_call_id)
+        else:
+            self._unpaired_ids.add(tool_call_id)
+
+    def _reset_tool_pairing(self):
+        self._tool_call_ids = set()
+        self._tool_result_ids = set()
+        self._unpaired_ids = set()
+        self._needs_integrity_pass = False
+
+    def _rebuild_tool_pairing(self):
+        self._reset_tool_pairing()
+        for turn in self._message_lists:
+            self._track_tool_pairing(turn)
+
+    def _measure_turn(self, turn: list[GeneralContentBlock]) -> tuple[int, int]:
+        if self._context_manager is None:
+            return 0, 0
+        return self._context_manager.count_turn_tokens(turn)
@@ -1,13 +1,18 @@
 """LLM client for Anthropic models."""
 
+import asyncio
 import json
 import os
-import random
-import time
-from typing import Any, Tuple, cast
+from dataclasses import replace
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Iterator, Tuple, cast
 import openai
 import logging
 
+from boss_agent.core import cancellation
+from boss_agent.llm.client_registry import credential_key, shared_client
+from boss_agent.llm.rate_limit import RequestThrottle, estimate_tokens, get_retry_policy
+
 logger = logging.getLogger(__name__)
 
 from openai import (
@@ -26,19 +31,41 @@ from openai._types import (
 from boss_agent.llm.base import (
     LLMClient,
     AssistantContentBlock,
+    BlockConversionCache,
     LLMMessages,
     ToolParam,
     TextPrompt,
     ToolCall,
     TextResult,
     ToolFormattedResult,
+    SessionSummary,
+    StreamEvent,
 )
 
 
+def _to_openai_tool_call(tool_call: ToolCall) -> dict[str, Any]:
+    # Ensure arguments are stringified JSON for the OpenAI API call
+    try:
+        arguments_str = json.dumps(tool_call.tool_input)
+    except TypeError as e:
+        logger.error(f"Failed to serialize tool_input to JSON string for tool '{tool_call.tool_name}': {tool_call.tool_input}. Error: {str(e)}")
+        raise ValueError(f"Cannot serialize tool arguments for {tool_call.tool_name}: {str(e)}") from e
+    return {
+        "type": "function",
+        "id": tool_call.tool_call_id,
+        "function": {
+            "name": tool_call.tool_name,
+            "arguments": arguments_str, # Use the JSON string
+        },
+    }
+
+
 class OpenAIDirectClient(LLMClient):
     """Use OpenAI models via first party API."""
 
-    def __init__(self, model_name: str, max_retries=2, cot_model: bool = True, azure_model: bool = False):
+    def __init__(
+        self, model_name: str, max_retries: int | None = None, cot_model: bool = True, azure_model: bool = False
+    ):
         """Initialize the OpenAI first party client."""
         api_key = os.getenv("OPENAI_API_KEY", "EMPTY")
         base_url = os.getenv("OPENAI_BASE_URL", "http://0.0.0.0:2323")
@@ -46,17 +73,68 @@ class OpenAIDirectClient(LLMClient):
             azure_endpoint = os.getenv("OPENAI_AZURE_ENDPOINT", "http://0.0.0.0:2323")
             api_key = os.getenv("OPENAI_API_KEY", "EMPTY")
             api_version = os.getenv("AZURE_API_VERSION", "2024-12-01-preview")
-            self.client = openai.AzureOpenAI(
-                api_key=api_key,
-                azure_endpoint=azure_endpoint,
-                api_version=api_version,
-                max_retries=max_retries,
+            self.client, self.async_client = shared_client(
+                "azure-openai",
+                (azure_endpoint, api_version, credential_key(api_key)),
+                lambda settings: (
+                    openai.AzureOpenAI(
+                        api_key=api_key,
+                        azure_endpoint=azure_endpoint,
+                        api_version=api_version,
+                        max_retries=0,
+                        **settings.sdk_client_kwargs(openai),
+                    ),
+                    openai.AsyncAzureOpenAI(
+                        api_key=api_key,
+                        azure_endpoint=azure_endpoint,
+                        api_version=api_version,
+                        max_retries=0,
+                        **settings.sdk_client_kwargs(openai, asynchronous=True),
+                    ),
+                ),
             )
         else:
-            self.client = openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=max_retries)
+            self.client, self.async_client = shared_client(
+                "openai",
+                (base_url, credential_key(api_key)),
+                lambda settings: (
+                    openai.OpenAI(
+                        api_key=api_key,
+                        base_url=base_url,
+                        max_retries=0,
+                        **settings.sdk_client_kwargs(openai),
+                    ),
+                    openai.AsyncOpenAI(
+                        api_key=api_key,
+                        base_url=base_url,
+                        max_retries=0,
+                        **settings.sdk_client_kwargs(openai, asynchronous=True),
+                    ),
+                ),
+            )
         self.model_name = model_name
-        self.max_retries = max_retries
+        # Retries are handled here rather than by the SDK, see rate_limit.
+        self.throttle = RequestThrottle(
+            "openai",
+            model_name,
+            None if max_retries is None else replace(get_retry_policy(), max_attempts=max_retries),
+        )
+        self.max_retries = self.throttle.max_attempts
         self.cot_model = cot_model
+        # Each block converts to (where it goes, its OpenAI form).
+        self._conversions = BlockConversionCache(
+            {
+                TextPrompt: lambda block: ("user", {"type": "text", "text": block.text}),
+                TextResult: lambda block: ("assistant_content", {"type": "text", "text": block.text}),
+                ToolCall: lambda block: ("tool_call", _to_openai_tool_call(block)),
+                ToolFormattedResult: lambda block: (
+                    "tool",
+                    {"role": "tool", "tool_call_id": block.tool_call_id, "content": block.plain_tool_output()},
+                ),
+                # Session summaries are bookkeeping for the agent and are not sent to the model.
+                SessionSummary: lambda block: ("skip", None),
+            }
+        )
 
     def generate(
         self,
@@ -81,7 +159,208 @@ class OpenAIDirectClient(LLMClient):
         Returns:
             A generated response.
         """
+        request = self._build_request(
+            messages, max_tokens, system_prompt, temperature, tools, tool_choice
+        )
+        tokens = estimate_tokens(messages, system_prompt)
+
+        response = None
+        for retry in range(self.max_retries):
+            try:
+                cancellation.raise_if_cancelled()
+                self.throttle.limiter.acquire(tokens)
+                response = self.client.chat.completions.create(**request, **cancellation.timeout_kwargs())
+                break
+            except (
+                OpenAI_APIConnectionError,
+                OpenAI_InternalServerError,
+                OpenAI_RateLimitError,
+            ) as e:
+                if retry == self.max_retries - 1:
+                    print(f"Failed OpenAI request after {retry + 1} retries")
+                    raise e
+                else:
+                    cancellation.sleep(self.throttle.backoff(retry, e))
+
+        # Convert messages back to internal format
+        assert response is not None
+        openai_response_messages = response.choices
+        if len(openai_response_messages) > 1:
+            raise ValueError("Only one message supported for OpenAI")
+        openai_response_message = openai_response_messages[0].message
+        internal_messages = self._parse_response(
+            openai_response_message.content, openai_response_message.tool_calls, tools
+        )
+
+        assert response.usage is not None
+        message_metadata = {
+            "raw_response": response,
+            "input_tokens": response.usage.prompt_tokens,
+            "output_tokens": response.usage.completion_tokens,
+        }
+        self.throttle.limiter.settle(tokens, message_metadata)
+
+        return internal_messages, message_metadata
+
+    def generate_stream(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> Iterator[StreamEvent]:
+        """Generate a response, yielding text deltas as the model produces them.
+
+        Tool-call arguments are accumulated from their deltas; each call is announced
+        once the next one starts (or the stream ends) and parsed like a non-streamed
+        response.
+        """
+        request = self._build_stream_request(
+            messages, max_tokens, system_prompt, temperature, tools, tool_choice
+        )
+        tokens = estimate_tokens(messages, system_prompt)
+
+        for retry in range(self.max_retries):
+            state = _ChatStreamState(self, tools)
+            try:
+                cancellation.raise_if_cancelled()
+                self.throttle.limiter.acquire(tokens)
+                stream = self.client.chat.completions.create(**request, **cancellation.timeout_kwargs())
+                # Closing the stream aborts the blocking read and frees the connection.
+                with cancellation.on_cancel(lambda: stream.close()):
+                    for chunk in stream:
+                        yield from state.feed(chunk)
+                yield from state.finish()
+                break
+            except (
+                OpenAI_APIConnectionError,
+                OpenAI_InternalServerError,
+                OpenAI_RateLimitError,
+            ) as e:
+                # Deltas already shown to the user cannot be taken back, so only a
+                # stream that failed before producing anything is retried.
+                if state.emitted or retry == self.max_retries - 1:
+                    print(f"Failed OpenAI request after {retry + 1} retries")
+                    raise e
+                else:
+                    cancellation.sleep(self.throttle.backoff(retry, e))
+
+        message = state.message()
+        self.throttle.limiter.settle(tokens, message.metadata)
+        yield message
+
+    async def agenerate(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> Tuple[list[AssistantContentBlock], dict[str, Any]]:
+        """Async variant of ``generate`` on the async OpenAI client."""
+        request = self._build_request(
+            messages, max_tokens, system_prompt, temperature, tools, tool_choice
+        )
+        tokens = estimate_tokens(messages, system_prompt)
+
+        response = None
+        for retry in range(self.max_retries):
+            try:
+                await self.throttle.limiter.aacquire(tokens)
+                response = await self.async_client.chat.completions.create(**request, **cancellation.timeout_kwargs())
+                break
+            except (
+                OpenAI_APIConnectionError,
+                OpenAI_InternalServerError,
+                OpenAI_RateLimitError,
+            ) as e:
+                if retry == self.max_retries - 1:
+                    print(f"Failed OpenAI request after {retry + 1} retries")
+                    raise e
+                else:
+                    await asyncio.sleep(self.throttle.backoff(retry, e))
+
+        assert response is not None
+        if len(response.choices) > 1:
+            raise ValueError("Only one message supported for OpenAI")
+        response_message = response.choices[0].message
+        internal_messages = self._parse_response(
+            response_message.content, response_message.tool_calls, tools
+        )
+
+        assert response.usage is not None
+        message_metadata = {
+            "raw_response": response,
+            "input_tokens": response.usage.prompt_tokens,
+            "output_tokens": response.usage.completion_tokens,
+        }
+        self.throttle.limiter.settle(tokens, message_metadata)
 
+        return internal_messages, message_metadata
+
+    async def agenerate_stream(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> AsyncIterator[StreamEvent]:
+        """Async variant of ``generate_stream`` on the async OpenAI client."""
+        request = self._build_stream_request(
+            messages, max_tokens, system_prompt, temperature, tools, tool_choice
+        )
+        tokens = estimate_tokens(messages, system_prompt)
+
+        for retry in range(self.max_retries):
+            state = _ChatStreamState(self, tools)
+            try:
+                await self.throttle.limiter.aacquire(tokens)
+                async for chunk in await self.async_client.chat.completions.create(**request, **cancellation.timeout_kwargs()):
+                    for event in state.feed(chunk):
+                        yield event
+                for event in state.finish():
+                    yield event
+                break
+            except (
+                OpenAI_APIConnectionError,
+                OpenAI_InternalServerError,
+                OpenAI_RateLimitError,
+            ) as e:
+                if state.emitted or retry == self.max_retries - 1:
+                    print(f"Failed OpenAI request after {retry + 1} retries")
+                    raise e
+                else:
+                    await asyncio.sleep(self.throttle.backoff(retry, e))
+
+        message = state.message()
+        self.throttle.limiter.settle(tokens, message.metadata)
+        yield message
+
+    def _build_stream_request(self, *args: Any) -> dict[str, Any]:
+        request = self._build_request(*args)
+        request["stream"] = True
+        request["stream_options"] = {"include_usage": True}
+        return request
+
+    def _build_request(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None,
+        temperature: float,
+        tools: list[ToolParam],
+        tool_choice: dict[str, str] | None,
+    ) -> dict[str, Any]:
+        """Convert internal messages and tools into chat.completions.create kwargs."""
+        self._conversions.new_request()
         openai_messages = []
         system_prompt_applied = False
 
@@ -92,75 +371,32 @@ class OpenAIDirectClient(LLMClient):
                 system_prompt_applied = True
 
         for idx, message_list in enumerate(messages):
-            if len(message_list) > 1:
-                raise ValueError("Only one entry per message supported for openai")
-            internal_message = message_list[0]
-            
-            current_message_text = ""
-            is_user_prompt = False
-
-            if str(type(internal_message)) == str(TextPrompt):
-                internal_message = cast(TextPrompt, internal_message)
-                current_message_text = internal_message.text
-                is_user_prompt = True
-                role = "user"
-            elif str(type(internal_message)) == str(TextResult):
-                internal_message = cast(TextResult, internal_message)
-                # For TextResult (assistant), content is handled differently by OpenAI API
-                message_content_obj = {"type": "text", "text": internal_message.text}
-                openai_message = {"role": "assistant", "content": [message_content_obj]}
-                openai_messages.append(openai_message)
-                continue # Move to next message in outer loop
-            elif str(type(internal_message)) == str(ToolCall):
-                internal_message = cast(ToolCall, internal_message)
-                # Ensure arguments are stringified JSON for the OpenAI API call
-                try:
-                    arguments_str = json.dumps(internal_message.tool_input)
-                except TypeError as e:
-                    logger.error(f"Failed to serialize tool_input to JSON string for tool '{internal_message.tool_name}': {internal_message.tool_input}. Error: {str(e)}")
-                    # Decide how to handle: skip this message, or raise, or send with potentially malformed args? For now, let's raise.
-                    raise ValueError(f"Cannot serialize tool arguments for {internal_message.tool_name}: {str(e)}") from e
-                
-                tool_call_payload = {
-                    "type": "function",
-                    "id": internal_message.tool_call_id,
-                    "function": {
-                        "name": internal_message.tool_name,
-                        "arguments": arguments_str, # Use the JSON string
-                    },
-                }
-                openai_message = {
-                    "role": "assistant",
-                    "tool_calls": [tool_call_payload],
-                    # Content is implicitly None or omitted by not setting it
-                }
-                openai_messages.append(openai_message)
-                continue # Move to next message in outer loop
-            elif str(type(internal_message)) == str(ToolFormattedResult):
-                internal_message = cast(ToolFormattedResult, internal_message)
-                openai_message = {
-                    "role": "tool",
-                    "tool_call_id": internal_message.tool_call_id,
-                    "content": internal_message.tool_output,
-                }
-                openai_messages.append(openai_message)
-                continue # Move to next message in outer loop
-            else:
-                print(
-                    f"Unknown message type: {type(internal_message)}, expected one of {str(TextPrompt)}, {str(TextResult)}, {str(ToolCall)}, {str(ToolFormattedResult)}"
-                )
-                raise ValueError(f"Unknown message type: {type(internal_message)}")
-
-            # This part now only applies to TextPrompt (user messages)
-            if is_user_prompt:
-                final_text_for_user_message = current_message_text
-                # If cot_model is True, system_prompt is not None, and it hasn't been applied yet (i.e., this is the first user message opportunity)
-                if self.cot_model and system_prompt and not system_prompt_applied:
-                    final_text_for_user_message = f"{system_prompt}\n\n{current_message_text}"
-                    system_prompt_applied = True # Mark as applied
-                
-                message_content_obj = {"type": "text", "text": final_text_for_user_message}
-                openai_message = {"role": role, "content": [message_content_obj]}
+            assistant_content = []
+            assistant_tool_calls = []
+            for internal_message in message_list:
+                kind, converted = self._conversions.convert(internal_message)
+                if kind == "user":
+                    # If cot_model is True, system_prompt is not None, and it hasn't been applied yet (i.e., this is the first user message opportunity)
+                    if self.cot_model and system_prompt and not system_prompt_applied:
+                        converted = {"type": "text", "text": f"{system_prompt}\n\n{converted['text']}"}
+                        system_prompt_applied = True # Mark as applied
+                    openai_messages.append({"role": "user", "content": [converted]})
+                elif kind == "assistant_content":
+                    # For TextResult (assistant), content is handled differently by OpenAI API
+                    assistant_content.append(converted)
+                elif kind == "tool_call":
+                    assistant_tool_calls.append(converted)
+                elif kind == "tool":
+                    # Each result of a (possibly parallel) tool call is its own "tool" message.
+                    openai_messages.append(converted)
+
+            # Text and all tool calls of one assistant turn go into a single assistant message.
+            if assistant_content or assistant_tool_calls:
+                openai_message = {"role": "assistant"}
+                if assistant_content:
+                    openai_message["content"] = assistant_content
+                if assistant_tool_calls:
+                    openai_message["tool_calls"] = assistant_tool_calls
                 openai_messages.append(openai_message)
 
         # If cot_model is True and system_prompt was provided but not applied (e.g., no user messages found, though unlikely for an agent)
@@ -201,54 +437,33 @@ class OpenAIDirectClient(LLMClient):
             }
             openai_tools.append(openai_tool_object)
 
-        response = None
-        for retry in range(self.max_retries):
-            try:
-                extra_body = {}
-                openai_max_tokens = max_tokens
-                openai_temperature = temperature
-                if self.cot_model:
-                    extra_body["max_completion_tokens"] = max_tokens
-                    openai_max_tokens = OpenAI_NOT_GIVEN
-                    openai_temperature = OpenAI_NOT_GIVEN
-                response = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=openai_messages,
-                    tools=openai_tools if len(openai_tools) > 0 else OpenAI_NOT_GIVEN,
-                    tool_choice=tool_choice_param,
-                    max_tokens=openai_max_tokens,
-                    extra_body=extra_body,
-                )
-                break
-            except (
-                OpenAI_APIConnectionError,
-                OpenAI_InternalServerError,
-                OpenAI_RateLimitError,
-            ) as e:
-                if retry == self.max_retries - 1:
-                    print(f"Failed OpenAI request after {retry + 1} retries")
-                    raise e
-                else:
-                    print(f"Retrying OpenAI request: {retry + 1}/{self.max_retries}")
-                    # Sleep 8-12 seconds with jitter to avoid thundering herd.
-                    time.sleep(10 * random.uniform(0.8, 1.2))
+        extra_body = {}
+        openai_max_tokens = max_tokens
+        if self.cot_model:
+            extra_body["max_completion_tokens"] = max_tokens
+            openai_max_tokens = OpenAI_NOT_GIVEN
 
-        # Convert messages back to internal format
-        internal_messages = []
-        assert response is not None
-        openai_response_messages = response.choices
-        if len(openai_response_messages) > 1:
-            raise ValueError("Only one message supported for OpenAI")
-        openai_response_message = openai_response_messages[0].message
-        tool_calls = openai_response_message.tool_calls
-        content = openai_response_message.content
+        return dict(
+            model=self.model_name,
+            messages=openai_messages,
+            tools=openai_tools if len(openai_tools) > 0 else OpenAI_NOT_GIVEN,
+            tool_choice=tool_choice_param,
+            max_tokens=openai_max_tokens,
+            extra_body=extra_body,
+        )
 
-        # Exactly one of tool_calls or content should be present
-        if tool_calls and content:
-            raise ValueError("Only one of tool_calls or content should be present")
-        elif not tool_calls and not content:
+    def _parse_response(
+        self, content: str | None, tool_calls: list[Any] | None, tools: list[ToolParam]
+    ) -> list[AssistantContentBlock]:
+        """Convert the assistant content and tool calls back to internal blocks."""
+        internal_messages = []
+        # At least one of tool_calls or content should be present
+        if not tool_calls and not content:
             raise ValueError("Either tool_calls or content should be present")
 
+        if content:
+            internal_messages.append(TextResult(text=content))
+
         if tool_calls:
             available_tool_names = {t.name for t in tools} # Get set of known tool names
             logger.info(f"Model returned {len(tool_calls)} tool_calls. Available tools: {available_tool_names}")
@@ -285,24 +500,94 @@ class OpenAIDirectClient(LLMClient):
                         )
                     )
                     processed_tool_call = True
-                    logger.info(f"Successfully processed and selected tool call: {tool_name_from_model}")
-                    break # Processed the first valid and available tool call
+                    logger.info(f"Successfully processed tool call: {tool_name_from_model}")
                 else:
                     logger.warning(f"Skipping tool call with unknown or placeholder name: '{tool_name_from_model}'. Not in available tools: {available_tool_names}")
             
             if not processed_tool_call:
                 logger.warning("No valid and available tool calls found after filtering.")
 
-        elif content:
-            internal_messages.append(TextResult(text=content))
-        else:
-            raise ValueError(f"Unknown message type: {openai_response_message}")
+        return internal_messages
 
-        assert response.usage is not None
+
+class _ChatStreamState:
+    """Accumulates one streamed chat completion into StreamEvents."""
+
+    def __init__(self, client: OpenAIDirectClient, tools: list[ToolParam]):
+        self.client = client
+        self.tools = tools
+        self.emitted = False
+        self.content_parts: list[str] = []
+        self.tool_call_parts: dict[int, dict[str, Any]] = {}
+        self.announced: set[int] = set()
+        self.usage = None
+
+    def feed(self, chunk: Any) -> list[StreamEvent]:
+        """Consume one chunk and return the events it completes."""
+        events: list[StreamEvent] = []
+        if chunk.usage is not None:
+            self.usage = chunk.usage
+        if not chunk.choices:
+            return events
+        delta = chunk.choices[0].delta
+        # Reasoning models served through OpenAI-compatible endpoints
+        # stream their chain of thought in a separate field.
+        reasoning = getattr(delta, "reasoning_content", None)
+        if reasoning:
+            events.append(StreamEvent(type="thinking_delta", text=reasoning))
+        if delta.content:
+            self.content_parts.append(delta.content)
+            events.append(StreamEvent(type="text_delta", text=delta.content))
+        for tool_call_delta in delta.tool_calls or []:
+            # Tool calls stream one after another, so a new index means
+            # the arguments of every earlier call are complete.
+            events.extend(self._announce(before=tool_call_delta.index))
+            part = self.tool_call_parts.setdefault(
+                tool_call_delta.index, {"id": None, "name": "", "arguments": ""}
+            )
+            if tool_call_delta.id:
+                part["id"] = tool_call_delta.id
+            if tool_call_delta.function is not None:
+                part["name"] += tool_call_delta.function.name or ""
+                part["arguments"] += tool_call_delta.function.arguments or ""
+        self.emitted = self.emitted or bool(events)
+        return events
+
+    def finish(self) -> list[StreamEvent]:
+        """Announce the tool calls still open when the stream ends."""
+        return self._announce(before=None)
+
+    def message(self) -> StreamEvent:
+        """The final message event, parsed like a non-streamed response."""
+        tool_calls = [
+            _as_tool_call_data(part) for _, part in sorted(self.tool_call_parts.items())
+        ]
+        internal_messages = self.client._parse_response(
+            "".join(self.content_parts), tool_calls, self.tools
+        )
         message_metadata = {
-            "raw_response": response,
-            "input_tokens": response.usage.prompt_tokens,
-            "output_tokens": response.usage.completion_tokens,
+            "raw_response": None,
+            "input_tokens": self.usage.prompt_tokens if self.usage is not None else 0,
+            "output_tokens": self.usage.completion_tokens if self.usage is not None else 0,
         }
+        return StreamEvent(type="message", content=internal_messages, metadata=message_metadata)
 
-        return internal_messages, message_metadata
+    def _announce(self, before: int | None) -> list[StreamEvent]:
+        events = []
+        for index in sorted(self.tool_call_parts):
+            if index in self.announced or (before is not None and index >= before):
+                continue
+            self.announced.add(index)
+            for block in self.client._parse_response(
+                None, [_as_tool_call_data(self.tool_call_parts[index])], self.tools
+            ):
+                events.append(StreamEvent(type="tool_call", tool_call=cast(ToolCall, block)))
+        return events
+
+
+def _as_tool_call_data(part: dict[str, Any]) -> SimpleNamespace:
+    """Shape an accumulated streamed tool call like a non-streamed one."""
+    return SimpleNamespace(
+        id=part["id"],
+        function=SimpleNamespace(name=part["name"], arguments=part["arguments"]),
+    )
@@ -0,0 +1,330 @@
+"""Retry backoff and rate limits shared by all sessions' LLM clients.
+
+Every request first takes a slot from the ``RateLimiter`` of its provider and model:
+token buckets of requests per minute and tokens per minute, shared process-wide so
+that concurrent sessions together stay within the provider's limits. A request is
+charged its estimated input tokens up front and settled with the reported usage.
+
+A failed request is retried per the ``RetryPolicy``: exponential backoff with jitter,
+or the delay the provider asked for in a ``retry-after`` header. When the provider
+throttles (429, overloaded), the whole limiter is paused for that delay, so the other
+sessions back off too instead of piling more requests onto the throttled model.
+
+Limits are configured in the ``[rate_limits]`` section of config.ini, see
+``configure_from_config``.
+"""
+
+import asyncio
+import configparser
+import dataclasses
+import email.utils
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from boss_agent.core import cancellation
+from boss_agent.llm.base import (
+    AnthropicThinkingBlock,
+    ImageBlock,
+    LLMMessages,
+    SessionSummary,
+    TextPrompt,
+    TextResult,
+    ToolCall,
+    ToolFormattedResult,
+)
+from boss_agent.utils.constants import (
+    LLM_RETRY_BASE_DELAY_SECONDS,
+    LLM_RETRY_MAX_ATTEMPTS,
+    LLM_RETRY_MAX_DELAY_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: timeouts, conflicts, throttling and server errors.
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+# Statuses meaning the provider is throttling; they pause the shared limiter.
+THROTTLED_STATUS_CODES = frozenset({429, 529})
+
+# Rough characters per token, as in TokenCounter.
+_CHARS_PER_TOKEN = 3
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """The HTTP status of an SDK error, if it has one."""
+    for attribute in ("status_code", "code"):
+        code = getattr(error, attribute, None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """The delay the provider asked for in the error's ``retry-after`` headers, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms is not None:
+            return max(float(retry_after_ms) / 1000, 0.0)
+        retry_after = headers.get("retry-after")
+        if retry_after is None:
+            return None
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            # An HTTP date rather than a number of seconds.
+            return max(
+                email.utils.parsedate_to_datetime(retry_after).timestamp()
+                - time.time(),
+                0.0,
+            )
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often and after how long a failed request is retried.
+
+    ``max_attempts`` counts the first attempt. The n-th retry waits a random delay
+    between half and all of ``base_delay * 2**n``, capped at ``max_delay``, unless the
+    provider said how long to wait.
+    """
+
+    max_attempts: int = LLM_RETRY_MAX_ATTEMPTS
+    base_delay: float = LLM_RETRY_BASE_DELAY_SECONDS
+    max_delay: float = LLM_RETRY_MAX_DELAY_SECONDS
+
+    def delay(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """Seconds to wait before retrying after failed attempt ``attempt`` (0-based)."""
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        ceiling = min(self.max_delay, self.base_delay * 2**attempt)
+        # Never less than half the backoff, so throttled sessions do not return at once.
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+class TokenBucket:
+    """A bucket of ``per_minute`` units that refills continuously.
+
+    Reservations may overdraw it; the overdraft is the time the caller must wait, so
+    concurrent callers are served in the order they reserved.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take ``amount`` and return the seconds until it is actually available."""
+        self._refill(now)
+        # A request larger than the whole bucket waits for a full bucket, not forever.
+        self._level -= min(amount, self.capacity)
+        return max(-self._level / self.rate, 0.0)
+
+    def refund(self, amount: float, now: float):
+        """Give back ``amount`` (or charge more, if negative) after the fact."""
+        self._refill(now)
+        self._level = min(self._level + amount, self.capacity)
+
+    def _refill(self, now: float):
+        self._level = min(
+            self.capacity, self._level + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits of one provider and model.
+
+    A limit of 0 (or None) is unlimited; the limiter still pauses on throttling.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ):
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        """Reserve a request of ``tokens`` and return the seconds to wait before sending it."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self._paused_until - now, 0.0)
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1, now))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.reserve(tokens, now))
+            return wait
+
+    def acquire(self, tokens: int):
+        """Wait (cancellably) until a request of ``tokens`` may be sent."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.info(f"Rate limit reached; waiting {wait:.1f}s")
+            cancellation.sleep(wait)
+
+    async def aacquire(self, tokens: int):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.info(f"Rate limit reached; waiting {wait:.1f}s")
+            await asyncio.sleep(wait)
+
+    def settle(self, reserved_tokens: int, metadata: dict[str, Any]):
+        """Correct a reservation with the usage the provider reported."""
+        if self.tokens is None:
+            return
+        used = sum(
+            max(metadata.get(key) or 0, 0) for key in ("input_tokens", "output_tokens")
+        )
+        if used <= 0:
+            return
+        with self._lock:
+            self.tokens.refund(reserved_tokens - used, time.monotonic())
+
+    def pause(self, seconds: float):
+        """Hold back every request through this limiter for ``seconds``."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class RequestThrottle:
+    """The retry policy and shared limiter of one client, as used by its retry loops."""
+
+    def __init__(
+        self, provider: str, model: str, retry_policy: Optional[RetryPolicy] = None
+    ):
+        self.provider = provider
+        self.retry_policy = retry_policy or get_retry_policy()
+        self.limiter = get_limiter(provider, model)
+
+    @property
+    def max_attempts(self) -> int:
+        return self.retry_policy.max_attempts
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """Seconds to wait before retrying after ``error``.
+
+        Throttling pauses the whole limiter instead, and the retry waits that out when
+        it acquires its slot, along with every other session's requests.
+        """
+        delay = self.retry_policy.delay(attempt, error)
+        print(
+            f"Retrying {self.provider} request in {delay:.1f}s: {attempt + 1}/{self.max_attempts} ({error})"
+        )
+        if status_code(error) in THROTTLED_STATUS_CODES:
+            self.limiter.pause(delay)
+            return 0.0
+        return delay
+
+
+def estimate_tokens(messages: LLMMessages, system_prompt: Optional[str] = None) -> int:
+    """A rough count of a request's input tokens, to reserve before sending it."""
+    chars = len(system_prompt or "")
+    image_tokens = 0
+    for message_list in messages:
+        for block in message_list:
+            if isinstance(block, (TextPrompt, TextResult, SessionSummary)):
+                chars += len(block.text)
+            elif isinstance(block, ToolCall):
+                chars += len(str(block.tool_input))
+            elif isinstance(block, ToolFormattedResult):
+                if isinstance(block.tool_output, str):
+                    chars += len(block.tool_output)
+                else:
+                    chars += sum(
+                        len(str(item.get("text", ""))) for item in block.tool_output
+                    )
+                image_tokens += sum(
+                    metadata.tokens for metadata in block.image_metadata
+                )
+            elif isinstance(block, ImageBlock):
+                image_tokens += block.metadata.tokens
+            elif isinstance(block, AnthropicThinkingBlock):
+                chars += len(block.thinking)
+    return chars // _CHARS_PER_TOKEN + image_tokens
+
+
+_retry_policy = RetryPolicy()
+# Limits by "provider" or "provider/model", and the limiters made from them.
+_limits: dict[str, tuple[float, float]] = {}
+_limiters: dict[tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_retry_policy() -> RetryPolicy:
+    return _retry_policy
+
+
+def get_limiter(provider: str, model: str) -> RateLimiter:
+    """The process-wide limiter of ``provider`` and ``model``."""
+    with _limiters_lock:
+        limiter = _limiters.get((provider, model))
+        if limiter is None:
+            limits = (
+                _limits.get(f"{provider}/{model}".lower())
+                or _limits.get(provider.lower())
+                or (0, 0)
+            )
+            limiter = RateLimiter(*limits)
+            _limiters[(provider, model)] = limiter
+        return limiter
+
+
+def configure(retry_policy: RetryPolicy, limits: dict[str, tuple[float, float]]):
+    """Set the retry policy and the limits; limiters already handed out are replaced."""
+    global _retry_policy
+    with _limiters_lock:
+        _retry_policy = retry_policy
+        _limits.clear()
+        _limits.update({key.lower(): value for key, value in limits.items()})
+        _limiters.clear()
+
+
+def configure_from_config(config: configparser.ConfigParser):
+    """Configure from the ``[llm]`` retry options and the ``[rate_limits]`` section.
+
+    Each ``[rate_limits]`` entry is ``<provider> = <requests/min>, <tokens/min>`` or,
+    for one model, ``<provider>/<model> = ...``; 0 means unlimited.
+    """
+    defaults = RetryPolicy()
+    retry_policy = dataclasses.replace(
+        defaults,
+        max_attempts=config.getint(
+            "llm", "retry_max_attempts", fallback=defaults.max_attempts
+        ),
+        base_delay=config.getfloat(
+            "llm", "retry_base_delay", fallback=defaults.base_delay
+        ),
+        max_delay=config.getfloat(
+            "llm", "retry_max_delay", fallback=defaults.max_delay
+        ),
+    )
+    limits = {}
+    if config.has_section("rate_limits"):
+        for key, value in config.items("rate_limits"):
+            try:
+                requests_per_minute, tokens_per_minute = (
+                    float(part) for part in value.split(",")
+                )
+            except ValueError:
+                logger.warning(
+                    f"Ignoring rate limit {key} = {value!r}; expected '<requests/min>, <tokens/min>'"
+                )
+                continue
+            limits[key] = (requests_per_minute, tokens_per_minute)
+    configure(retry_policy, limits)
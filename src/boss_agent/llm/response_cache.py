@@ -0,0 +1,373 @@
+"""On-disk cache of LLM responses for deterministic auxiliary calls.
+
+Auxiliary calls (information extraction, history summaries, per-turn session
+summaries) often send exactly the same prompt again, e.g. the same extraction from a
+file of a knowledge base shared by several users. ``CachingLLMClient`` wraps any
+``LLMClient`` and answers such repeats from a SQLite file instead of the model.
+
+Entries are keyed by a hash of the model, messages, system prompt, tools, tool
+choice, temperature and token limits. Only temperature-0 calls are cached, as only
+those are meant to be reproducible; other calls go straight to the wrapped client.
+Entries expire after a TTL, and the least recently used ones are evicted once the
+cache outgrows its size limit.
+
+In replay mode the wrapped client is never called: a call that is not in the cache
+raises ``ResponseCacheMiss``, so tests can run fully offline against recorded
+responses.
+"""
+
+import configparser
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator, Optional, Tuple
+
+from boss_agent.llm.base import (
+    AssistantContentBlock,
+    LLMClient,
+    LLMMessages,
+    StreamEvent,
+    ToolParam,
+)
+from boss_agent.llm.history_snapshot import block_from_dict, block_to_dict
+from boss_agent.utils.constants import (
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCacheMiss(LookupError):
+    """A call in replay mode had no cached response."""
+
+
+class ResponseCache:
+    """LLM responses in a SQLite file, with a TTL and a total size bound (LRU)."""
+
+    def __init__(
+        self,
+        path: Path | str,
+        ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        # Several server processes may share one cache file.
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+        return json.loads(row[0])
+
+    def put(self, key: str, response: dict[str, Any]):
+        serialized = json.dumps(response)
+        size = len(serialized.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, serialized, size, now, now),
+            )
+            self._connection.execute(
+                "DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,)
+            )
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()[0]
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _evict(self):
+        """Drop the least recently used entries until the cache fits ``max_bytes``."""
+        total = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed"
+        ).fetchall():
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                return
+
+
+def request_key(
+    model: str,
+    messages: LLMMessages,
+    max_tokens: int,
+    system_prompt: str | None,
+    temperature: float,
+    tools: list[ToolParam],
+    tool_choice: dict[str, str] | None,
+    thinking_tokens: int | None,
+) -> str:
+    """A hash of everything that determines a response."""
+    request = {
+        "model": model,
+        "messages": [
+            [block_to_dict(block) for block in message_list]
+            for message_list in messages
+        ],
+        "max_tokens": max_tokens,
+        "system_prompt": system_prompt,
+        "temperature": temperature,
+        "tools": [tool.to_dict() for tool in tools],
+        "tool_choice": tool_choice,
+        "thinking_tokens": thinking_tokens,
+    }
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CachingLLMClient(LLMClient):
+    """An ``LLMClient`` answering temperature-0 calls from a ``ResponseCache`` when it can.
+
+    Responses come back with ``metadata["cached"]`` set; the provider's raw response
+    is not kept. With ``replay``, the wrapped client is never called.
+    """
+
+    def __init__(self, client: LLMClient, cache: ResponseCache, replay: bool = False):
+        self.client = client
+        self.cache = cache
+        self.replay = replay
+        self.model_name = getattr(client, "model_name", type(client).__name__)
+
+    def generate(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> Tuple[list[AssistantContentBlock], dict[str, Any]]:
+        arguments = dict(
+            messages=messages,
+            max_tokens=max_tokens,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            tools=tools,
+            tool_choice=tool_choice,
+            thinking_tokens=thinking_tokens,
+        )
+        key = self._key(arguments)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        content, metadata = self.client.generate(**arguments)
+        self._store(key, content, metadata)
+        return content, metadata
+
+    async def agenerate(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> Tuple[list[AssistantContentBlock], dict[str, Any]]:
+        arguments = dict(
+            messages=messages,
+            max_tokens=max_tokens,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            tools=tools,
+            tool_choice=tool_choice,
+            thinking_tokens=thinking_tokens,
+        )
+        key = self._key(arguments)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        content, metadata = await self.client.agenerate(**arguments)
+        self._store(key, content, metadata)
+        return content, metadata
+
+    def generate_stream(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> Iterator[StreamEvent]:
+        """Cacheable calls are replayed from ``generate``; others stream from the wrapped client."""
+        arguments = dict(
+            messages=messages,
+            max_tokens=max_tokens,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            tools=tools,
+            tool_choice=tool_choice,
+            thinking_tokens=thinking_tokens,
+        )
+        if self._cacheable(temperature):
+            yield from super().generate_stream(**arguments)
+        else:
+            yield from self.client.generate_stream(**arguments)
+
+    async def agenerate_stream(
+        self,
+        messages: LLMMessages,
+        max_tokens: int,
+        system_prompt: str | None = None,
+        temperature: float = 0.0,
+        tools: list[ToolParam] = [],
+        tool_choice: dict[str, str] | None = None,
+        thinking_tokens: int | None = None,
+    ) -> AsyncIterator[StreamEvent]:
+        arguments = dict(
+            messages=messages,
+            max_tokens=max_tokens,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            tools=tools,
+            tool_choice=tool_choice,
+            thinking_tokens=thinking_tokens,
+        )
+        events = (
+            super().agenerate_stream(**arguments)
+            if self._cacheable(temperature)
+            else self.client.agenerate_stream(**arguments)
+        )
+        async for event in events:
+            yield event
+
+    def _cacheable(self, temperature: float) -> bool:
+        return temperature == 0 or self.replay
+
+    def _key(self, arguments: dict[str, Any]) -> Optional[str]:
+        """The cache key of a call, or None if the call is not cached."""
+        if not self._cacheable(arguments["temperature"]):
+            return None
+        return request_key(self.model_name, **arguments)
+
+    def _lookup(
+        self, key: Optional[str]
+    ) -> Optional[Tuple[list[AssistantContentBlock], dict[str, Any]]]:
+        cached = self.cache.get(key) if key is not None else None
+        if cached is None:
+            if self.replay:
+                raise ResponseCacheMiss(
+                    f"No cached response for {self.model_name} request {key}"
+                )
+            return None
+        content = [block_from_dict(block) for block in cached["content"]]
+        return content, {**cached["metadata"], "cached": True}
+
+    def _store(
+        self,
+        key: Optional[str],
+        content: list[AssistantContentBlock],
+        metadata: dict[str, Any],
+    ):
+        if key is None:
+            return
+        try:
+            serialized_content = [block_to_dict(block) for block in content]
+        except ValueError as e:
+            logger.warning(f"Not caching a response with an unsupported block: {e}")
+            return
+        # Keep the usage counts and similar plain values, not the provider's raw response.
+        plain_metadata = {
+            name: value
+            for name, value in metadata.items()
+            if isinstance(value, (str, int, float, bool)) or value is None
+        }
+        self.cache.put(key, {"content": serialized_content, "metadata": plain_metadata})
+
+
+_cache: Optional[ResponseCache] = None
+_replay = False
+
+
+def configure(cache: Optional[ResponseCache], replay: bool = False):
+    """Use ``cache`` for the clients ``wrap`` returns from now on; None disables caching."""
+    global _cache, _replay
+    _cache = cache
+    _replay = replay
+
+
+def configure_from_config(config: configparser.ConfigParser) -> bool:
+    """Configure from the ``[llm_cache]`` section; returns whether caching is enabled."""
+    if not config.getboolean("llm_cache", "enabled", fallback=False):
+        configure(None)
+        return False
+    cache = ResponseCache(
+        config.get("llm_cache", "path", fallback=LLM_CACHE_PATH),
+        ttl_seconds=config.getfloat(
+            "llm_cache", "ttl_hours", fallback=LLM_CACHE_TTL_SECONDS / 3600
+        )
+        * 3600,
+        max_bytes=int(
+            config.getfloat("llm_cache", "max_mb", fallback=LLM_CACHE_MAX_BYTES / 2**20)
+            * 2**20
+        ),
+    )
+    configure(cache, replay=config.getboolean("llm_cache", "replay", fallback=False))
+    return True
+
+
+def wrap(client: LLMClient) -> LLMClient:
+    """``client`` behind the configured cache, or ``client`` itself if caching is off.
+
+    Use it for auxiliary calls made at temperature 0, not for the agent's own turns.
+    """
+    if _cache is None or isinstance(client, CachingLLMClient):
+        return client
+    return CachingLLMClient(client, _cache, replay=_replay)
@@ -0,0 +1,105 @@
+"""Background generation of the per-turn "Summary of last action" notes."""
+
+import logging
+import threading
+from typing import Any, Optional
+
+from boss_agent.llm.base import LLMClient, TextPrompt, TextResult
+from boss_agent.utils.constants import SESSION_SUMMARY_MAX_TOKENS
+
+
+class SessionSummarizer:
+    """Summarizes tool results on a background worker thread.
+
+    The agent submits the tool results of every turn and collects finished summaries
+    at the next turn boundary, so the summary call never sits between two main-model
+    calls. Results submitted while the worker is still busy are coalesced into a
+    single summary request.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        logger: logging.Logger,
+        max_tokens: int = SESSION_SUMMARY_MAX_TOKENS,
+    ):
+        self.client = client
+        self.logger = logger
+        self.max_tokens = max_tokens
+
+        self._condition = threading.Condition()
+        self._pending: list[tuple[str, str]] = []
+        self._finished: list[str] = []
+        # Bumped by reset() so that a summary in flight for a previous run is dropped.
+        self._generation = 0
+        self._closed = False
+        self._worker: Optional[threading.Thread] = None
+
+    def submit(self, tool_name: str, tool_result: Any) -> None:
+        """Queue a tool result for summarization without blocking."""
+        with self._condition:
+            if self._closed:
+                return
+            self._pending.append((tool_name, str(tool_result)[:200]))
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="session-summarizer", daemon=True
+                )
+                self._worker.start()
+            self._condition.notify()
+
+    def drain(self) -> list[str]:
+        """Return the summaries finished since the last call."""
+        with self._condition:
+            finished, self._finished = self._finished, []
+        return finished
+
+    def reset(self) -> None:
+        """Drop pending and finished summaries, e.g. when the history is cleared."""
+        with self._condition:
+            self._pending.clear()
+            self._finished.clear()
+            self._generation += 1
+
+    def close(self) -> None:
+        """Stop the worker thread once its current request (if any) returns."""
+        with self._condition:
+            self._closed = True
+            self._pending.clear()
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                actions, self._pending = self._pending, []
+                generation = self._generation
+
+            summary_text = self._summarize(actions)
+
+            with self._condition:
+                if summary_text and generation == self._generation:
+                    self._finished.append(f"Summary of last action: {summary_text}")
+
+    def _summarize(self, actions: list[tuple[str, str]]) -> Optional[str]:
+        described = "; ".join(
+            f"'{tool_name}' which returned '{tool_result}...'"
+            for tool_name, tool_result in actions
+        )
+        summary_prompt = f"Based on the result of the tool call {described}, what is the single most important new piece of information or confirmation you have learned? State it as a brief, factual summary."
+        try:
+            model_response, _ = self.client.generate(
+                messages=[[TextPrompt(text=summary_prompt)]],
+                max_tokens=self.max_tokens,
+            )
+        except Exception as e:
+            self.logger.warning(f"Failed to generate session summary: {e}")
+            return None
+
+        texts = [
+            block.text for block in model_response if isinstance(block, TextResult)
+        ]
+        return " ".join(texts) if texts else None
@@ -1,36 +1,132 @@
 import json
 import base64
-from typing import Any, Union
+import logging
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence, Union
 from PIL import Image
 import io
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Charged for an image whose dimensions cannot be read.
+UNKNOWN_IMAGE_TOKENS = 1500
+
+
+@dataclass(frozen=True)
+class ImageMetadata:
+    """Size and token cost of an image, measured once when it enters the history."""
+
+    width: int
+    height: int
+    byte_size: int
+    tokens: int
+
+    @classmethod
+    def from_source(cls, source: dict[str, Any]) -> "ImageMetadata":
+        """Measure an image from its ``source`` dict (base64 ``data`` and media type)."""
+        data = source.get("data") if source.get("type", "base64") == "base64" else None
+        if not isinstance(data, str):
+            return cls.unknown()
+        try:
+            image_data = base64.b64decode(data)
+        except Exception as e:
+            logger.warning(f"Could not decode image for token counting: {e}")
+            return cls.unknown(byte_size=len(data) * 3 // 4)
+        return cls.from_bytes(image_data)
+
+    @classmethod
+    def from_bytes(cls, image_data: bytes) -> "ImageMetadata":
+        """Measure an image from its raw bytes."""
+        try:
+            # Image.open only parses the header; the pixels are never decoded.
+            with Image.open(io.BytesIO(image_data)) as img:
+                width, height = img.size
+        except Exception as e:
+            logger.warning(f"Could not decode image for token counting: {e}")
+            return cls.unknown(byte_size=len(image_data))
+        # Official formula: (width * height) / 750
+        return cls(width=width, height=height, byte_size=len(image_data), tokens=int((width * height) / 750))
+
+    @classmethod
+    def unknown(cls, byte_size: int = 0) -> "ImageMetadata":
+        return cls(width=0, height=0, byte_size=byte_size, tokens=UNKNOWN_IMAGE_TOKENS)
 
 
 class TokenCounter:
-    def count_tokens(self, prompt_chars: Union[str, list[dict[str, Any]]]) -> int:
+    """Estimates token counts from text length.
+
+    The raw estimate (about 3 characters per token) is corrected per model with the
+    ratio of the input token counts that providers report to what was estimated for
+    the same requests; see ``record_usage``.
+    """
+
+    def __init__(self, smoothing: float = 0.3):
+        # Weight of the newest observation in the moving averages.
+        self.smoothing = smoothing
+        self._correction_factors: dict[str, float] = {}
+        self._mean_abs_errors: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def correction_factor(self, model: str | None) -> float:
+        """Multiplier turning a raw estimate into the model's actual token count."""
+        if model is None:
+            return 1.0
+        return self._correction_factors.get(model, 1.0)
+
+    def calibrate(self, estimated_tokens: int, model: str | None) -> int:
+        return int(estimated_tokens * self.correction_factor(model))
+
+    def record_usage(self, model: str, estimated_tokens: int, actual_tokens: int) -> float | None:
+        """Learn from a request whose raw estimate and actual input token count are known.
+
+        Returns the relative error the calibrated estimate had for this request
+        (positive when it overestimated), or None if the counts are unusable.
+        """
+        if estimated_tokens <= 0 or actual_tokens <= 0:
+            return None
+        with self._lock:
+            factor = self._correction_factors.get(model)
+            calibrated = estimated_tokens * (factor or 1.0)
+            error = (calibrated - actual_tokens) / actual_tokens
+            ratio = actual_tokens / estimated_tokens
+            if factor is None:
+                self._correction_factors[model] = ratio
+                self._mean_abs_errors[model] = abs(error)
+            else:
+                self._correction_factors[model] = factor + self.smoothing * (ratio - factor)
+                mean_abs_error = self._mean_abs_errors[model]
+                self._mean_abs_errors[model] = mean_abs_error + self.smoothing * (abs(error) - mean_abs_error)
+        return error
+
+    def estimate_error(self, model: str | None) -> float | None:
+        """Moving average of the absolute relative error of calibrated estimates."""
+        if model is None:
+            return None
+        return self._mean_abs_errors.get(model)
+
+    def count_tokens(
+        self,
+        prompt_chars: Union[str, list[dict[str, Any]]],
+        image_metadata: Optional[Sequence[ImageMetadata]] = None,
+    ) -> int:
+        """Estimate the tokens of a string or a list of content items.
+
+        ``image_metadata`` holds the already measured images of the list, in order;
+        images without it are decoded to measure them.
+        """
         if isinstance(prompt_chars, str):
             return len(prompt_chars) // 3
         elif isinstance(prompt_chars, list):
             total_tokens = 0
+            image_index = 0
             for item in prompt_chars:
                 if item.get("type") == "image" and "source" in item:
-                    # For images, calculate tokens based on image dimensions
-                    try:
-                        # Decode base64 image data
-                        image_data = base64.b64decode(item["source"]["data"])
-                        # Open image to get dimensions
-                        with Image.open(io.BytesIO(image_data)) as img:
-                            width, height = img.size
-                            # Calculate tokens using official formula: (width * height)/750
-                            image_tokens = int((width * height) / 750)
-                            total_tokens += image_tokens
-                    except Exception as e:
-                        # If we can't decode the image, use a conservative estimate
-                        print(
-                            f"Warning: Could not decode image for token counting: {e}"
-                        )
-                        total_tokens += (
-                            1500  # Conservative estimate for unknown image size
-                        )
+                    if image_metadata is not None and image_index < len(image_metadata):
+                        total_tokens += image_metadata[image_index].tokens
+                    else:
+                        total_tokens += ImageMetadata.from_source(item["source"]).tokens
+                    image_index += 1
                 elif item.get("type") == "text":
                     total_tokens += len(item["text"]) // 3
                 else:
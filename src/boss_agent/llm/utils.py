@@ -77,7 +77,7 @@ def convert_message_to_json(
             message_json["tool_output"] = (
                 _hide_base64_image_from_tool_output(message.tool_output)
                 if hide_base64_image
-                else message.tool_output
+                else message.plain_tool_output()
             )
         else:
             message_json["tool_output"] = message.tool_output
@@ -95,7 +95,7 @@ def convert_message_to_json(
     elif str(type(message)) == str(ImageBlock):
         message_json = {
             "type": "image",
-            "source": message.source,
+            "source": message.source.to_dict(),
         }
         if hide_base64_image:
             message_json["source"]["data"] = "[base64-image-data]"
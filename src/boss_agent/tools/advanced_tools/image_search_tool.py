@@ -17,6 +17,7 @@ class ImageSearchTool(LLMTool):
         },
         "required": ["query"],
     }
+    parallel_safe = True
     output_type = "array"
 
     def __init__(self, max_results=5, **kwargs):
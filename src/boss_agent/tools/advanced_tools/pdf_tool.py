@@ -2,6 +2,7 @@ from pathlib import Path
 from typing import Any, Optional
 import pymupdf
 
+from boss_agent.core import cancellation
 from boss_agent.llm.message_history import MessageHistory
 from boss_agent.tools.base import (
     LLMTool,
@@ -23,6 +24,8 @@ class PdfTextExtractTool(LLMTool):
         },
         "required": ["file_path"],
     }
+    parallel_safe = True
+    idempotent = True
 
     def __init__(
         self, workspace_manager: WorkspaceManager, max_output_length: int = 15000
@@ -62,10 +65,13 @@ class PdfTextExtractTool(LLMTool):
         try:
             doc = pymupdf.open(full_file_path)
             text = ""
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text("text")
-            doc.close()
+            try:
+                for page_num in range(len(doc)):
+                    cancellation.raise_if_cancelled()
+                    page = doc.load_page(page_num)
+                    text += page.get_text("text")
+            finally:
+                doc.close()
 
             if len(text) > self.max_output_length:
                 text = (
@@ -84,3 +90,6 @@ class PdfTextExtractTool(LLMTool):
                 f"Failed to extract text from {relative_file_path}",
                 {"success": False, "error": str(e)},
             )
+
+    def cache_dependencies(self, tool_input: dict[str, Any]) -> list[str]:
+        return [str(self.workspace_manager.workspace_path(Path(tool_input["file_path"])))]
@@ -1,6 +1,5 @@
 # src/boss_agent/tools/video_generate_from_text_tool.py
 import os
-import time
 import uuid
 import shutil
 import subprocess
@@ -13,6 +12,7 @@ from google.genai import types
 from google.cloud import storage
 from google.auth.exceptions import DefaultCredentialsError
 
+from boss_agent.core import cancellation
 from boss_agent.tools.base import (
     MessageHistory,
     LLMTool,
@@ -216,7 +216,7 @@ The generated video will be saved to the specified local path in the workspace."
                         "Video generation timed out.",
                         {"success": False, "error": "Timeout"},
                     )
-                time.sleep(polling_interval_seconds)
+                cancellation.sleep(polling_interval_seconds)
                 elapsed_time += polling_interval_seconds
                 operation = self.client.operations.get(
                     operation
@@ -413,7 +413,7 @@ The generated video will be saved to the specified local path in the workspace."
                     raise TimeoutError(
                         f"Video generation timed out after {max_wait_time_seconds} seconds."
                     )
-                time.sleep(polling_interval_seconds)
+                cancellation.sleep(polling_interval_seconds)
                 elapsed_time += polling_interval_seconds
                 operation = self.genai_client.operations.get(
                     operation
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from typing import Any, Optional
@@ -6,6 +7,7 @@ import jsonschema
 from anthropic import BadRequestError
 from typing_extensions import final
 
+from boss_agent.core import cancellation
 from boss_agent.llm.base import (
     ToolParam,
 )
@@ -40,6 +42,16 @@ class LLMTool(ABC):
     description: str
     input_schema: ToolInputSchema
 
+    # Whether several calls to this tool may run concurrently with each other and
+    # with other parallel-safe tools. Only tools that do not mutate shared state
+    # (files, browser, dataframes, completion flags) should opt in.
+    parallel_safe: bool = False
+
+    # Whether calling this tool twice with the same input returns the same output as
+    # long as the files named by cache_dependencies() are unchanged. Results of such
+    # tools are memoized by the tool manager.
+    idempotent: bool = False
+
     @property
     def should_stop(self) -> bool:
         """Whether the tool wants to stop the current agentic run."""
@@ -64,6 +76,8 @@ class LLMTool(ABC):
                 pending tool calls. They should end where it's the user's turn.
         """
         try:
+            # A tool queued behind others should not start once the run is cancelled.
+            cancellation.raise_if_cancelled()
             self._validate_tool_input(tool_input)
             result = self.run_impl(tool_input, message_history)
             tool_output = result.tool_output
@@ -74,6 +88,28 @@ class LLMTool(ABC):
 
         return tool_output
 
+    @final
+    async def arun(
+        self,
+        tool_input: dict[str, Any],
+        message_history: Optional[MessageHistory] = None,
+    ) -> str | list[dict[str, Any]]:
+        """Async variant of run(), for agents driven by an event loop.
+
+        Args are the same as for run(). Subclasses should override arun_impl().
+        """
+        try:
+            cancellation.raise_if_cancelled()
+            self._validate_tool_input(tool_input)
+            result = await self.arun_impl(tool_input, message_history)
+            tool_output = result.tool_output
+        except jsonschema.ValidationError as exc:
+            tool_output = "Invalid tool input: " + exc.message
+        except BadRequestError as exc:
+            raise RuntimeError("Bad request: " + exc.message)
+
+        return tool_output
+
     def get_tool_start_message(self, tool_input: ToolInputSchema) -> str:
         """Return a user-friendly message to be shown to the model when the tool is called."""
         return f"Calling tool '{self.name}'"
@@ -91,6 +127,37 @@ class LLMTool(ABC):
         """
         raise NotImplementedError()
 
+    async def arun_impl(
+        self,
+        tool_input: dict[str, Any],
+        message_history: Optional[MessageHistory] = None,
+    ) -> ToolImplOutput:
+        """Async counterpart of run_impl().
+
+        Tools whose work is natively async override this. By default run_impl() runs
+        in a worker thread so that blocking tools do not stall the event loop.
+        """
+        return await asyncio.to_thread(self.run_impl, tool_input, message_history)
+
+    def cache_dependencies(self, tool_input: dict[str, Any]) -> list[str]:
+        """Return the files and directories the output of an idempotent call depends on.
+
+        Directories are fingerprinted recursively. Only consulted when ``idempotent``
+        is set.
+        """
+        return []
+
+    def get_session_state(self) -> Optional[dict[str, Any]]:
+        """JSON-serializable state to keep in the session snapshot, or None if stateless.
+
+        Tools holding state that later calls refer to (such as dataframe IDs) override
+        this and ``restore_session_state`` so that a resumed session can use it.
+        """
+        return None
+
+    def restore_session_state(self, state: dict[str, Any]) -> None:
+        """Restore what ``get_session_state`` returned, when a session is resumed."""
+
     def get_tool_param(self) -> ToolParam:
         return ToolParam(
             name=self.name,
@@ -98,10 +165,33 @@ class LLMTool(ABC):
             input_schema=self.input_schema,
         )
 
+    def get_validator(self) -> jsonschema.protocols.Validator:
+        """Returns a validator for input_schema, compiled once and cached.
+
+        The cache is keyed by the identity of the schema object, so assigning a new
+        input_schema recompiles it.
+
+        Raises:
+            jsonschema.SchemaError: If input_schema itself is invalid.
+        """
+        schema = self.input_schema
+        validator = self.__dict__.get("_validator")
+        if validator is None or validator.schema is not schema:
+            validator_cls = jsonschema.validators.validator_for(schema)
+            validator_cls.check_schema(schema)
+            validator = validator_cls(schema)
+            self._validator = validator
+        return validator
+
     def _validate_tool_input(self, tool_input: dict[str, Any]):
         """Validates the tool input.
 
         Raises:
             jsonschema.ValidationError: If the tool input is invalid.
         """
-        jsonschema.validate(instance=tool_input, schema=self.input_schema)
+        # Same error selection as jsonschema.validate, without recompiling the schema.
+        error = jsonschema.exceptions.best_match(
+            self.get_validator().iter_errors(tool_input)
+        )
+        if error is not None:
+            raise error
@@ -2,7 +2,9 @@
 
 import os
 from typing import Any, Optional, Dict
+from boss_agent.core import cancellation
 from boss_agent.tools.base import LLMTool, ToolImplOutput
+from boss_agent.tools.output_store import TOOL_OUTPUT_DIR
 from boss_agent.llm.message_history import MessageHistory
 from boss_agent.utils import WorkspaceManager
 from boss_agent.utils.file_reader import read_file_content
@@ -31,6 +33,8 @@ class ContentSearchTool(LLMTool):
         },
         "required": ["query"],
     }
+    parallel_safe = True
+    idempotent = True
 
     def __init__(self, workspace_manager: WorkspaceManager):
         super().__init__()
@@ -47,14 +51,10 @@ class ContentSearchTool(LLMTool):
         if not query:
             return ToolImplOutput("", "Error: 'query' parameter is required for content search.")
 
-        # --- Path Sanitization ---
-        safe_path_filter = os.path.normpath(os.path.join('/', path_filter)).lstrip('/\\')
-        if ".." in safe_path_filter.split(os.sep):
+        search_paths = self._search_paths(path_filter)
+        if search_paths is None:
             return ToolImplOutput("", "Error: Directory traversal is not allowed.")
-
-        # --- Define Search Paths ---
-        kb_path = os.path.join(self.workspace_manager.root, safe_path_filter)
-        session_path = os.path.join(self.workspace_manager.session_workspace, safe_path_filter)
+        kb_path, session_path = search_paths
 
         # --- Validate Path Existence ---
         if not os.path.isdir(kb_path) and not os.path.isdir(session_path):
@@ -68,7 +68,10 @@ class ContentSearchTool(LLMTool):
             if not os.path.isdir(base_path):
                 continue
 
-            for root, _, files in os.walk(base_path):
+            for root, dirs, files in os.walk(base_path):
+                cancellation.raise_if_cancelled()
+                if TOOL_OUTPUT_DIR in dirs:
+                    dirs.remove(TOOL_OUTPUT_DIR)
                 for file in files:
                     if file_type_filter and not any(file.endswith(f".{ext}") for ext in file_type_filter):
                         continue
@@ -86,3 +89,20 @@ class ContentSearchTool(LLMTool):
 
         results = "\n".join(sorted(found_files.keys()))
         return ToolImplOutput(f"Found results for '{query}' in the following files:\n{results}", "Search completed.")
+
+    def cache_dependencies(self, tool_input: dict[str, Any]) -> list[str]:
+        path_filter = tool_input.get("path_filter", ".")
+        return list(self._search_paths(path_filter) or [])
+
+    def _search_paths(self, path_filter: str) -> Optional[tuple[str, str]]:
+        """The knowledge base and session directories to search, or None on traversal."""
+        # --- Path Sanitization ---
+        safe_path_filter = os.path.normpath(os.path.join('/', path_filter)).lstrip('/\\')
+        if ".." in safe_path_filter.split(os.sep):
+            return None
+
+        # --- Define Search Paths ---
+        return (
+            os.path.join(self.workspace_manager.root, safe_path_filter),
+            os.path.join(self.workspace_manager.session_workspace, safe_path_filter),
+        )
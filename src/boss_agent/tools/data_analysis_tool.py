@@ -1,11 +1,53 @@
 """Core tool for data analysis using pandas."""
 
 import os
+from collections.abc import MutableMapping
 import pandas as pd
-from typing import Any, Optional, List, Dict
+from typing import Any, Callable, Iterator, Optional, List, Dict
 from boss_agent.tools.base import LLMTool, ToolImplOutput
 from boss_agent.utils import WorkspaceManager
 
+
+class LoadedDataFrames(MutableMapping):
+    """Dataframes by ID, some of which may only be known by how they were made.
+
+    IDs restored from a session snapshot are listed without their dataframe, which
+    ``load`` rebuilds on first use; resuming a session thus does not read every file
+    it ever loaded. A dataframe that cannot be rebuilt (say, its file was deleted)
+    reads as missing.
+    """
+
+    def __init__(self, load: Callable[[str], pd.DataFrame]):
+        self._load = load
+        self._dataframes: Dict[str, Optional[pd.DataFrame]] = {}
+
+    def restore(self, df_ids: List[str]):
+        for df_id in df_ids:
+            self._dataframes.setdefault(df_id, None)
+
+    def __getitem__(self, df_id: str) -> pd.DataFrame:
+        df = self._dataframes[df_id]
+        if df is None:
+            try:
+                df = self._load(df_id)
+            except Exception as e:
+                raise KeyError(df_id) from e
+            self._dataframes[df_id] = df
+        return df
+
+    def __setitem__(self, df_id: str, df: pd.DataFrame):
+        self._dataframes[df_id] = df
+
+    def __delitem__(self, df_id: str):
+        del self._dataframes[df_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._dataframes)
+
+    def __len__(self) -> int:
+        return len(self._dataframes)
+
+
 class DataAnalysisTool(LLMTool):
     name = "data_analysis"
     description = "A tool for performing data analysis on structured files (CSV, Excel). It can load data, describe its structure, and perform calculations."
@@ -49,7 +91,9 @@ class DataAnalysisTool(LLMTool):
     def __init__(self, workspace_manager: WorkspaceManager):
         super().__init__()
         self.workspace_manager = workspace_manager
-        self.loaded_dataframes: Dict[str, pd.DataFrame] = {}
+        self.loaded_dataframes = LoadedDataFrames(self._rebuild_dataframe)
+        # How each dataframe was made, kept in the session snapshot.
+        self.dataframe_sources: Dict[str, Dict[str, Any]] = {}
 
     def _get_full_path(self, file_path: str) -> Optional[str]:
         """Get the full, safe path to a file, prioritizing the session workspace."""
@@ -67,6 +111,34 @@ class DataAnalysisTool(LLMTool):
             
         return None
 
+    def _read_file(self, full_path: str) -> Optional[pd.DataFrame]:
+        if full_path.endswith(".csv"):
+            return pd.read_csv(full_path)
+        elif full_path.endswith(".xlsx"):
+            return pd.read_excel(full_path)
+        elif full_path.endswith(".json"):
+            return pd.read_json(full_path)
+        return None
+
+    def _rebuild_dataframe(self, df_id: str) -> pd.DataFrame:
+        """Make a restored dataframe again from its source."""
+        source = self.dataframe_sources[df_id]
+        if "merge" in source:
+            left_df_id, right_df_id = source["merge"]
+            return pd.merge(self.loaded_dataframes[left_df_id], self.loaded_dataframes[right_df_id], on=source["on_key"])
+        full_path = self._get_full_path(source["file_path"])
+        df = self._read_file(full_path) if full_path else None
+        if df is None:
+            raise FileNotFoundError(source["file_path"])
+        return df
+
+    def get_session_state(self) -> Optional[dict[str, Any]]:
+        return {"dataframe_sources": dict(self.dataframe_sources)}
+
+    def restore_session_state(self, state: dict[str, Any]) -> None:
+        self.dataframe_sources.update(state.get("dataframe_sources", {}))
+        self.loaded_dataframes.restore(list(self.dataframe_sources))
+
     def run_impl(
         self,
         tool_input: dict[str, Any],
@@ -95,17 +167,13 @@ class DataAnalysisTool(LLMTool):
             return ToolImplOutput("", f"Error: File not found at '{file_path_str}'.")
 
         try:
-            if full_path.endswith(".csv"):
-                df = pd.read_csv(full_path)
-            elif full_path.endswith(".xlsx"):
-                df = pd.read_excel(full_path)
-            elif full_path.endswith(".json"):
-                df = pd.read_json(full_path)
-            else:
+            df = self._read_file(full_path)
+            if df is None:
                 return ToolImplOutput("", f"Error: Unsupported file type '{os.path.basename(full_path)}'.")
 
             df_id = f"df_{len(self.loaded_dataframes) + 1}"
             self.loaded_dataframes[df_id] = df
+            self.dataframe_sources[df_id] = {"file_path": file_path_str}
 
             return ToolImplOutput(
                 f"Successfully loaded '{file_path_str}' as dataframe with ID: {df_id}. Use 'describe_data' to see its structure.",
@@ -187,6 +255,7 @@ class DataAnalysisTool(LLMTool):
             
             df_id = f"df_{len(self.loaded_dataframes) + 1}"
             self.loaded_dataframes[df_id] = merged_df
+            self.dataframe_sources[df_id] = {"merge": [left_df_id, right_df_id], "on_key": on_key}
 
             return ToolImplOutput(
                 f"Successfully merged dataframes '{left_df_id}' and '{right_df_id}' into new dataframe with ID: {df_id}. Use 'describe_data' to see its structure.",
@@ -28,6 +28,7 @@ class ExtractInfoTool(LLMTool):
         },
         "required": ["file_path", "info_to_extract"],
     }
+    parallel_safe = True
 
     def __init__(self, llm: LLMClient, workspace_manager: WorkspaceManager):
         super().__init__()
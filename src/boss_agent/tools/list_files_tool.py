@@ -3,6 +3,7 @@
 import os
 from typing import Any, Optional, List
 from boss_agent.tools.base import LLMTool, ToolImplOutput
+from boss_agent.tools.output_store import TOOL_OUTPUT_DIR
 from boss_agent.llm.message_history import MessageHistory
 from boss_agent.utils import WorkspaceManager
 
@@ -21,6 +22,8 @@ class ListFilesTool(LLMTool):
         },
         "required": [],
     }
+    parallel_safe = True
+    idempotent = True
 
     def __init__(self, workspace_manager: WorkspaceManager):
         super().__init__()
@@ -39,14 +42,10 @@ class ListFilesTool(LLMTool):
         if path_filter == 'knowledge_base':
             path_filter = '.'
 
-        # --- Path Sanitization ---
-        safe_path_filter = os.path.normpath(os.path.join('/', path_filter)).lstrip('/\\')
-        if ".." in safe_path_filter.split(os.sep):
+        search_paths = self._search_paths(path_filter)
+        if search_paths is None:
             return ToolImplOutput("", "Error: Directory traversal is not allowed.")
-
-        # --- Define Search Paths ---
-        kb_path = os.path.join(self.workspace_manager.root, safe_path_filter)
-        session_path = os.path.join(self.workspace_manager.session_workspace, safe_path_filter)
+        kb_path, session_path = search_paths
 
         # --- Validate Path Existence ---
         if not os.path.isdir(kb_path) and not os.path.isdir(session_path):
@@ -57,6 +56,9 @@ class ListFilesTool(LLMTool):
         # --- Walk through knowledge base path ---
         if os.path.isdir(kb_path):
             for root, dirs, files in os.walk(kb_path):
+                # Offloaded tool outputs are read with read_tool_output, not as files.
+                if TOOL_OUTPUT_DIR in dirs:
+                    dirs.remove(TOOL_OUTPUT_DIR)
                 relative_root = os.path.relpath(root, kb_path)
                 if relative_root == ".":
                     relative_root = ""
@@ -72,6 +74,8 @@ class ListFilesTool(LLMTool):
         # --- Walk through session workspace path (if different) ---
         if kb_path != session_path and os.path.isdir(session_path):
              for root, dirs, files in os.walk(session_path):
+                if TOOL_OUTPUT_DIR in dirs:
+                    dirs.remove(TOOL_OUTPUT_DIR)
                 relative_root = os.path.relpath(root, session_path)
                 if relative_root == ".":
                     relative_root = ""
@@ -93,3 +97,22 @@ class ListFilesTool(LLMTool):
 
         result = f"Contents of '{path_filter}':\n" + "\n".join(output_lines)
         return ToolImplOutput(result, f"Successfully listed contents of '{path_filter}'.")
+
+    def cache_dependencies(self, tool_input: dict[str, Any]) -> list[str]:
+        path_filter = tool_input.get("path", ".")
+        if path_filter == 'knowledge_base':
+            path_filter = '.'
+        return list(self._search_paths(path_filter) or [])
+
+    def _search_paths(self, path_filter: str) -> Optional[tuple[str, str]]:
+        """The knowledge base and session directories to search, or None on traversal."""
+        # --- Path Sanitization ---
+        safe_path_filter = os.path.normpath(os.path.join('/', path_filter)).lstrip('/\\')
+        if ".." in safe_path_filter.split(os.sep):
+            return None
+
+        # --- Define Search Paths ---
+        return (
+            os.path.join(self.workspace_manager.root, safe_path_filter),
+            os.path.join(self.workspace_manager.session_workspace, safe_path_filter),
+        )
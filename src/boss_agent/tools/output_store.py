@@ -0,0 +1,65 @@
+"""Offloading of large tool outputs out of the conversation history."""
+
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import Optional
+
+# Directory inside the session workspace holding offloaded outputs. File listing,
+# content search and cache fingerprints skip it.
+TOOL_OUTPUT_DIR = ".tool_outputs"
+
+_HANDLE_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ToolOutputBlobStore:
+    """Stores tool outputs above a size threshold as files and hands out handles.
+
+    The history keeps a preview of an offloaded output and its handle, and the
+    ``read_tool_output`` tool fetches character ranges of the full output on demand.
+    Outputs are content-addressed, so storing the same output twice (e.g. a cached
+    tool result) reuses the existing blob.
+    """
+
+    def __init__(self, directory: Path, threshold_chars: int, preview_chars: int):
+        self.directory = Path(directory)
+        self.threshold_chars = threshold_chars
+        self.preview_chars = preview_chars
+
+    def offload(self, tool_name: str, output: str) -> str:
+        """Return ``output`` itself if it is small, otherwise a preview with a handle."""
+        if len(output) <= self.threshold_chars:
+            return output
+        handle = self.put(output)
+        preview = output[: self.preview_chars]
+        return (
+            f"{preview}\n...\n"
+            f"[The output of {tool_name} is {len(output)} characters long; only the first "
+            f"{len(preview)} are shown. It is stored under handle '{handle}'. Use the "
+            f"read_tool_output tool with this handle and an offset to read the rest.]"
+        )
+
+    def put(self, output: str) -> str:
+        handle = hashlib.blake2b(output.encode("utf-8"), digest_size=16).hexdigest()
+        path = self._path(handle)
+        if not path.exists():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary name first so a reader never sees a partial blob.
+            temporary_path = path.with_suffix(f".{os.getpid()}.tmp")
+            temporary_path.write_text(output, encoding="utf-8")
+            os.replace(temporary_path, path)
+        return handle
+
+    def read(self, handle: str, offset: int, length: int) -> Optional[tuple[str, int]]:
+        """Return (``length`` characters from ``offset``, total length), or None if unknown."""
+        if not _HANDLE_PATTERN.match(handle):
+            return None
+        try:
+            output = self._path(handle).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        return output[offset : offset + length], len(output)
+
+    def _path(self, handle: str) -> Path:
+        return self.directory / f"{handle}.txt"
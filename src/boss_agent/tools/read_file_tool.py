@@ -6,6 +6,7 @@ import pandas as pd
 import PyPDF2
 import zipfile
 from typing import Any, Optional, List
+from boss_agent.core import cancellation
 from boss_agent.tools.base import LLMTool, ToolImplOutput
 from boss_agent.utils import WorkspaceManager
 
@@ -23,6 +24,8 @@ class ReadFileTool(LLMTool):
         },
         "required": ["path"],
     }
+    parallel_safe = True
+    idempotent = True
 
     def __init__(self, workspace_manager: WorkspaceManager):
         super().__init__()
@@ -36,6 +39,7 @@ class ReadFileTool(LLMTool):
                     reader = PyPDF2.PdfReader(pdf_file)
                     content = []
                     for page in reader.pages:
+                        cancellation.raise_if_cancelled()
                         content.append(page.extract_text())
                     return "\\n".join(content)
             elif file_path.endswith(".docx"):
@@ -78,18 +82,31 @@ class ReadFileTool(LLMTool):
         if not file_path_str:
             return ToolImplOutput("", "Error: 'path' is a required parameter.")
 
-        # --- Path Sanitization ---
-        safe_path = os.path.normpath(os.path.join('/', file_path_str)).lstrip('/\\')
-        if ".." in safe_path.split(os.sep):
+        candidate_paths = self._candidate_paths(file_path_str)
+        if candidate_paths is None:
             return ToolImplOutput("", "Error: Directory traversal is not allowed.")
 
         # Prioritize session path, then fall back to knowledge base
-        full_path = os.path.join(self.workspace_manager.session_workspace, safe_path)
+        full_path, kb_full_path = candidate_paths
         if not os.path.exists(full_path):
-            full_path = os.path.join(self.workspace_manager.root, safe_path)
+            full_path = kb_full_path
 
         if not os.path.isfile(full_path):
             return ToolImplOutput("", f"Error: File not found at '{file_path_str}'.")
 
         content = self._read_file_content(full_path)
         return ToolImplOutput(content, f"Successfully read content from '{file_path_str}'.")
+
+    def cache_dependencies(self, tool_input: dict[str, Any]) -> list[str]:
+        return list(self._candidate_paths(tool_input.get("path") or "") or [])
+
+    def _candidate_paths(self, file_path_str: str) -> Optional[tuple[str, str]]:
+        """The session and knowledge base paths for a file, or None on traversal."""
+        # --- Path Sanitization ---
+        safe_path = os.path.normpath(os.path.join('/', file_path_str)).lstrip('/\\')
+        if ".." in safe_path.split(os.sep):
+            return None
+        return (
+            os.path.join(self.workspace_manager.session_workspace, safe_path),
+            os.path.join(self.workspace_manager.root, safe_path),
+        )
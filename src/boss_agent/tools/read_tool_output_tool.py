@@ -0,0 +1,64 @@
+"""Tool for reading tool outputs that were too large to keep in the conversation."""
+
+from typing import Any, Optional
+from boss_agent.llm.message_history import MessageHistory
+from boss_agent.tools.base import LLMTool, ToolImplOutput
+from boss_agent.tools.output_store import ToolOutputBlobStore
+
+
+class ReadToolOutputTool(LLMTool):
+    name = "read_tool_output"
+    description = "Reads part of a large tool output that was stored under a handle instead of being shown in full. Use it to continue reading from where the preview stopped or to look at a specific range."
+
+    input_schema = {
+        "type": "object",
+        "properties": {
+            "handle": {
+                "type": "string",
+                "description": "The handle given in place of the full output.",
+            },
+            "offset": {
+                "type": "integer",
+                "description": "The character offset to start reading from.",
+                "default": 0,
+            },
+            "length": {
+                "type": "integer",
+                "description": "The number of characters to read.",
+            },
+        },
+        "required": ["handle"],
+    }
+    parallel_safe = True
+    # Stored outputs never change.
+    idempotent = True
+
+    def __init__(self, output_store: ToolOutputBlobStore):
+        super().__init__()
+        self.output_store = output_store
+
+    def run_impl(
+        self,
+        tool_input: dict[str, Any],
+        message_history: Optional[MessageHistory] = None,
+    ) -> ToolImplOutput:
+        handle = tool_input["handle"]
+        offset = max(int(tool_input.get("offset", 0)), 0)
+        # Read at most as much as the history keeps inline for any other tool.
+        max_length = self.output_store.threshold_chars
+        length = min(max(int(tool_input.get("length", max_length)), 1), max_length)
+
+        result = self.output_store.read(handle, offset, length)
+        if result is None:
+            return ToolImplOutput(
+                f"Error: No stored output with handle '{handle}'.", "Unknown handle."
+            )
+        text, total_length = result
+        end = offset + len(text)
+        if end < total_length:
+            text += f"\n[Characters {offset}-{end} of {total_length}. Continue with offset {end}.]"
+        else:
+            text += f"\n[Characters {offset}-{end} of {total_length}. End of output.]"
+        return ToolImplOutput(
+            text, f"Read characters {offset}-{end} of stored output {handle}."
+        )
@@ -0,0 +1,54 @@
+"""Precompiled index of an agent's tools."""
+
+from typing import Sequence
+
+from boss_agent.llm.base import ToolParam
+from boss_agent.tools.base import LLMTool
+
+
+class ToolRegistry:
+    """A frozen view of one tool set, built once and reused on every turn.
+
+    Holds a name-to-tool dict for O(1) lookup, the ``ToolParam`` list sent to the
+    model, and warms each tool's compiled input validator. A registry never changes;
+    when the tool set changes, build a new one.
+    """
+
+    def __init__(self, tools: Sequence[LLMTool]):
+        self._tools = tuple(tools)
+
+        self._by_name: dict[str, LLMTool] = {}
+        for tool in self._tools:
+            if tool.name in self._by_name:
+                raise ValueError(f"Tool {tool.name} is duplicated")
+            self._by_name[tool.name] = tool
+
+        self._tool_params = [tool.get_tool_param() for tool in self._tools]
+        for tool in self._tools:
+            tool.get_validator()
+
+    @property
+    def tools(self) -> tuple[LLMTool, ...]:
+        return self._tools
+
+    @property
+    def tool_params(self) -> list[ToolParam]:
+        """The tool definitions for the model. Callers must not modify the list."""
+        return self._tool_params
+
+    def get(self, tool_name: str) -> LLMTool:
+        """Returns the tool with the given name.
+
+        Raises:
+            ValueError: If no tool has that name.
+        """
+        try:
+            return self._by_name[tool_name]
+        except KeyError:
+            raise ValueError(f"Tool with name {tool_name} not found")
+
+    def __contains__(self, tool_name: str) -> bool:
+        return tool_name in self._by_name
+
+    def __len__(self) -> int:
+        return len(self._tools)
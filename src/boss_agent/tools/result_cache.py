@@ -0,0 +1,120 @@
+"""Memoization of idempotent tool calls within a session."""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Any, Iterable, Optional
+
+from boss_agent.tools.output_store import TOOL_OUTPUT_DIR
+
+ToolOutput = str | list[dict[str, Any]]
+
+
+def fingerprint_paths(paths: Iterable[str]) -> str:
+    """Hash the mtime and size of every path, walking directories recursively.
+
+    Missing paths are part of the fingerprint too, so a file appearing where a tool
+    previously found nothing invalidates the cached result.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+
+    def add(path: str):
+        try:
+            stat = os.stat(path)
+            digest.update(f"{path}\0{stat.st_mtime_ns}\0{stat.st_size}\n".encode())
+        except OSError:
+            digest.update(f"{path}\0missing\n".encode())
+
+    for path in paths:
+        add(path)
+        if not os.path.isdir(path):
+            continue
+        for root, dirs, files in os.walk(path):
+            if TOOL_OUTPUT_DIR in dirs:
+                dirs.remove(TOOL_OUTPUT_DIR)
+            dirs.sort()
+            # A directory's own mtime changes when entries are added or removed.
+            for name in dirs + sorted(files):
+                add(os.path.join(root, name))
+    return digest.hexdigest()
+
+
+class ToolResultCache:
+    """LRU cache of tool outputs, bounded by the total size of the cached outputs.
+
+    Entries are keyed by tool name and the canonical JSON form of the input, and
+    remember the fingerprint of the files the tool depends on; an entry whose files
+    have changed since it was stored is treated as a miss and dropped.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, str], tuple[str, ToolOutput, int]] = (
+            OrderedDict()
+        )
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        tool_name: str, tool_input: dict[str, Any]
+    ) -> Optional[tuple[str, str]]:
+        """Returns the cache key, or None if the input cannot be canonicalized."""
+        try:
+            canonical_input = json.dumps(
+                tool_input, sort_keys=True, separators=(",", ":")
+            )
+        except (TypeError, ValueError):
+            return None
+        return tool_name, canonical_input
+
+    def get(self, key: tuple[str, str], fingerprint: str) -> Optional[ToolOutput]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != fingerprint:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            output = entry[1]
+        # Callers may modify list outputs (e.g. redact images), so hand out copies.
+        return output if isinstance(output, str) else deepcopy(output)
+
+    def put(self, key: tuple[str, str], fingerprint: str, output: ToolOutput):
+        size = self._size_of(output)
+        if size > self.max_bytes:
+            return
+        stored = output if isinstance(output, str) else deepcopy(output)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (fingerprint, stored, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def _remove(self, key: tuple[str, str]):
+        _, _, size = self._entries.pop(key)
+        self._total_bytes -= size
+
+    @staticmethod
+    def _size_of(output: ToolOutput) -> int:
+        if isinstance(output, str):
+            return len(output.encode("utf-8", errors="replace"))
+        return len(json.dumps(output, default=str))
@@ -26,6 +26,7 @@ Note:
         },
         "required": ["file_path"],
     }
+    parallel_safe = True
 
     def __init__(self, workspace_manager: WorkspaceManager, text_limit: int = 100000):
         self.text_limit = text_limit
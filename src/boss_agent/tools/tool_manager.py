@@ -1,11 +1,19 @@
 import asyncio
+import contextvars
 import logging
+from concurrent.futures import Future, ThreadPoolExecutor
 from copy import deepcopy
 from typing import Optional, List, Dict, Any
-from boss_agent.llm.base import LLMClient
+from boss_agent.core import tracing
+from boss_agent.llm.base import LLMClient, ToolParam
 from boss_agent.llm.context_manager.llm_summarizing import LLMSummarizingContextManager
 from boss_agent.llm.token_counter import TokenCounter
+from boss_agent.llm import response_cache
 from boss_agent.tools.base import LLMTool
+from boss_agent.tools.registry import ToolRegistry
+from boss_agent.tools.result_cache import ToolResultCache, fingerprint_paths
+from boss_agent.tools.output_store import ToolOutputBlobStore
+from boss_agent.tools.read_tool_output_tool import ReadToolOutputTool
 from boss_agent.llm.message_history import ToolCallParameters
 from boss_agent.tools.memory.compactify_memory import CompactifyMemoryTool
 from boss_agent.tools.memory.simple_memory import SimpleMemoryTool
@@ -44,6 +52,7 @@ from boss_agent.tools.extract_info_tool import ExtractInfoTool
 from boss_agent.tools.data_analysis_tool import DataAnalysisTool
 from boss_agent.tools.visualization_tool import VisualizationTool
 from boss_agent.tools.report_generator_tool import ReportGeneratorTool
+from boss_agent.utils.constants import MAX_PARALLEL_TOOL_CALLS, TOOL_RESULT_CACHE_MAX_BYTES
 
 
 def get_system_tools(
@@ -62,7 +71,7 @@ def get_system_tools(
     """
     logger = logging.getLogger("presentation_context_manager")
     context_manager = LLMSummarizingContextManager(
-        client=client,
+        client=response_cache.wrap(client),
         token_counter=TokenCounter(),
         logger=logger,
         token_budget=120_000,
@@ -77,7 +86,7 @@ def get_system_tools(
         ListFilesTool(workspace_manager=workspace_manager),
         ContentSearchTool(workspace_manager=workspace_manager),
         DataAggregationTool(workspace_manager=workspace_manager),
-        ExtractInfoTool(llm=client, workspace_manager=workspace_manager),
+        ExtractInfoTool(llm=response_cache.wrap(client), workspace_manager=workspace_manager),
         data_analysis_tool,
         visualization_tool,
         ReportGeneratorTool(workspace_manager=workspace_manager, client=client, data_analysis_tool=data_analysis_tool, visualization_tool=visualization_tool),
@@ -125,6 +134,44 @@ def get_system_tools(
     return tools
 
 
+class _ToolList(list):
+    """The tool list of an ``AgentToolManager``; calls ``on_change`` after every change."""
+
+    def __init__(self, tools: List[LLMTool], on_change):
+        super().__init__(tools)
+        self._on_change = on_change
+
+
+def _notifying(name: str):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._on_change()
+        return result
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in (
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "extend",
+    "insert",
+    "remove",
+    "pop",
+    "clear",
+    "sort",
+    "reverse",
+):
+    setattr(_ToolList, _name, _notifying(_name))
+del _name
+
+
 class AgentToolManager:
     """
     Manages the creation and execution of tools for the agent.
@@ -139,10 +186,74 @@ class AgentToolManager:
     search capabilities, and task completion functionality.
     """
 
-    def __init__(self, tools: List[LLMTool], logger_for_agent_logs: logging.Logger, interactive_mode: bool = True):
+    def __init__(
+        self,
+        tools: List[LLMTool],
+        logger_for_agent_logs: logging.Logger,
+        interactive_mode: bool = True,
+        max_parallel_tools: int = MAX_PARALLEL_TOOL_CALLS,
+        result_cache_max_bytes: int = TOOL_RESULT_CACHE_MAX_BYTES,
+        output_store: Optional[ToolOutputBlobStore] = None,
+    ):
         self.logger_for_agent_logs = logger_for_agent_logs
         self.complete_tool = ReturnControlToUserTool() if interactive_mode else CompleteTool()
+        # Large text outputs are replaced by a preview and a handle that the
+        # read_tool_output tool resolves; without a store they stay inline.
+        self.output_store = output_store
+        self.read_output_tool: Optional[ReadToolOutputTool] = (
+            ReadToolOutputTool(output_store) if output_store is not None else None
+        )
+        self._registry: Optional[ToolRegistry] = None
         self.tools = tools
+        self.max_parallel_tools = max_parallel_tools
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._async_semaphore: Optional[asyncio.Semaphore] = None
+        # Memoizes idempotent tools; a size of 0 disables it.
+        self.result_cache: Optional[ToolResultCache] = (
+            ToolResultCache(result_cache_max_bytes) if result_cache_max_bytes > 0 else None
+        )
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Lazily create the bounded thread pool used for parallel tool calls."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_parallel_tools,
+                thread_name_prefix="agent-tool",
+            )
+        return self._executor
+
+    @property
+    def tools(self) -> List[LLMTool]:
+        return self._tools
+
+    @tools.setter
+    def tools(self, tools: List[LLMTool]):
+        # A copy that drops the registry whenever it is changed in place.
+        self._tools = _ToolList(tools, on_change=self._invalidate_registry)
+        self._invalidate_registry()
+
+    def _invalidate_registry(self):
+        self._registry = None
+
+    def get_registry(self) -> ToolRegistry:
+        """
+        Returns the registry of the current tool set.
+
+        The registry is rebuilt only when the tool set has changed since it was last
+        built, i.e. after ``tools`` was reassigned or changed in place.
+
+        Raises:
+            ValueError: If two tools share a name.
+        """
+        if self._registry is None:
+            self._registry = ToolRegistry(self.get_tools())
+        return self._registry
+
+    def get_tool_params(self) -> List[ToolParam]:
+        """
+        Returns the tool definitions to send to the model for the current tool set.
+        """
+        return self.get_registry().tool_params
 
     def get_tool(self, tool_name: str) -> LLMTool:
         """
@@ -157,11 +268,7 @@ class AgentToolManager:
         Raises:
             ValueError: If the tool with the specified name is not found.
         """
-        try:
-            tool: LLMTool = next(t for t in self.get_tools() if t.name == tool_name)
-            return tool
-        except StopIteration:
-            raise ValueError(f"Tool with name {tool_name} not found")
+        return self.get_registry().get(tool_name)
 
     def run_tool(self, tool_params: ToolCallParameters, history: MessageHistory) -> str | list[dict[str, Any]]:
         """
@@ -176,13 +283,106 @@ class AgentToolManager:
         llm_tool = self.get_tool(tool_params.tool_name)
         tool_name = tool_params.tool_name
         tool_input = tool_params.tool_input
-        self.logger_for_agent_logs.info(f"Running tool: {tool_name}")
-        self.logger_for_agent_logs.info(f"Tool input: {tool_input}")
-        result = llm_tool.run(tool_input, history)
+        with tracing.span("tool.run", tool_name=tool_name, tool_call_id=tool_params.tool_call_id) as current:
+            cache_key, fingerprint, cached = self._lookup_cached_result(llm_tool, tool_params)
+            if current is not None:
+                current.set_attribute("cache_hit", cached is not None)
+            if cached is not None:
+                return self._log_tool_result(
+                    tool_params, self._offload(llm_tool, tool_params, cached), from_cache=True
+                )
+            self.logger_for_agent_logs.info(f"Running tool: {tool_name}")
+            self.logger_for_agent_logs.info(f"Tool input: {tool_input}")
+            result = llm_tool.run(tool_input, history)
+            self._store_result(cache_key, fingerprint, result)
+            return self._log_tool_result(tool_params, self._offload(llm_tool, tool_params, result))
+
+    async def arun_tool(
+        self, tool_params: ToolCallParameters, history: MessageHistory
+    ) -> str | list[dict[str, Any]]:
+        """
+        Async variant of ``run_tool``, awaiting the tool's ``arun``.
+        """
+        llm_tool = self.get_tool(tool_params.tool_name)
+        with tracing.span(
+            "tool.run", tool_name=tool_params.tool_name, tool_call_id=tool_params.tool_call_id
+        ) as current:
+            cache_key, fingerprint, cached = self._lookup_cached_result(llm_tool, tool_params)
+            if current is not None:
+                current.set_attribute("cache_hit", cached is not None)
+            if cached is not None:
+                return self._log_tool_result(
+                    tool_params, self._offload(llm_tool, tool_params, cached), from_cache=True
+                )
+            self.logger_for_agent_logs.info(f"Running tool: {tool_params.tool_name}")
+            self.logger_for_agent_logs.info(f"Tool input: {tool_params.tool_input}")
+            result = await llm_tool.arun(tool_params.tool_input, history)
+            self._store_result(cache_key, fingerprint, result)
+            return self._log_tool_result(tool_params, self._offload(llm_tool, tool_params, result))
 
+    def _lookup_cached_result(
+        self, llm_tool: LLMTool, tool_params: ToolCallParameters
+    ) -> tuple[Optional[tuple[str, str]], Optional[str], Optional[str | list[dict[str, Any]]]]:
+        """
+        Returns (cache key, dependency fingerprint, cached output) for a tool call.
+
+        The key and fingerprint are None when the call is not cacheable; they are
+        taken before the tool runs so that changes made while it runs invalidate the
+        stored result.
+        """
+        if self.result_cache is None or not llm_tool.idempotent:
+            return None, None, None
+        cache_key = ToolResultCache.make_key(tool_params.tool_name, tool_params.tool_input)
+        if cache_key is None:
+            return None, None, None
+        try:
+            fingerprint = fingerprint_paths(llm_tool.cache_dependencies(tool_params.tool_input))
+        except Exception as e:
+            self.logger_for_agent_logs.warning(
+                f"Not caching {tool_params.tool_name}: failed to fingerprint its inputs: {e}"
+            )
+            return None, None, None
+        return cache_key, fingerprint, self.result_cache.get(cache_key, fingerprint)
+
+    def _store_result(
+        self,
+        cache_key: Optional[tuple[str, str]],
+        fingerprint: Optional[str],
+        result: str | list[dict[str, Any]],
+    ):
+        if self.result_cache is not None and cache_key is not None and fingerprint is not None:
+            self.result_cache.put(cache_key, fingerprint, result)
+
+    def _offload(
+        self,
+        llm_tool: LLMTool,
+        tool_params: ToolCallParameters,
+        result: str | list[dict[str, Any]],
+    ) -> str | list[dict[str, Any]]:
+        """Move a large text output to the output store, leaving a preview and handle."""
+        if self.output_store is None or llm_tool is self.read_output_tool or not isinstance(result, str):
+            return result
+        try:
+            return self.output_store.offload(tool_params.tool_name, result)
+        except OSError as e:
+            self.logger_for_agent_logs.warning(
+                f"Keeping the output of {tool_params.tool_name} inline: failed to store it: {e}"
+            )
+            return result
+
+    def _log_tool_result(
+        self,
+        tool_params: ToolCallParameters,
+        result: str | list[dict[str, Any]],
+        from_cache: bool = False,
+    ) -> str | list[dict[str, Any]]:
+        tool_name = tool_params.tool_name
+        tool_input = tool_params.tool_input
         tool_input_str = "\n".join([f" - {k}: {v}" for k, v in tool_input.items()])
 
         log_message = f"Calling tool {tool_name} with input:\n{tool_input_str}"
+        if from_cache:
+            log_message = f"Calling tool {tool_name} (cache hit, files unchanged) with input:\n{tool_input_str}"
         if isinstance(result, str):
             log_message += f"\nTool output: \n{result}\n\n"
         else:
@@ -199,6 +399,144 @@ class AgentToolManager:
 
         return tool_result
 
+    def submit_tool(
+        self, tool_call: ToolCallParameters, history: MessageHistory
+    ) -> Future:
+        """
+        Starts a parallel-safe tool call on the tool pool and returns its future.
+
+        Used to begin executing a tool while the model is still generating the rest
+        of its turn. The future is later handed back to ``run_tools``.
+        """
+        # Run in a copy of the caller's context so the tool's span nests under the turn.
+        context = contextvars.copy_context()
+        return self._get_executor().submit(context.run, self.run_tool, tool_call, history)
+
+    def start_tool(
+        self, tool_call: ToolCallParameters, history: MessageHistory
+    ) -> asyncio.Task:
+        """
+        Async counterpart of ``submit_tool``: schedules a parallel-safe tool call on
+        the running event loop and returns its task, for ``arun_tools``.
+        """
+        return asyncio.create_task(self._arun_bounded(tool_call, history))
+
+    async def _arun_bounded(
+        self, tool_call: ToolCallParameters, history: MessageHistory
+    ) -> str | list[dict[str, Any]]:
+        if self._async_semaphore is None:
+            self._async_semaphore = asyncio.Semaphore(max(self.max_parallel_tools, 1))
+        async with self._async_semaphore:
+            return await self.arun_tool(tool_call, history)
+
+    def can_dispatch_early(self, tool_name: str) -> bool:
+        """Whether a call to ``tool_name`` may start before the model's turn has ended."""
+        return self.max_parallel_tools > 1 and self._is_parallel_safe(tool_name)
+
+    def run_tools(
+        self,
+        tool_calls: List[ToolCallParameters],
+        history: MessageHistory,
+        started: Optional[Dict[str, Future]] = None,
+    ) -> List[str | list[dict[str, Any]]]:
+        """
+        Executes the tool calls of one assistant turn.
+
+        Consecutive calls to parallel-safe tools are run concurrently on a bounded
+        thread pool; any other call acts as a barrier and runs on its own, so the
+        relative order of side effects is the one the model asked for.
+
+        Args:
+            tool_calls (List[ToolCallParameters]): The tool calls, in model order.
+            history (MessageHistory): The history of the conversation.
+            started (Dict[str, Future], optional): Futures of calls already started
+                with ``submit_tool``, keyed by tool call id. These are awaited
+                instead of being run again.
+        Returns:
+            List: The tool outputs, in the same order as ``tool_calls``.
+        """
+        started = started or {}
+        results: List[str | list[dict[str, Any]]] = []
+        batch: List[ToolCallParameters] = []
+
+        def flush_batch():
+            futures = {
+                i: started[call.tool_call_id]
+                for i, call in enumerate(batch)
+                if call.tool_call_id in started
+            }
+            pending = [i for i in range(len(batch)) if i not in futures]
+            if len(pending) > 1 and self.max_parallel_tools > 1:
+                self.logger_for_agent_logs.info(
+                    f"Running {len(pending)} tool calls in parallel: {[batch[i].tool_name for i in pending]}"
+                )
+                for i in pending:
+                    futures[i] = self.submit_tool(batch[i], history)
+            # Whatever was not submitted runs here, overlapping with the started calls.
+            outputs = {i: self.run_tool(batch[i], history) for i in pending if i not in futures}
+            results.extend(
+                outputs[i] if i in outputs else futures[i].result() for i in range(len(batch))
+            )
+            batch.clear()
+
+        for tool_call in tool_calls:
+            if self._is_parallel_safe(tool_call.tool_name):
+                batch.append(tool_call)
+                continue
+            flush_batch()
+            results.append(self.run_tool(tool_call, history))
+        flush_batch()
+
+        return results
+
+    async def arun_tools(
+        self,
+        tool_calls: List[ToolCallParameters],
+        history: MessageHistory,
+        started: Optional[Dict[str, asyncio.Task]] = None,
+    ) -> List[str | list[dict[str, Any]]]:
+        """
+        Async variant of ``run_tools`` with the same ordering guarantees.
+
+        Batches of parallel-safe calls are gathered on the event loop, at most
+        ``max_parallel_tools`` at a time; ``started`` holds the tasks returned by
+        ``start_tool``, keyed by tool call id.
+        """
+        started = started or {}
+        results: List[str | list[dict[str, Any]]] = []
+        batch: List[ToolCallParameters] = []
+
+        async def flush_batch():
+            if len(batch) > 1:
+                self.logger_for_agent_logs.info(
+                    f"Running {len(batch)} tool calls in parallel: {[call.tool_name for call in batch]}"
+                )
+            results.extend(
+                await asyncio.gather(
+                    *(
+                        started.get(call.tool_call_id) or self._arun_bounded(call, history)
+                        for call in batch
+                    )
+                )
+            )
+            batch.clear()
+
+        for tool_call in tool_calls:
+            if self._is_parallel_safe(tool_call.tool_name):
+                batch.append(tool_call)
+                continue
+            await flush_batch()
+            results.append(await self.arun_tool(tool_call, history))
+        await flush_batch()
+
+        return results
+
+    def _is_parallel_safe(self, tool_name: str) -> bool:
+        try:
+            return self.get_tool(tool_name).parallel_safe
+        except ValueError:
+            return False
+
     def should_stop(self):
         """
         Checks if the agent should stop based on the completion tool.
@@ -223,6 +561,20 @@ class AgentToolManager:
         """
         self.complete_tool.reset()
 
+    def get_session_state(self) -> dict[str, Any]:
+        """The session state of every stateful tool, by tool name."""
+        states = {}
+        for tool in self.get_tools():
+            state = tool.get_session_state()
+            if state is not None:
+                states[tool.name] = state
+        return states
+
+    def restore_session_state(self, states: dict[str, Any]):
+        for tool in self.get_tools():
+            if tool.name in states:
+                tool.restore_session_state(states[tool.name])
+
     def get_tools(self) -> list[LLMTool]:
         """
         Retrieves a list of all available tools.
@@ -230,4 +582,7 @@ class AgentToolManager:
         Returns:
             list[LLMTool]: A list of all available tools.
         """
-        return self.tools + [self.complete_tool]
+        tools = self.tools + [self.complete_tool]
+        if self.read_output_tool is not None:
+            tools.append(self.read_output_tool)
+        return tools
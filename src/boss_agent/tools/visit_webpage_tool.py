@@ -26,6 +26,7 @@ class VisitWebpageTool(LLMTool):
         },
         "required": ["url"],
     }
+    parallel_safe = True
     output_type = "string"
 
     def __init__(self, max_output_length: int = VISIT_WEB_PAGE_MAX_OUTPUT_LENGTH):
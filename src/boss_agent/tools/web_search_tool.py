@@ -17,6 +17,7 @@ class WebSearchTool(LLMTool):
         },
         "required": ["query"],
     }
+    parallel_safe = True
     output_type = "string"
 
     def __init__(self, max_results=5, **kwargs):
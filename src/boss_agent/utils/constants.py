@@ -6,4 +6,44 @@ DEFAULT_MODEL = "gemini-1.5-pro-latest"
 
 TOKEN_BUDGET = 120_000
 SUMMARY_MAX_TOKENS = 4000
+# Fraction of TOKEN_BUDGET at which older turns start being summarized in the background.
+SUMMARY_SOFT_WATERMARK = 0.7
+# Evicted turns are summarized in chunks of about this many tokens, and every
+# SUMMARY_FAN_IN summaries of one tier are merged into one of the next.
+SUMMARY_CHUNK_TOKENS = 16_000
+SUMMARY_FAN_IN = 4
+SESSION_SUMMARY_MAX_TOKENS = 100
+# Before summarizing, stale tool outputs older than the last PRUNE_KEEP_RECENT_TURNS
+# message lists are shrunk to a PRUNE_PREVIEW_CHARS preview. Only outputs of at least
+# PRUNE_MIN_TOKENS are pruned, and for relevance only those scoring below
+# PRUNE_RELEVANCE_FLOOR of the most relevant output.
+PRUNE_KEEP_RECENT_TURNS = 4
+PRUNE_MIN_TOKENS = 200
+PRUNE_PREVIEW_CHARS = 200
+PRUNE_RELEVANCE_FLOOR = 0.15
 VISIT_WEB_PAGE_MAX_OUTPUT_LENGTH = 40_000
+MAX_PARALLEL_TOOL_CALLS = 4
+TOOL_RESULT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+# Text tool outputs longer than this are kept out of the history, which only gets a
+# preview of TOOL_OUTPUT_PREVIEW_CHARS and a handle for the read_tool_output tool.
+TOOL_OUTPUT_OFFLOAD_CHARS = 20_000
+TOOL_OUTPUT_PREVIEW_CHARS = 2_000
+# Wall-clock limit of one agent turn, tool calls included; 0 means no limit.
+TURN_TIMEOUT_SECONDS = 0
+# HTTP connection pools shared by all sessions' LLM clients, per provider endpoint.
+LLM_POOL_MAX_CONNECTIONS = 100
+LLM_POOL_MAX_KEEPALIVE_CONNECTIONS = 20
+LLM_KEEPALIVE_EXPIRY_SECONDS = 60.0
+LLM_REQUEST_TIMEOUT_SECONDS = 300.0
+LLM_CONNECT_TIMEOUT_SECONDS = 10.0
+# Failed LLM requests are retried with exponential backoff and jitter, starting at
+# LLM_RETRY_BASE_DELAY_SECONDS; LLM_RETRY_MAX_ATTEMPTS includes the first attempt.
+LLM_RETRY_MAX_ATTEMPTS = 4
+LLM_RETRY_BASE_DELAY_SECONDS = 2.0
+LLM_RETRY_MAX_DELAY_SECONDS = 60.0
+# On-disk cache of temperature-0 auxiliary LLM calls, see llm/response_cache.py.
+LLM_CACHE_PATH = "llm_cache.sqlite3"
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Directory of the per-session history snapshots that let a reopened session resume.
+SESSION_SNAPSHOT_DIR = "session_snapshots"
@@ -3,6 +3,7 @@
 import os
 import mammoth
 import openpyxl
+from boss_agent.core import cancellation
 from boss_agent.tools.advanced_tools.pdf_tool import PdfTextExtractTool
 from boss_agent.utils import WorkspaceManager
 
@@ -32,6 +33,7 @@ def read_file_content(file_path: str, workspace_manager: WorkspaceManager) -> st
             workbook = openpyxl.load_workbook(file_path)
             content = []
             for sheet_name in workbook.sheetnames:
+                cancellation.raise_if_cancelled()
                 sheet = workbook[sheet_name]
                 content.append(f"Sheet: {sheet_name}\\n")
                 for row in sheet.iter_rows(values_only=True):
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import threading
+import time
+
+import pytest
+
+from boss_agent.agents.anthropic_fc import (
+    AGENT_INTERRUPT_FAKE_MODEL_RSP,
+    AGENT_INTERRUPT_MESSAGE,
+    TURN_TIMEOUT_MESSAGE,
+    AnthropicFC,
+)
+from boss_agent.core import cancellation
+from boss_agent.core.cancellation import CancellationToken, OperationCancelled
+from boss_agent.llm.base import LLMClient, TextResult
+from boss_agent.llm.context_manager.llm_summarizing import LLMSummarizingContextManager
+from boss_agent.llm.token_counter import TokenCounter
+from boss_agent.utils import WorkspaceManager
+
+
+class BlockingClient(LLMClient):
+    """A model call that hangs until the current cancellation token fires."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.finished = threading.Event()
+
+    def generate(
+        self,
+        messages,
+        max_tokens,
+        system_prompt=None,
+        temperature=0.0,
+        tools=[],
+        tool_choice=None,
+        thinking_tokens=None,
+    ):
+        released = threading.Event()
+        self.started.set()
+        try:
+            with cancellation.on_cancel(released.set):
+                released.wait(10)
+                cancellation.raise_if_cancelled()
+            return [TextResult(text="too late")], {}
+        finally:
+            self.finished.set()
+
+
+class SlowSummaryClient(LLMClient):
+    """A summarization call that ignores cancellation and finishes when released."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.finished = threading.Event()
+
+    def generate(
+        self,
+        messages,
+        max_tokens,
+        system_prompt=None,
+        temperature=0.0,
+        tools=[],
+        tool_choice=None,
+        thinking_tokens=None,
+    ):
+        self.started.set()
+        try:
+            self.release.wait(10)
+            return [TextResult(text="Summary")], {}
+        finally:
+            self.finished.set()
+
+
+def make_agent(tmp_path, monkeypatch, client, context_manager=None, **kwargs):
+    # The agent opens its event database in the working directory.
+    monkeypatch.chdir(tmp_path)
+    logger = logging.getLogger("test_cancellation")
+    return AnthropicFC(
+        system_prompt="",
+        client=client,
+        tools=[],
+        workspace_manager=WorkspaceManager(root=tmp_path),
+        message_queue=asyncio.Queue(),
+        logger_for_agent_logs=logger,
+        context_manager=context_manager
+        or LLMSummarizingContextManager(
+            client=client, token_counter=TokenCounter(), logger=logger
+        ),
+        use_gemini=False,
+        session_summary=False,
+        **kwargs,
+    )
+
+
+def test_child_token_fires_on_parent_cancel_or_own_deadline():
+    parent = CancellationToken()
+    child = CancellationToken(timeout=60, parent=parent)
+    fired = []
+    child.add_callback(lambda: fired.append(child.reason))
+    parent.cancel("stop")
+    assert child.cancelled and fired == ["stop"]
+
+    short = CancellationToken(timeout=0.05)
+    start = time.monotonic()
+    with pytest.raises(OperationCancelled):
+        short.sleep(5)
+    assert time.monotonic() - start < 2
+    assert short.deadline_exceeded
+
+
+def test_cancel_interrupts_an_in_flight_model_call(tmp_path, monkeypatch):
+    client = BlockingClient()
+    agent = make_agent(tmp_path, monkeypatch, client)
+    threading.Thread(target=lambda: client.started.wait(5) and agent.cancel()).start()
+
+    start = time.monotonic()
+    result = agent.run_agent("hello")
+
+    assert result.tool_output == AGENT_INTERRUPT_MESSAGE
+    assert time.monotonic() - start < 5
+
+
+def test_turn_deadline_stops_a_hanging_model_call(tmp_path, monkeypatch):
+    client = BlockingClient()
+    agent = make_agent(tmp_path, monkeypatch, client, turn_timeout_seconds=0.1)
+
+    result = agent.run_agent("hello")
+
+    assert result.tool_output == TURN_TIMEOUT_MESSAGE
+    assert not agent.interrupted
+
+
+def test_async_cancel_frees_the_worker_thread(tmp_path, monkeypatch):
+    client = BlockingClient()
+    agent = make_agent(tmp_path, monkeypatch, client)
+
+    async def scenario():
+        run = asyncio.create_task(agent.arun_agent("hello"))
+        await asyncio.to_thread(client.started.wait, 5)
+        agent.cancel()
+        return await asyncio.wait_for(run, 5)
+
+    result = asyncio.run(scenario())
+
+    assert result.tool_output == AGENT_INTERRUPT_MESSAGE
+    assert client.finished.wait(5)
+
+
+def test_async_cancel_during_a_slow_summary_leaves_the_history_alone(
+    tmp_path, monkeypatch
+):
+    summarizer = SlowSummaryClient()
+    context_manager = LLMSummarizingContextManager(
+        client=summarizer,
+        token_counter=TokenCounter(),
+        logger=logging.getLogger("test_cancellation"),
+        max_size=4,
+        soft_watermark=None,
+        prune_tool_outputs=False,
+    )
+    agent = make_agent(tmp_path, monkeypatch, BlockingClient(), context_manager)
+    for index in range(4):
+        agent.history.add_user_prompt(f"question {index}")
+        agent.history.add_assistant_turn([TextResult(text=f"answer {index}")])
+
+    async def scenario():
+        run = asyncio.create_task(agent.arun_agent("next question", resume=True))
+        await asyncio.to_thread(summarizer.started.wait, 5)
+        agent.cancel()
+        result = await asyncio.wait_for(run, 5)
+        history_after_cancel = list(agent.history.get_messages_for_llm())
+        # Let the abandoned summary finish, as it would in the background.
+        summarizer.release.set()
+        await asyncio.to_thread(summarizer.finished.wait, 5)
+        await asyncio.sleep(0.2)
+        return result, history_after_cancel
+
+    result, history_after_cancel = asyncio.run(scenario())
+
+    assert result.tool_output == AGENT_INTERRUPT_MESSAGE
+    assert agent.history.get_messages_for_llm() == history_after_cancel
+    assert agent.history.get_messages_for_llm()[-1] == [
+        TextResult(text=AGENT_INTERRUPT_FAKE_MODEL_RSP)
+    ]
+    assert len(agent.history) == 10
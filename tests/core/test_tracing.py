@@ -0,0 +1,95 @@
+import json
+import logging
+from typing import Any, Optional
+
+import pytest
+
+from boss_agent.core import tracing
+from boss_agent.llm.message_history import MessageHistory, ToolCallParameters
+from boss_agent.tools.base import LLMTool, ToolImplOutput
+from boss_agent.tools.tool_manager import AgentToolManager
+
+
+class EchoTool(LLMTool):
+    name = "echo"
+    description = "Echo the value back"
+    input_schema = {
+        "type": "object",
+        "properties": {"value": {"type": "string"}},
+        "required": ["value"],
+    }
+
+    def run_impl(
+        self,
+        tool_input: dict[str, Any],
+        message_history: Optional[MessageHistory] = None,
+    ) -> ToolImplOutput:
+        return ToolImplOutput(tool_input["value"], "echoed")
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure(str(path))
+    yield path
+    tracing.configure(None)
+
+
+def read_spans(path):
+    # Reconfiguring flushes and stops the writer thread.
+    tracing.configure(None)
+    return {
+        record["name"]: record
+        for record in map(json.loads, path.read_text().splitlines())
+    }
+
+
+def test_spans_nest_across_tool_threads_and_inherit_session_attributes(trace_file):
+    manager = AgentToolManager(
+        tools=[EchoTool()], logger_for_agent_logs=logging.getLogger("test_tracing")
+    )
+    call = ToolCallParameters(
+        tool_call_id="1", tool_name="echo", tool_input={"value": "hi"}
+    )
+
+    with tracing.span("agent.run", session_id="abc"):
+        with tracing.span("agent.turn", turn=1):
+            assert (
+                manager.submit_tool(call, MessageHistory(context_manager=None)).result()
+                == "hi"
+            )
+
+    spans = read_spans(trace_file)
+    run, turn, tool = spans["agent.run"], spans["agent.turn"], spans["tool.run"]
+    assert turn["parent_span_id"] == run["span_id"]
+    assert tool["parent_span_id"] == turn["span_id"]
+    assert tool["trace_id"] == run["trace_id"]
+    assert tool["attributes"] == {
+        "session_id": "abc",
+        "turn": 1,
+        "tool_name": "echo",
+        "tool_call_id": "1",
+        "cache_hit": False,
+    }
+    assert tool["end_time_unix_nano"] >= tool["start_time_unix_nano"]
+
+
+def test_traced_generator_records_time_to_first_item_and_errors(trace_file):
+    @tracing.traced("stream")
+    def stream():
+        yield 1
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        list(stream())
+
+    record = read_spans(trace_file)["stream"]
+    assert record["status"] == "error"
+    assert record["error"] == "RuntimeError: boom"
+    assert "first_item_ms" in record["attributes"]
+
+
+def test_span_is_a_no_op_when_tracing_is_disabled():
+    tracing.configure(None)
+    with tracing.span("anything") as current:
+        assert current is None
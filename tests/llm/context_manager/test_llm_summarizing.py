@@ -1,4 +1,5 @@
 import logging
+import threading
 from unittest.mock import Mock
 import re
 
@@ -165,3 +166,79 @@ def test_llm_calls_during_summarization():
 
     assert result == expected_result
 
+
+
+def test_summary_starts_at_soft_watermark_and_is_swapped_in_at_next_turn():
+    mock_llm_client = Mock(spec=LLMClient)
+    summary_started = threading.Event()
+    release_summary = threading.Event()
+
+    def slow_generate(messages, max_tokens=None, **kwargs):
+        summary_started.set()
+        release_summary.wait(5)
+        return [TextResult(text="background summary")], None
+
+    mock_llm_client.generate.side_effect = slow_generate
+    context_manager = LLMSummarizingContextManager(
+        client=mock_llm_client,
+        token_counter=TokenCounter(),
+        logger=Mock(spec=logging.Logger),
+        token_budget=100_000,
+        max_size=10,
+        soft_watermark=0.7,
+    )
+    message_lists = [[TextPrompt(text=f"Turn {i}")] for i in range(7)]
+
+    # Past 70% of max_size: nothing is truncated yet, the summary starts in the background.
+    assert context_manager.apply_truncation_if_needed(message_lists) is message_lists
+    assert summary_started.wait(5)
+
+    # Still running at the next turn boundary: the history is left alone.
+    message_lists = message_lists + [[TextResult(text="Turn 7")]]
+    assert context_manager.apply_truncation_if_needed(message_lists) is message_lists
+
+    release_summary.set()
+    context_manager._background_summary.done.wait(5)
+    message_lists = message_lists + [[TextPrompt(text="Turn 8")]]
+    result = context_manager.apply_truncation_if_needed(message_lists)
+
+    assert mock_llm_client.generate.call_count == 1
+    assert result[0] == message_lists[0]
+    assert result[1] == [TextResult(text="Conversation Summary: background summary")]
+    # Everything after the summarized span is kept, including turns added since.
+    assert result[2:] == message_lists[6:]
+
+
+def test_precomputed_summary_still_over_budget_is_truncated_further():
+    mock_llm_client = Mock(spec=LLMClient)
+    summary_started = threading.Event()
+    release_summary = threading.Event()
+
+    def slow_generate(messages, max_tokens=None, **kwargs):
+        summary_started.set()
+        release_summary.wait(5)
+        return [TextResult(text="summary")], None
+
+    mock_llm_client.generate.side_effect = slow_generate
+    context_manager = LLMSummarizingContextManager(
+        client=mock_llm_client,
+        token_counter=TokenCounter(),
+        logger=Mock(spec=logging.Logger),
+        token_budget=1000,
+        max_size=10,
+        soft_watermark=0.7,
+    )
+    message_lists = [[TextPrompt(text=f"Turn {i}")] for i in range(7)]
+    assert context_manager.apply_truncation_if_needed(message_lists) is message_lists
+    assert summary_started.wait(5)
+
+    # Long turns arrive while the summary of the first turns is being made.
+    message_lists = message_lists + [[TextResult(text="x" * 1500)] for _ in range(4)]
+    message_lists = message_lists + [[TextPrompt(text="Turn 11")]]
+    release_summary.set()
+    context_manager._background_summary.done.wait(5)
+    result = context_manager.apply_truncation_if_needed(message_lists)
+
+    assert mock_llm_client.generate.call_count == 2
+    assert not context_manager.should_truncate(result)
+    assert result[-1] == [TextPrompt(text="Turn 11")]
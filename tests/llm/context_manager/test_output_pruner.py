@@ -0,0 +1,144 @@
+import logging
+from unittest.mock import Mock
+
+from boss_agent.llm.base import (
+    LLMClient,
+    TextPrompt,
+    TextResult,
+    ToolCall,
+    ToolFormattedResult,
+)
+from boss_agent.llm.context_manager.llm_summarizing import LLMSummarizingContextManager
+from boss_agent.llm.context_manager.output_pruner import (
+    PRUNED_OUTPUT_PREFIX,
+    ToolOutputPruner,
+)
+from boss_agent.llm.token_counter import TokenCounter
+
+
+def _tool_turns(call_id, tool_name, tool_input, output):
+    return [
+        [ToolCall(tool_call_id=call_id, tool_name=tool_name, tool_input=tool_input)],
+        [
+            ToolFormattedResult(
+                tool_call_id=call_id, tool_name=tool_name, tool_output=output
+            )
+        ],
+    ]
+
+
+def _history():
+    listing = "\n".join(f"src/module_{i}.py" for i in range(300))
+    page = " ".join(["recipe for sourdough bread with flour water salt"] * 60)
+    report = " ".join(["quarterly revenue by region north south east west"] * 60)
+    return [
+        [TextPrompt(text="Summarize the quarterly revenue by region")],
+        *_tool_turns("1", "list_files", {"path": "."}, listing),
+        *_tool_turns("2", "visit_webpage", {"url": "https://example.com/bread"}, page),
+        *_tool_turns(
+            "3", "visit_webpage", {"url": "https://example.com/revenue"}, report
+        ),
+        *_tool_turns("4", "list_files", {"path": "."}, listing),
+        [
+            TextResult(
+                text="The revenue report covers every region; writing the summary now."
+            )
+        ],
+        [TextPrompt(text="Go on")],
+    ]
+
+
+def _context_manager(token_budget):
+    client = Mock(spec=LLMClient)
+    client.generate.return_value = ([TextResult(text="Summary")], None)
+    context_manager = LLMSummarizingContextManager(
+        client=client,
+        token_counter=TokenCounter(),
+        logger=Mock(spec=logging.Logger),
+        token_budget=token_budget,
+        soft_watermark=None,
+    )
+    return context_manager, client
+
+
+def test_stale_outputs_are_pruned_without_summarizing():
+    history = _history()
+    tokens = LLMSummarizingContextManager(
+        client=Mock(spec=LLMClient),
+        token_counter=TokenCounter(),
+        logger=Mock(spec=logging.Logger),
+    ).count_tokens(history)
+    context_manager, client = _context_manager(tokens - 2500)
+
+    result = context_manager.apply_truncation_if_needed(history)
+
+    client.generate.assert_not_called()
+    assert len(result) == len(history)
+    # The listing taken again later goes first, then the page unrelated to the goal.
+    assert result[2][0].tool_output.startswith(PRUNED_OUTPUT_PREFIX)
+    assert result[4][0].tool_output.startswith(PRUNED_OUTPUT_PREFIX)
+    assert result[6] is history[6]
+    assert result[8] is history[8]
+    assert result[2][0].tool_call_id == "1"
+    assert context_manager.count_tokens(result) <= tokens - 2500
+
+
+def test_summarizes_what_pruning_cannot_free():
+    context_manager, client = _context_manager(200)
+
+    result = context_manager.apply_truncation_if_needed(_history())
+
+    client.generate.assert_called()
+    assert "Conversation Summary:" in result[1][0].text
+
+
+def _pruner():
+    return ToolOutputPruner(
+        count_tokens=lambda block: len(block.tool_output),
+        min_tokens=10,
+        preview_chars=20,
+        relevance_floor=0.15,
+    )
+
+
+def test_relevance_of_chinese_outputs_is_scored_by_character_bigrams():
+    report = "华北、华南、华东和华西各地区的季度收入报告。" * 20
+    recipe = "面包食谱：面粉、水和盐，揉面后发酵两小时。" * 20
+    history = [
+        [TextPrompt(text="总结各地区的季度收入")],
+        *_tool_turns(
+            "1", "visit_webpage", {"url": "https://example.com/revenue"}, report
+        ),
+        *_tool_turns(
+            "2", "visit_webpage", {"url": "https://example.com/bread"}, recipe
+        ),
+    ]
+
+    pruned, freed = _pruner().prune(history, 0, len(history), tokens_to_free=10_000)
+
+    assert pruned[2] is history[2]
+    assert pruned[4][0].tool_output.startswith(PRUNED_OUTPUT_PREFIX)
+    assert freed > 0
+
+
+def test_outputs_are_kept_when_none_matches_the_goal():
+    history = [
+        [TextPrompt(text="总结各地区的季度收入")],
+        *_tool_turns(
+            "1",
+            "visit_webpage",
+            {"url": "https://example.com/bread"},
+            "面包食谱：面粉、水和盐。" * 20,
+        ),
+        *_tool_turns(
+            "2",
+            "visit_webpage",
+            {"url": "https://example.com/tea"},
+            "绿茶的冲泡方法与水温。" * 20,
+        ),
+    ]
+
+    assert _pruner().prune(history, 0, len(history), tokens_to_free=10_000) == (
+        history,
+        0,
+    )
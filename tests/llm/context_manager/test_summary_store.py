@@ -0,0 +1,66 @@
+import logging
+from unittest.mock import Mock
+
+from boss_agent.llm.base import LLMClient, TextPrompt, TextResult
+from boss_agent.llm.context_manager.llm_summarizing import LLMSummarizingContextManager
+from boss_agent.llm.context_manager.summary_store import SummaryStore, SummaryTiers
+from boss_agent.llm.token_counter import TokenCounter
+
+
+def test_chunks_are_summarized_once_and_merged_per_tier():
+    summarized: list[list[str]] = []
+    merged: list[list[str]] = []
+
+    def summarize(events):
+        summarized.append(events)
+        return "+".join(events)
+
+    def merge(summaries):
+        merged.append(summaries)
+        return f"({'|'.join(summaries)})"
+
+    store = SummaryStore(summarize, merge, TokenCounter(), chunk_tokens=2, fan_in=2)
+    tiers = store.extend(SummaryTiers(), ["aaa", "bbb", "ccc"])
+    assert summarized == [["aaa", "bbb"], ["ccc"]]
+    assert tiers.render() == "(aaa+bbb|ccc)"
+
+    tiers = store.extend(tiers, ["ddd"])
+    # Only the new event is summarized; older tiers are left alone.
+    assert summarized[-1] == ["ddd"]
+    assert tiers.render() == "(aaa+bbb|ccc)\n\nddd"
+    tiers = store.extend(tiers, ["eee"])
+    assert tiers.render() == "((aaa+bbb|ccc)|(ddd|eee))"
+    assert len(merged) == 3
+
+
+def test_truncation_only_summarizes_newly_evicted_turns():
+    prompts = []
+
+    def generate(messages, max_tokens=None, **kwargs):
+        prompts.append(messages[0][0].text)
+        return [TextResult(text=f"summary {len(prompts)}")], None
+
+    client = Mock(spec=LLMClient)
+    client.generate.side_effect = generate
+    context_manager = LLMSummarizingContextManager(
+        client=client,
+        token_counter=TokenCounter(),
+        logger=Mock(spec=logging.Logger),
+        max_size=8,
+        soft_watermark=None,
+    )
+    message_lists = [[TextPrompt(text=f"turn {i}")] for i in range(9)]
+    message_lists = context_manager.apply_truncation_if_needed(message_lists)
+    assert message_lists[1] == [TextResult(text="Conversation Summary: summary 1")]
+
+    message_lists = message_lists + [
+        [TextPrompt(text=f"turn {i}")] for i in range(9, 14)
+    ]
+    message_lists = context_manager.apply_truncation_if_needed(message_lists)
+
+    assert len(prompts) == 2
+    assert "turn 1\n" in prompts[0]
+    assert "turn 1\n" not in prompts[1] and "summary 1" not in prompts[1]
+    assert message_lists[1] == [
+        TextResult(text="Conversation Summary: summary 1\n\nsummary 2")
+    ]
@@ -0,0 +1,56 @@
+from boss_agent.llm.anthropic import AnthropicDirectClient
+from boss_agent.llm.base import (
+    TextPrompt,
+    TextResult,
+    ToolCall,
+    ToolFormattedResult,
+    ToolParam,
+)
+
+
+def _cached_positions(request):
+    positions = []
+    for position, message in enumerate(request["messages"]):
+        block = message["content"][-1]
+        cache_control = (
+            block.get("cache_control")
+            if isinstance(block, dict)
+            else getattr(block, "cache_control", None)
+        )
+        if cache_control:
+            positions.append(position)
+    return positions
+
+
+def test_incremental_layout_caches_the_prefix_and_advances_with_the_conversation(
+    monkeypatch,
+):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    client = AnthropicDirectClient(
+        model_name="claude-3-7-sonnet", use_caching=True, cache_layout="incremental"
+    )
+    tools = [
+        ToolParam(name="ls", description="List files", input_schema={"type": "object"})
+    ]
+    messages = [
+        [TextPrompt(text="List the files")],
+        [TextResult(text="Conversation Summary: listed files before")],
+        [TextPrompt(text="Again")],
+        [ToolCall(tool_call_id="1", tool_name="ls", tool_input={})],
+        [ToolFormattedResult(tool_call_id="1", tool_name="ls", tool_output="a.txt")],
+    ]
+
+    request = client._build_request(
+        messages, max_tokens=100, system_prompt="You are helpful.", tools=tools
+    )
+
+    assert request["system"][0]["cache_control"] == {"type": "ephemeral"}
+    # The summary, the previous request's last message and this request's last message.
+    assert _cached_positions(request) == [1, 2, 4]
+
+    recent = AnthropicDirectClient(model_name="claude-3-7-sonnet", use_caching=True)
+    request = recent._build_request(
+        messages, max_tokens=100, system_prompt="You are helpful.", tools=tools
+    )
+    assert request["system"] == "You are helpful."
+    assert _cached_positions(request) == [1, 2, 3, 4]
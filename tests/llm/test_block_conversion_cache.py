@@ -0,0 +1,58 @@
+from unittest.mock import Mock
+
+import pytest
+
+from boss_agent.llm.anthropic import AnthropicDirectClient
+from boss_agent.llm.base import (
+    BlockConversionCache,
+    SessionSummary,
+    TextPrompt,
+    TextResult,
+    ToolCall,
+)
+
+
+def test_blocks_are_converted_once_and_dropped_when_unused():
+    convert_prompt = Mock(side_effect=lambda block: block.text.upper())
+    cache = BlockConversionCache({TextPrompt: convert_prompt})
+    first, second = TextPrompt(text="a"), TextPrompt(text="b")
+
+    cache.new_request()
+    assert [cache.convert(first), cache.convert(second)] == ["A", "B"]
+    cache.new_request()
+    assert cache.convert(first) == "A"
+    # Equal but distinct blocks are converted separately.
+    assert cache.convert(TextPrompt(text="a")) == "A"
+    assert convert_prompt.call_count == 3
+
+    # ``second`` was not used by the last request nor by this one.
+    cache.new_request()
+    cache.new_request()
+    assert len(cache) == 0
+
+    with pytest.raises(ValueError, match="Unknown message type"):
+        cache.convert(SessionSummary(text="x"))
+
+
+def test_anthropic_requests_only_convert_new_turns(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    client = AnthropicDirectClient(model_name="claude-3-7-sonnet", use_caching=True)
+    messages = [
+        [TextPrompt(text="List the files")],
+        [ToolCall(tool_call_id="1", tool_name="ls", tool_input={})],
+        [TextPrompt(text="Thanks")],
+        [TextResult(text="Done")],
+        [TextPrompt(text="Now the tests")],
+        [TextResult(text="Running them")],
+    ]
+    first = client._build_request(messages[:5], max_tokens=100)
+    second = client._build_request(messages, max_tokens=100)
+
+    assert second["messages"][0]["content"][0] is first["messages"][0]["content"][0]
+    # Cache breakpoints go on copies, so they do not pile up on the shared blocks.
+    assert first["messages"][1]["content"][0].cache_control == {"type": "ephemeral"}
+    assert getattr(second["messages"][1]["content"][0], "cache_control", None) is None
+    assert [message["content"][0].text for message in second["messages"][4:]] == [
+        "Now the tests",
+        "Running them",
+    ]
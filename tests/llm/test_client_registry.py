@@ -0,0 +1,52 @@
+import configparser
+
+import pytest
+
+from boss_agent.llm import client_registry
+from boss_agent.llm.anthropic import AnthropicDirectClient
+from boss_agent.llm.client_registry import HttpPoolSettings
+from boss_agent.llm.openai import OpenAIDirectClient
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    registry = client_registry.get_registry()
+    registry.clear()
+    yield registry
+    registry.configure(HttpPoolSettings())
+    registry.clear()
+
+
+def test_sessions_share_sdk_clients_per_credentials(monkeypatch, fresh_registry):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "key-a")
+    first = AnthropicDirectClient(model_name="claude-3-7-sonnet", thinking_tokens=1024)
+    second = AnthropicDirectClient(model_name="claude-sonnet-4", use_caching=False)
+    assert second.client is first.client
+    assert second.async_client is first.async_client
+    # The wrappers keep their own per-session state.
+    assert second._conversions is not first._conversions
+
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "key-b")
+    assert (
+        AnthropicDirectClient(model_name="claude-3-7-sonnet").client is not first.client
+    )
+
+    openai_client = OpenAIDirectClient(model_name="gpt-4.1", azure_model=False)
+    assert (
+        OpenAIDirectClient(model_name="o3", azure_model=False).client
+        is openai_client.client
+    )
+    assert len(fresh_registry) == 3
+    assert all("key-" not in repr(key) for key in fresh_registry._clients)
+
+
+def test_pool_settings_come_from_config(monkeypatch):
+    config = configparser.ConfigParser()
+    config.read_string("[llm]\npool_max_connections = 7\nrequest_timeout = 30\n")
+    settings = client_registry.configure_from_config(config)
+    assert settings == HttpPoolSettings(max_connections=7, timeout=30.0)
+
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "key-a")
+    client = AnthropicDirectClient(model_name="claude-3-7-sonnet")
+    assert client.client.timeout.read == 30.0
+    assert client.client._client._transport._pool._max_connections == 7
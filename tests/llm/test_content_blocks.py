@@ -0,0 +1,90 @@
+import base64
+import dataclasses
+import io
+import sys
+
+import pytest
+from PIL import Image
+
+from boss_agent.llm.base import (
+    BlockConversionCache,
+    ImageBlock,
+    ImageSource,
+    TextPrompt,
+    ToolCall,
+    ToolFormattedResult,
+)
+
+
+def test_images_are_held_as_bytes_and_serialize_as_base64():
+    buffer = io.BytesIO()
+    Image.new("RGB", (750, 100)).save(buffer, "PNG")
+    data = base64.b64encode(buffer.getvalue()).decode()
+    image = ImageBlock(
+        type="image", source={"type": "base64", "media_type": "image/png", "data": data}
+    )
+
+    assert image.source.raw == buffer.getvalue()
+    assert image.source["data"] == data
+    assert image.metadata.tokens == 100
+    assert image.to_dict() == {
+        "type": "image",
+        "source": {"type": "base64", "media_type": "image/png", "data": data},
+    }
+    assert ImageBlock.from_dict(image.to_dict()) == image
+
+    url_image = ImageBlock(
+        type="image", source={"type": "url", "url": "https://example.com/a.png"}
+    )
+    assert url_image.source.raw is None
+    assert dict(url_image.source) == {"type": "url", "url": "https://example.com/a.png"}
+
+
+def test_blocks_are_immutable_slotted_and_intern_tool_names():
+    prompt = TextPrompt(text="hello")
+    assert not hasattr(prompt, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        prompt.text = "changed"  # type: ignore[misc]
+
+    tool_name = "".join(["list", "_files"])
+    call = ToolCall(
+        tool_call_id="call_1", tool_name=tool_name, tool_input={"path": "."}
+    )
+    result = ToolFormattedResult(
+        tool_call_id="call_1", tool_name=tool_name, tool_output="a.txt"
+    )
+    assert call.tool_name is sys.intern("list_files")
+    assert result.tool_name is call.tool_name
+    assert result.to_dict() == {
+        "tool_call_id": "call_1",
+        "tool_name": "list_files",
+        "tool_output": "a.txt",
+    }
+
+
+def test_tool_result_screenshots_are_held_as_bytes_and_encoded_once_per_block():
+    buffer = io.BytesIO()
+    Image.new("RGB", (750, 100)).save(buffer, "PNG")
+    data = base64.b64encode(buffer.getvalue()).decode()
+    output = [
+        {"type": "text", "text": "Screenshot of the page"},
+        {
+            "type": "image",
+            "source": {"type": "base64", "media_type": "image/png", "data": data},
+        },
+    ]
+    result = ToolFormattedResult(
+        tool_call_id="call_1", tool_name="browser_view", tool_output=output
+    )
+
+    source = result.tool_output[1]["source"]
+    assert isinstance(source, ImageSource)
+    assert source.raw == buffer.getvalue()
+    assert result.image_metadata[0].tokens == 100
+    assert result.plain_tool_output() == output
+    assert result.to_dict()["tool_output"] == output
+
+    conversions = BlockConversionCache(
+        {ToolFormattedResult: ToolFormattedResult.plain_tool_output}
+    )
+    assert conversions.convert(result) is conversions.convert(result)
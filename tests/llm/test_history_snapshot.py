@@ -0,0 +1,96 @@
+import logging
+from unittest.mock import Mock
+
+import pandas as pd
+from anthropic.types import ThinkingBlock
+
+from boss_agent.llm.base import (
+    LLMClient,
+    SessionSummary,
+    TextResult,
+    ToolCall,
+    ToolFormattedResult,
+)
+from boss_agent.llm.context_manager.llm_summarizing import LLMSummarizingContextManager
+from boss_agent.llm.context_manager.summary_store import SummaryTiers
+from boss_agent.llm.history_snapshot import HistorySnapshot
+from boss_agent.llm.message_history import MessageHistory
+from boss_agent.llm.token_counter import TokenCounter
+from boss_agent.tools.data_analysis_tool import DataAnalysisTool
+from boss_agent.utils import WorkspaceManager
+
+
+def _context_manager():
+    return LLMSummarizingContextManager(
+        client=Mock(spec=LLMClient),
+        token_counter=TokenCounter(),
+        logger=Mock(spec=logging.Logger),
+    )
+
+
+def test_history_is_written_per_turn_and_restored(tmp_path):
+    snapshot_file = tmp_path / "session.jsonl"
+    context_manager = _context_manager()
+    history = MessageHistory(context_manager)
+    history.snapshot = HistorySnapshot(snapshot_file)
+
+    history.add_user_prompt("Load the sales data")
+    # As a truncation would: the context manager condenses, then the history is replaced.
+    summary_turn = [TextResult(text="Conversation Summary: loaded sales.csv")]
+    context_manager._summary_tiers = SummaryTiers((("loaded sales.csv",),))
+    context_manager._summary_message = summary_turn
+    history.set_message_list(history.get_messages_for_llm() + [summary_turn])
+    history.add_user_prompt("Continue")
+    history.add_assistant_turn(
+        [
+            ThinkingBlock(type="thinking", thinking="Plan", signature="sig"),
+            ToolCall(tool_call_id="1", tool_name="ls", tool_input={"path": "."}),
+        ]
+    )
+    history.add_tool_call_results(
+        [Mock(tool_call_id="1", tool_name="ls")],
+        [[{"type": "text", "text": "sales.csv"}]],
+    )
+    history.add_user_turn([SessionSummary(text="Listed files")])
+    # A write cut short by a crash loses only that record.
+    with snapshot_file.open("a") as snapshot:
+        snapshot.write('{"turn": [{"block": "TextPro')
+
+    restored_context_manager = _context_manager()
+    restored = MessageHistory(restored_context_manager)
+    restored.restore_snapshot(HistorySnapshot(snapshot_file))
+
+    assert restored.get_messages_for_llm() == history.get_messages_for_llm()
+    assert restored.count_tokens() == history.count_tokens()
+    assert restored_context_manager._summary_tiers == SummaryTiers(
+        (("loaded sales.csv",),)
+    )
+    assert (
+        restored_context_manager._summary_message is restored.get_messages_for_llm()[1]
+    )
+    assert isinstance(restored.get_messages_for_llm()[4][0], ToolFormattedResult)
+
+    # Restoring rewrites the snapshot compactly, and the restored history keeps appending.
+    restored.add_user_prompt("Thanks")
+    assert len(snapshot_file.read_text().splitlines()) == 2 + 7
+    assert MessageHistory(None).restore_snapshot(HistorySnapshot(snapshot_file)) == {}
+
+
+def test_dataframes_are_restored_by_reference(tmp_path):
+    (tmp_path / "sales.csv").write_text("region,amount\nnorth,1\nsouth,2\n")
+    workspace_manager = WorkspaceManager(root=tmp_path, session_workspace=tmp_path)
+    tool = DataAnalysisTool(workspace_manager)
+    tool.run_impl({"sub_tool": "load_data", "file_path": "sales.csv"})
+
+    restored = DataAnalysisTool(workspace_manager)
+    restored.restore_session_state(tool.get_session_state())
+    assert len(restored.loaded_dataframes) == 1
+    assert restored.loaded_dataframes._dataframes["df_1"] is None
+    pd.testing.assert_frame_equal(
+        restored.loaded_dataframes["df_1"], tool.loaded_dataframes["df_1"]
+    )
+
+    (tmp_path / "sales.csv").unlink()
+    missing = DataAnalysisTool(workspace_manager)
+    missing.restore_session_state(tool.get_session_state())
+    assert "df_1" not in missing.loaded_dataframes
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import anthropic
+import pytest
+
+from boss_agent.llm import rate_limit
+from boss_agent.llm.anthropic import AnthropicDirectClient
+from boss_agent.llm.base import TextPrompt
+from boss_agent.llm.rate_limit import RateLimiter, RetryPolicy
+
+
+@pytest.fixture(autouse=True)
+def default_limits():
+    rate_limit.configure(RetryPolicy(), {})
+    yield
+    rate_limit.configure(RetryPolicy(), {})
+
+
+def _error(retry_after=None):
+    headers = {} if retry_after is None else {"retry-after": retry_after}
+    return SimpleNamespace(status_code=429, response=SimpleNamespace(headers=headers))
+
+
+def test_backoff_grows_with_jitter_and_honours_retry_after():
+    policy = RetryPolicy(max_attempts=5, base_delay=2, max_delay=10)
+    for attempt, ceiling in [(0, 2), (1, 4), (2, 8), (5, 10)]:
+        assert ceiling / 2 <= policy.delay(attempt, _error()) <= ceiling
+    assert policy.delay(0, _error("7")) == 7
+    assert policy.delay(0, _error("120")) == 10
+    assert policy.delay(0, _error("Wed, 21 Oct 2015 07:28:00 GMT")) == 0
+
+
+def test_limiter_spaces_requests_and_settles_with_actual_usage():
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=600)
+    assert limiter.reserve(600) == 0
+    assert limiter.reserve(60) == pytest.approx(6, abs=0.1)
+    # The requests used fewer tokens than reserved.
+    limiter.settle(600, {"input_tokens": 100, "output_tokens": 20})
+    assert limiter.reserve(60) < 1
+
+    limiter.pause(5)
+    assert limiter.reserve(0) == pytest.approx(5, abs=0.1)
+
+
+def test_throttling_pauses_all_clients_of_the_model(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    rate_limit.configure(
+        RetryPolicy(max_attempts=3), {"anthropic/claude-3-7-sonnet": (60, 0)}
+    )
+    sleeps = []
+    monkeypatch.setattr(rate_limit.cancellation, "sleep", sleeps.append)
+    monkeypatch.setattr("boss_agent.llm.anthropic.cancellation.sleep", sleeps.append)
+
+    client = AnthropicDirectClient(model_name="claude-3-7-sonnet")
+    other_session = AnthropicDirectClient(model_name="claude-3-7-sonnet")
+    assert other_session.throttle.limiter is client.throttle.limiter
+    assert client.throttle.limiter.requests is not None
+
+    throttled = anthropic.RateLimitError(
+        "throttled",
+        response=Mock(status_code=429, headers={"retry-after": "4"}),
+        body=None,
+    )
+    client.client = Mock()
+    client.client.messages.create.side_effect = [throttled, Mock()]
+    client._parse_response = Mock(
+        return_value=([], {"input_tokens": 10, "output_tokens": 5})
+    )
+
+    client.generate([[TextPrompt(text="hi")]], max_tokens=10)
+
+    assert [seconds for seconds in sleeps if seconds > 0] == [pytest.approx(4, abs=0.1)]
+    assert client.client.messages.create.call_count == 2
+    # Another session's next request waits out the rest of the pause.
+    assert other_session.throttle.limiter.reserve(0) == pytest.approx(4, abs=0.5)
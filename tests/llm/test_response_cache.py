@@ -0,0 +1,86 @@
+import json
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from boss_agent.llm import response_cache
+from boss_agent.llm.base import LLMClient, TextPrompt, TextResult, ToolCall
+from boss_agent.llm.response_cache import (
+    CachingLLMClient,
+    ResponseCache,
+    ResponseCacheMiss,
+)
+
+
+def _client():
+    client = Mock(spec=LLMClient)
+    client.model_name = "test-model"
+    client.generate.return_value = (
+        [
+            TextResult(text="{}"),
+            ToolCall(tool_call_id="1", tool_name="ls", tool_input={"path": "."}),
+        ],
+        {"input_tokens": 12, "output_tokens": 3, "raw_response": object()},
+    )
+    return client
+
+
+def test_temperature_zero_calls_are_answered_from_disk_and_replayed_offline(tmp_path):
+    client = _client()
+    cached = CachingLLMClient(client, ResponseCache(tmp_path / "cache.sqlite3"))
+    messages = [[TextPrompt(text="Extract the totals")]]
+
+    first = cached.generate(messages, max_tokens=100)
+    second = cached.generate([[TextPrompt(text="Extract the totals")]], max_tokens=100)
+    assert client.generate.call_count == 1
+    assert second[0] == first[0]
+    assert second[1] == {"input_tokens": 12, "output_tokens": 3, "cached": True}
+
+    # Different limits, or a sampled call, go to the model.
+    cached.generate(messages, max_tokens=200)
+    cached.generate(messages, max_tokens=100, temperature=0.7)
+    cached.generate(messages, max_tokens=100, temperature=0.7)
+    assert client.generate.call_count == 4
+
+    offline = Mock(spec=LLMClient)
+    offline.model_name = "test-model"
+    replay = CachingLLMClient(
+        offline, ResponseCache(tmp_path / "cache.sqlite3"), replay=True
+    )
+    events = list(replay.generate_stream(messages, max_tokens=100))
+    assert events[-1].content == first[0]
+    with pytest.raises(ResponseCacheMiss):
+        replay.generate([[TextPrompt(text="Something new")]], max_tokens=100)
+    offline.generate.assert_not_called()
+
+
+def test_entries_expire_and_least_recently_used_are_evicted(tmp_path):
+    entry = {"content": [], "metadata": {"note": "x" * 20}}
+    max_bytes = 3 * len(json.dumps(entry))
+    cache = ResponseCache(
+        tmp_path / "cache.sqlite3", ttl_seconds=60, max_bytes=max_bytes
+    )
+    for key in ("a", "b", "c"):
+        cache.put(key, entry)
+        time.sleep(0.01)
+    assert cache.get("a") is not None
+    cache.put("d", entry)
+    assert [key for key in "abcd" if cache.get(key) is not None] == ["a", "c", "d"]
+    assert cache.total_bytes <= max_bytes
+
+    cache.ttl_seconds = 0
+    assert cache.get("a") is None
+    assert len(cache) == 2
+
+
+def test_wrap_is_a_no_op_unless_configured(tmp_path):
+    client = _client()
+    assert response_cache.wrap(client) is client
+    response_cache.configure(ResponseCache(tmp_path / "cache.sqlite3"))
+    try:
+        wrapped = response_cache.wrap(client)
+        assert isinstance(wrapped, CachingLLMClient)
+        assert response_cache.wrap(wrapped) is wrapped
+    finally:
+        response_cache.configure(None)
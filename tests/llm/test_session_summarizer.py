@@ -0,0 +1,71 @@
+import logging
+import threading
+import time
+from unittest.mock import Mock
+
+from boss_agent.llm.base import LLMClient, TextResult
+from boss_agent.llm.session_summarizer import SessionSummarizer
+
+
+def wait_for_summaries(summarizer: SessionSummarizer, count: int, timeout: float = 2.0):
+    summaries: list[str] = []
+    deadline = time.monotonic() + timeout
+    while len(summaries) < count and time.monotonic() < deadline:
+        summaries.extend(summarizer.drain())
+        time.sleep(0.01)
+    return summaries
+
+
+def test_summaries_are_generated_in_background_and_coalesced():
+    release = threading.Event()
+    prompts: list[str] = []
+
+    def slow_generate(messages, max_tokens=None, **kwargs):
+        prompts.append(messages[0][0].text)
+        release.wait(timeout=2)
+        return [TextResult(text=f"summary {len(prompts)}")], {}
+
+    client = Mock(spec=LLMClient)
+    client.generate.side_effect = slow_generate
+    summarizer = SessionSummarizer(client=client, logger=Mock(spec=logging.Logger))
+
+    # submit() must not wait for the model call.
+    start = time.monotonic()
+    summarizer.submit("read_file", "first result")
+    time.sleep(0.05)
+    summarizer.submit("list_files", "second result")
+    summarizer.submit("content_search", "third result")
+    assert time.monotonic() - start < 0.5
+
+    release.set()
+    summaries = wait_for_summaries(summarizer, 2)
+
+    assert summaries == [
+        "Summary of last action: summary 1",
+        "Summary of last action: summary 2",
+    ]
+    # The two results queued while the first call was in flight share one request.
+    assert len(prompts) == 2
+    assert "list_files" in prompts[1] and "content_search" in prompts[1]
+    summarizer.close()
+
+
+def test_reset_drops_in_flight_summary():
+    release = threading.Event()
+
+    def slow_generate(messages, max_tokens=None, **kwargs):
+        release.wait(timeout=2)
+        return [TextResult(text="stale")], {}
+
+    client = Mock(spec=LLMClient)
+    client.generate.side_effect = slow_generate
+    summarizer = SessionSummarizer(client=client, logger=Mock(spec=logging.Logger))
+
+    summarizer.submit("read_file", "result")
+    time.sleep(0.05)
+    summarizer.reset()
+    release.set()
+    time.sleep(0.1)
+
+    assert summarizer.drain() == []
+    summarizer.close()
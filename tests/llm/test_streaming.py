@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from boss_agent.llm.base import ToolCall, ToolParam, TextPrompt, TextResult
+from boss_agent.llm.openai import OpenAIDirectClient
+
+
+def make_chunk(content=None, tool_calls=None, usage=None):
+    choices = []
+    if content is not None or tool_calls is not None:
+        choices = [
+            SimpleNamespace(
+                delta=SimpleNamespace(content=content, tool_calls=tool_calls)
+            )
+        ]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+def make_tool_call_delta(index, id=None, name=None, arguments=None):
+    return SimpleNamespace(
+        index=index, id=id, function=SimpleNamespace(name=name, arguments=arguments)
+    )
+
+
+def test_openai_stream_yields_deltas_and_assembles_final_message():
+    client = OpenAIDirectClient(model_name="test-model", cot_model=False)
+    chunks = [
+        make_chunk(content="Let me "),
+        make_chunk(content="check."),
+        make_chunk(
+            tool_calls=[
+                make_tool_call_delta(0, id="call_1", name="read_file", arguments='{"pa')
+            ]
+        ),
+        make_chunk(tool_calls=[make_tool_call_delta(0, arguments='th": "a.txt"}')]),
+        make_chunk(
+            tool_calls=[
+                make_tool_call_delta(1, id="call_2", name="list_files", arguments="{}")
+            ]
+        ),
+        make_chunk(usage=SimpleNamespace(prompt_tokens=12, completion_tokens=7)),
+    ]
+    client.client = Mock()
+    client.client.chat.completions.create.return_value = iter(chunks)
+
+    tools = [
+        ToolParam(name="read_file", description="", input_schema={"type": "object"}),
+        ToolParam(name="list_files", description="", input_schema={"type": "object"}),
+    ]
+    events = list(
+        client.generate_stream(
+            messages=[[TextPrompt(text="hi")]], max_tokens=100, tools=tools
+        )
+    )
+
+    assert [e.text for e in events if e.type == "text_delta"] == ["Let me ", "check."]
+    # Each call is announced once, in model order, before the final message.
+    tool_call_events = [
+        e.tool_call.tool_call_id for e in events if e.type == "tool_call"
+    ]
+    assert tool_call_events == ["call_1", "call_2"]
+    final = events[-1]
+    assert final.type == "message"
+    assert final.content == [
+        TextResult(text="Let me check."),
+        ToolCall(
+            tool_call_id="call_1", tool_name="read_file", tool_input={"path": "a.txt"}
+        ),
+        ToolCall(tool_call_id="call_2", tool_name="list_files", tool_input={}),
+    ]
+    assert final.metadata["input_tokens"] == 12
+    assert final.metadata["output_tokens"] == 7
+    assert client.client.chat.completions.create.call_args.kwargs["stream"] is True
@@ -0,0 +1,111 @@
+import base64
+import json
+import io
+import logging
+from unittest.mock import Mock, patch
+
+from PIL import Image
+
+from boss_agent.llm.base import (
+    ImageBlock,
+    LLMClient,
+    TextPrompt,
+    ToolFormattedResult,
+    ToolParam,
+)
+from boss_agent.llm.context_manager.llm_summarizing import LLMSummarizingContextManager
+from boss_agent.llm.token_counter import ImageMetadata, TokenCounter
+
+
+def test_correction_factor_converges_to_reported_usage():
+    counter = TokenCounter(smoothing=0.5)
+    assert counter.calibrate(1000, "model-a") == 1000
+
+    first_error = counter.record_usage(
+        "model-a", estimated_tokens=1000, actual_tokens=2000
+    )
+    assert first_error == -0.5
+    for _ in range(5):
+        error = counter.record_usage(
+            "model-a", estimated_tokens=1000, actual_tokens=2000
+        )
+
+    assert counter.correction_factor("model-a") == 2.0
+    assert error == 0.0
+    assert counter.estimate_error("model-a") < 0.05
+    # Other models keep their own factor.
+    assert counter.correction_factor("model-b") == 1.0
+    assert (
+        counter.record_usage("model-a", estimated_tokens=1000, actual_tokens=0) is None
+    )
+
+
+def test_summarizing_budget_includes_overhead_and_calibration():
+    context_manager = LLMSummarizingContextManager(
+        client=Mock(spec=LLMClient),
+        token_counter=TokenCounter(),
+        logger=Mock(spec=logging.Logger),
+        token_budget=1000,
+        max_size=100,
+    )
+    message_lists = [[TextPrompt(text="x" * 1500)]]  # ~500 raw tokens
+    assert not context_manager.should_truncate(message_lists)
+
+    tools = [
+        ToolParam(name="search", description="d" * 900, input_schema={"type": "object"})
+    ]
+    context_manager.set_request_overhead("s" * 300, tools)
+    schema_tokens = len(json.dumps([tools[0].to_dict()])) // 3
+    assert context_manager.estimate_request_tokens(500) == 500 + 100 + schema_tokens
+
+    context_manager.set_request_overhead("", [])
+    error = context_manager.record_usage(
+        "model-a",
+        500,
+        {
+            "input_tokens": 200,
+            "cache_read_input_tokens": 900,
+            "cache_creation_input_tokens": -1,
+        },
+    )
+    assert round(error, 3) == round((500 - 1100) / 1100, 3)
+    assert context_manager.estimate_request_tokens(500) == 1100
+    assert context_manager.should_truncate(message_lists)
+
+
+def _png_source(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height)).save(buffer, "PNG")
+    return {
+        "type": "base64",
+        "media_type": "image/png",
+        "data": base64.b64encode(buffer.getvalue()).decode(),
+    }
+
+
+def test_images_are_measured_once_when_created():
+    source = _png_source(750, 200)
+    screenshot = ToolFormattedResult(
+        tool_call_id="1",
+        tool_name="browser_view",
+        tool_output=[
+            {"type": "image", "source": source},
+            {"type": "text", "text": "Page loaded"},
+        ],
+    )
+    attachment = ImageBlock(type="image", source=_png_source(1500, 100))
+    assert screenshot.image_metadata[0].width == 750
+    assert screenshot.image_metadata[0].tokens == 200
+    assert "image_metadata" not in screenshot.to_dict()
+
+    context_manager = LLMSummarizingContextManager(
+        client=Mock(spec=LLMClient),
+        token_counter=TokenCounter(),
+        logger=Mock(spec=logging.Logger),
+    )
+    with patch.object(ImageMetadata, "from_source") as measure:
+        tokens = context_manager.count_tokens(
+            [[attachment, TextPrompt(text="")], [screenshot]]
+        )
+        assert measure.call_count == 0
+    assert tokens == 200 + 200 + len("Page loaded") // 3
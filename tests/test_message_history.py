@@ -1,3 +1,6 @@
+import logging
+from unittest.mock import patch
+
 import pytest
 from boss_agent.llm.base import (
     TextPrompt,
@@ -5,7 +8,9 @@ from boss_agent.llm.base import (
     ToolCall,
     ToolFormattedResult,
 )
+from boss_agent.llm.context_manager.llm_summarizing import LLMSummarizingContextManager
 from boss_agent.llm.message_history import MessageHistory
+from boss_agent.llm.token_counter import TokenCounter
 
 
 @pytest.fixture
@@ -103,3 +108,84 @@ class TestToolCallIntegrity:
             [TextResult(text="Done")],
         ]
         assert result == expected
+
+
+class TestMultipleToolCalls:
+    def test_add_assistant_turn_keeps_all_tool_calls(self, message_history):
+        """Test that every tool call of an assistant turn is kept and reported as pending."""
+        message_history.add_user_prompt("Read both files")
+        message_history.add_assistant_turn(
+            [
+                TextResult(text="Reading both files"),
+                ToolCall(tool_call_id="1", tool_name="read_file", tool_input={"path": "a.txt"}),
+                ToolCall(tool_call_id="2", tool_name="read_file", tool_input={"path": "b.txt"}),
+            ]
+        )
+
+        pending = message_history.get_pending_tool_calls()
+        assert [call.tool_call_id for call in pending] == ["1", "2"]
+
+        message_history.add_tool_call_results(pending, ["content a", "content b"])
+        last_turn = message_history.get_messages_for_llm()[-1]
+        assert [block.tool_call_id for block in last_turn] == ["1", "2"]
+        assert [block.tool_output for block in last_turn] == ["content a", "content b"]
+
+
+class TestTokenTally:
+    def test_running_count_matches_a_full_recount_without_remeasuring(self):
+        context_manager = LLMSummarizingContextManager(
+            client=None, token_counter=TokenCounter(), logger=logging.getLogger("test")
+        )
+        history = MessageHistory(context_manager)
+        history.add_user_prompt("Read the report " * 10)
+        for i in range(20):
+            call = ToolCall(tool_call_id=str(i), tool_name="read_file", tool_input={"path": f"{i}.txt"})
+            history.add_assistant_turn([TextResult(text="Reading"), call])
+            history.add_tool_call_results(history.get_pending_tool_calls(), ["x" * 3000])
+
+        def full_count():
+            return context_manager.count_tokens(history.get_messages_for_llm())
+
+        assert history.count_tokens() == full_count()
+
+        with patch.object(context_manager, "count_turn_tokens", wraps=context_manager.count_turn_tokens) as measure:
+            history.count_tokens()
+            history.truncate()
+            assert measure.call_count == 0
+
+        # Dropping an unmatched tool call only re-measures the filtered message list.
+        history.add_assistant_turn([TextResult(text="Next"), ToolCall(tool_call_id="x", tool_name="ls", tool_input={})])
+        history.set_message_list(history.get_messages_for_llm())
+        assert history.count_tokens() == full_count()
+
+        history.add_user_prompt("Follow-up")
+        history.add_assistant_turn([TextResult(text="Sure")])
+        history.clear_from_last_to_user_message()
+        assert history.count_tokens() == full_count()
+
+
+class TestToolPairing:
+    def test_truncate_skips_the_integrity_pass_while_pairing_holds(self):
+        context_manager = LLMSummarizingContextManager(
+            client=None, token_counter=TokenCounter(), logger=logging.getLogger("test")
+        )
+        history = MessageHistory(context_manager)
+        history.add_user_prompt("List the files")
+        history.add_assistant_turn([ToolCall(tool_call_id="1", tool_name="ls", tool_input={})])
+        assert not history.tool_calls_paired()
+        history.add_tool_call_results(history.get_pending_tool_calls(), ["a.txt"])
+        assert history.tool_calls_paired()
+
+        with patch.object(
+            MessageHistory, "_ensure_tool_call_integrity", wraps=MessageHistory._ensure_tool_call_integrity
+        ) as integrity_pass:
+            history.truncate()
+            assert integrity_pass.call_count == 0
+
+            # An interrupted turn leaves a call without a result: the full pass drops it.
+            history.add_assistant_turn([TextResult(text="Next"), ToolCall(tool_call_id="2", tool_name="ls", tool_input={})])
+            history.truncate()
+            assert integrity_pass.call_count == 1
+
+        assert history.tool_calls_paired()
+        assert history.get_messages_for_llm()[-1] == [TextResult(text="Next")]
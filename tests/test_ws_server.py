@@ -0,0 +1,71 @@
+import argparse
+import configparser
+from pathlib import Path
+from unittest.mock import Mock
+
+from boss_agent.llm.base import LLMClient
+
+# ws_server.py and utils.py live at the repository root, next to tests/.
+REPOSITORY_ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_resumed_session_keeps_writing_to_its_own_workspace(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(REPOSITORY_ROOT))
+    import ws_server
+    from utils import (
+        create_workspace_manager_for_connection,
+        create_workspace_manager_for_session,
+    )
+
+    # The session database is opened in the working directory.
+    monkeypatch.chdir(tmp_path)
+    knowledge_base = tmp_path / "knowledge_base"
+    knowledge_base.mkdir()
+    monkeypatch.setattr(
+        ws_server,
+        "global_args",
+        argparse.Namespace(
+            logs_path=None,
+            minimize_stdout_logs=True,
+            docker_container_id=None,
+            needs_permission=False,
+            use_container_workspace=None,
+        ),
+    )
+    config = configparser.ConfigParser()
+    config.read_dict(
+        {
+            "agent": {
+                "snapshot_dir": str(tmp_path / "snapshots"),
+                "session_summary": "false",
+            }
+        }
+    )
+    websocket = Mock()
+    websocket.query_params = {}
+
+    workspace_manager, session_uuid = create_workspace_manager_for_connection(
+        str(knowledge_base)
+    )
+    ws_server.create_agent_for_connection(
+        Mock(spec=LLMClient), session_uuid, workspace_manager, websocket, {}, config
+    )
+
+    existing_session = ws_server.find_existing_session(
+        str(session_uuid), str(knowledge_base)
+    )
+    assert existing_session == (session_uuid, workspace_manager.session_workspace)
+    resumed_workspace = create_workspace_manager_for_session(
+        str(knowledge_base), existing_session[1]
+    )
+    agent = ws_server.create_agent_for_connection(
+        Mock(spec=LLMClient), session_uuid, resumed_workspace, websocket, {}, config
+    )
+
+    sessions_dir = tmp_path / "sessions"
+    assert agent.workspace_manager.root == knowledge_base
+    assert agent.workspace_manager.session_workspace.is_relative_to(sessions_dir)
+    assert agent.workspace_manager.workspace_path(
+        "notes.md", for_write=True
+    ).is_relative_to(sessions_dir)
+    assert agent.tool_manager.output_store.directory.is_relative_to(sessions_dir)
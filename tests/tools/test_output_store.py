@@ -0,0 +1,60 @@
+import logging
+
+from boss_agent.llm.message_history import MessageHistory, ToolCallParameters
+from boss_agent.tools.list_files_tool import ListFilesTool
+from boss_agent.tools.output_store import TOOL_OUTPUT_DIR, ToolOutputBlobStore
+from boss_agent.tools.read_file_tool import ReadFileTool
+from boss_agent.tools.tool_manager import AgentToolManager
+from boss_agent.utils import WorkspaceManager
+
+
+def test_large_outputs_are_replaced_by_a_preview_and_read_back_by_handle(tmp_path):
+    session = tmp_path / "session"
+    session.mkdir()
+    report = "".join(f"line {i}\n" for i in range(5000))
+    (tmp_path / "report.txt").write_text(report)
+    workspace_manager = WorkspaceManager(root=tmp_path, session_workspace=session)
+    store = ToolOutputBlobStore(
+        session / TOOL_OUTPUT_DIR, threshold_chars=1000, preview_chars=100
+    )
+    manager = AgentToolManager(
+        tools=[ReadFileTool(workspace_manager), ListFilesTool(workspace_manager)],
+        logger_for_agent_logs=logging.getLogger("test_output_store"),
+        output_store=store,
+    )
+    history = MessageHistory(context_manager=None)
+
+    preview = manager.run_tool(
+        ToolCallParameters(
+            tool_call_id="1", tool_name="read_file", tool_input={"path": "report.txt"}
+        ),
+        history,
+    )
+    assert preview.startswith(report[:100])
+    assert len(preview) < 1000
+    handle = preview.split("handle '")[1].split("'")[0]
+
+    chunk = manager.run_tool(
+        ToolCallParameters(
+            tool_call_id="2",
+            tool_name="read_tool_output",
+            tool_input={"handle": handle, "offset": 100, "length": 50},
+        ),
+        history,
+    )
+    assert chunk.startswith(report[100:150])
+    assert "Continue with offset 150" in chunk
+    assert "No stored output" in manager.run_tool(
+        ToolCallParameters(
+            tool_call_id="3",
+            tool_name="read_tool_output",
+            tool_input={"handle": "../x"},
+        ),
+        history,
+    )
+
+    listing = manager.run_tool(
+        ToolCallParameters(tool_call_id="4", tool_name="list_files", tool_input={}),
+        history,
+    )
+    assert TOOL_OUTPUT_DIR not in listing
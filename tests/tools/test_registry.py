@@ -0,0 +1,81 @@
+import logging
+from typing import Any, Optional
+
+import jsonschema
+import pytest
+
+from boss_agent.llm.message_history import MessageHistory
+from boss_agent.tools.base import LLMTool, ToolImplOutput
+from boss_agent.tools.registry import ToolRegistry
+from boss_agent.tools.tool_manager import AgentToolManager
+
+
+class EchoTool(LLMTool):
+    input_schema = {
+        "type": "object",
+        "properties": {"value": {"type": "string"}},
+        "required": ["value"],
+    }
+
+    def __init__(self, name: str):
+        self.name = name
+        self.description = f"Echo ({name})"
+
+    def run_impl(
+        self,
+        tool_input: dict[str, Any],
+        message_history: Optional[MessageHistory] = None,
+    ) -> ToolImplOutput:
+        return ToolImplOutput(tool_input["value"], "echoed")
+
+
+def test_registry_looks_up_tools_and_rejects_duplicates():
+    first, second = EchoTool("first"), EchoTool("second")
+    registry = ToolRegistry([first, second])
+
+    assert registry.get("second") is second
+    assert [param.name for param in registry.tool_params] == ["first", "second"]
+    with pytest.raises(ValueError, match="not found"):
+        registry.get("missing")
+    with pytest.raises(ValueError, match="Tool first is duplicated"):
+        ToolRegistry([first, EchoTool("first")])
+
+
+def test_tool_manager_rebuilds_registry_only_when_tool_set_changes():
+    manager = AgentToolManager(
+        tools=[EchoTool("first")],
+        logger_for_agent_logs=logging.getLogger("test_registry"),
+    )
+    # The manager's own list; changing it in place drops the registry.
+    tools = manager.tools
+
+    registry = manager.get_registry()
+    assert manager.get_registry() is registry
+    assert manager.get_tool_params() is registry.tool_params
+
+    tools.append(EchoTool("second"))
+    rebuilt = manager.get_registry()
+    assert rebuilt is not registry
+    assert manager.get_tool("second") is tools[1]
+    assert manager.get_registry() is rebuilt
+
+    manager.tools = [EchoTool("third")]
+    assert manager.get_tool("third").name == "third"
+
+    # get_tool alone notices an in-place change too.
+    manager.tools.append(EchoTool("fourth"))
+    assert manager.get_tool("fourth") is manager.tools[1]
+
+
+def test_validator_is_compiled_once_and_follows_schema_changes():
+    tool = EchoTool("echo")
+    validator = tool.get_validator()
+    assert tool.get_validator() is validator
+
+    assert tool.run({"value": "hi"}) == "hi"
+    assert tool.run({}).startswith("Invalid tool input: 'value' is a required property")
+
+    tool.input_schema = {"type": "object", "properties": {"value": {"type": "integer"}}}
+    assert tool.get_validator() is not validator
+    with pytest.raises(jsonschema.ValidationError):
+        tool._validate_tool_input({"value": "not a number"})
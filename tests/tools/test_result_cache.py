@@ -0,0 +1,58 @@
+import logging
+import os
+from unittest.mock import patch
+
+from boss_agent.llm.message_history import MessageHistory, ToolCallParameters
+from boss_agent.tools.read_file_tool import ReadFileTool
+from boss_agent.tools.result_cache import ToolResultCache, fingerprint_paths
+from boss_agent.tools.tool_manager import AgentToolManager
+from boss_agent.utils import WorkspaceManager
+
+
+def test_read_file_is_served_from_cache_until_the_file_changes(tmp_path):
+    notes = tmp_path / "notes.txt"
+    notes.write_text("first version")
+    tool = ReadFileTool(WorkspaceManager(root=tmp_path))
+    manager = AgentToolManager(
+        tools=[tool], logger_for_agent_logs=logging.getLogger("test_result_cache")
+    )
+    history = MessageHistory(context_manager=None)
+    call = ToolCallParameters(
+        tool_call_id="1", tool_name="read_file", tool_input={"path": "notes.txt"}
+    )
+
+    with patch.object(ReadFileTool, "run_impl", wraps=tool.run_impl) as run_impl:
+        assert manager.run_tool(call, history) == "first version"
+        assert manager.run_tool(call, history) == "first version"
+        assert run_impl.call_count == 1
+
+        notes.write_text("second, longer version")
+        os.utime(notes, ns=(1, 1))
+        assert manager.run_tool(call, history) == "second, longer version"
+        assert run_impl.call_count == 2
+
+
+def test_cache_evicts_least_recently_used_entries_by_size():
+    cache = ToolResultCache(max_bytes=10)
+    first = ToolResultCache.make_key("read_file", {"path": "a"})
+    second = ToolResultCache.make_key("read_file", {"path": "b"})
+    third = ToolResultCache.make_key("read_file", {"path": "c"})
+
+    cache.put(first, "fp", "aaaa")
+    cache.put(second, "fp", "bbbb")
+    assert cache.get(first, "fp") == "aaaa"
+    cache.put(third, "fp", "cccc")
+
+    assert cache.get(second, "fp") is None
+    assert cache.get(first, "fp") == "aaaa"
+    assert cache.total_bytes == 8
+    # A different fingerprint means the files changed: miss and drop the entry.
+    assert cache.get(first, "other") is None
+    assert len(cache) == 1
+
+
+def test_fingerprint_covers_files_added_to_a_directory(tmp_path):
+    (tmp_path / "sub").mkdir()
+    before = fingerprint_paths([str(tmp_path)])
+    (tmp_path / "sub" / "new.txt").write_text("x")
+    assert fingerprint_paths([str(tmp_path)]) != before
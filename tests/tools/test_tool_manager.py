@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Optional
+
+from boss_agent.llm.message_history import MessageHistory, ToolCallParameters
+from boss_agent.tools.base import LLMTool, ToolImplOutput
+from boss_agent.tools.tool_manager import AgentToolManager
+
+
+class SleepyTool(LLMTool):
+    """Records which calls overlap in time."""
+
+    input_schema = {
+        "type": "object",
+        "properties": {"value": {"type": "string"}},
+        "required": ["value"],
+    }
+
+    def __init__(self, name: str, parallel_safe: bool, tracker: dict):
+        self.name = name
+        self.description = name
+        self.parallel_safe = parallel_safe
+        self.tracker = tracker
+
+    def run_impl(
+        self,
+        tool_input: dict[str, Any],
+        message_history: Optional[MessageHistory] = None,
+    ) -> ToolImplOutput:
+        with self.tracker["lock"]:
+            self.tracker["running"] += 1
+            self.tracker["max_running"] = max(
+                self.tracker["max_running"], self.tracker["running"]
+            )
+        time.sleep(0.05)
+        with self.tracker["lock"]:
+            self.tracker["running"] -= 1
+        return ToolImplOutput(f"{self.name}:{tool_input['value']}", "done")
+
+
+def make_manager(tracker: dict) -> AgentToolManager:
+    tools = [
+        SleepyTool("reader", parallel_safe=True, tracker=tracker),
+        SleepyTool("writer", parallel_safe=False, tracker=tracker),
+    ]
+    return AgentToolManager(
+        tools=tools, logger_for_agent_logs=logging.getLogger("test_tool_manager")
+    )
+
+
+def make_tracker() -> dict:
+    return {"lock": threading.Lock(), "running": 0, "max_running": 0}
+
+
+def test_run_tools_runs_parallel_safe_calls_concurrently_in_order():
+    tracker = make_tracker()
+    manager = make_manager(tracker)
+    calls = [
+        ToolCallParameters(
+            tool_call_id=str(i), tool_name="reader", tool_input={"value": str(i)}
+        )
+        for i in range(3)
+    ]
+
+    results = manager.run_tools(calls, MessageHistory(context_manager=None))
+
+    assert results == ["reader:0", "reader:1", "reader:2"]
+    assert tracker["max_running"] > 1
+
+
+def test_run_tools_serializes_unsafe_calls():
+    tracker = make_tracker()
+    manager = make_manager(tracker)
+    calls = [
+        ToolCallParameters(
+            tool_call_id="1", tool_name="reader", tool_input={"value": "a"}
+        ),
+        ToolCallParameters(
+            tool_call_id="2", tool_name="writer", tool_input={"value": "b"}
+        ),
+        ToolCallParameters(
+            tool_call_id="3", tool_name="writer", tool_input={"value": "c"}
+        ),
+    ]
+
+    results = manager.run_tools(calls, MessageHistory(context_manager=None))
+
+    assert results == ["reader:a", "writer:b", "writer:c"]
+    assert tracker["max_running"] == 1
+
+
+def test_run_tools_awaits_calls_started_early_instead_of_rerunning_them():
+    tracker = make_tracker()
+    manager = make_manager(tracker)
+    history = MessageHistory(context_manager=None)
+    calls = [
+        ToolCallParameters(
+            tool_call_id="1", tool_name="reader", tool_input={"value": "a"}
+        ),
+        ToolCallParameters(
+            tool_call_id="2", tool_name="reader", tool_input={"value": "b"}
+        ),
+    ]
+    assert manager.can_dispatch_early("reader")
+    assert not manager.can_dispatch_early("writer")
+
+    started = {"1": manager.submit_tool(calls[0], history)}
+    results = manager.run_tools(calls, history, started=started)
+
+    assert results == ["reader:a", "reader:b"]
+    assert started["1"].done()
+
+
+def test_arun_tools_gathers_parallel_safe_calls_and_keeps_barriers():
+    tracker = make_tracker()
+    manager = make_manager(tracker)
+    history = MessageHistory(context_manager=None)
+    calls = [
+        ToolCallParameters(
+            tool_call_id="1", tool_name="reader", tool_input={"value": "a"}
+        ),
+        ToolCallParameters(
+            tool_call_id="2", tool_name="reader", tool_input={"value": "b"}
+        ),
+        ToolCallParameters(
+            tool_call_id="3", tool_name="writer", tool_input={"value": "c"}
+        ),
+    ]
+
+    async def run():
+        started = {"1": manager.start_tool(calls[0], history)}
+        return await manager.arun_tools(calls, history, started=started)
+
+    results = asyncio.run(run())
+
+    assert results == ["reader:a", "reader:b", "writer:c"]
+    assert tracker["max_running"] == 2
@@ -116,13 +116,21 @@ def create_workspace_manager_for_connection(
     connection_workspace = sessions_path / connection_id
     connection_workspace.mkdir(parents=True, exist_ok=True)
 
+    workspace_manager = create_workspace_manager_for_session(
+        workspace_root, connection_workspace, use_container_workspace
+    )
+    return workspace_manager, session_uuid
+
+
+def create_workspace_manager_for_session(
+    workspace_root: str, session_workspace: Path, use_container_workspace: Optional[str] = None
+) -> WorkspaceManager:
+    """Create a workspace manager for an existing session workspace."""
     # Initialize workspace manager with the knowledge base as the root,
     # but with a specific session workspace for writes.
     container_workspace_path = Path(use_container_workspace) if use_container_workspace else None
-    workspace_manager = WorkspaceManager(
-        root=knowledge_base_path,
-        session_workspace=connection_workspace,
+    return WorkspaceManager(
+        root=Path(workspace_root).resolve(),
+        session_workspace=Path(session_workspace),
         container_workspace=container_workspace_path,
     )
-
-    return workspace_manager, session_uuid
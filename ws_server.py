@@ -17,6 +17,9 @@ from pathlib import Path
 from typing import Dict, List, Set, Any, Optional
 from dotenv import load_dotenv
 
+from boss_agent.core import tracing
+from boss_agent.llm.history_snapshot import HistorySnapshot, snapshot_path
+
 load_dotenv()
 
 import uvicorn
@@ -28,18 +31,17 @@ from fastapi import (
 )
 
 from fastapi.middleware.cors import CORSMiddleware
-import anyio
 from sqlalchemy import asc, text
 
 from boss_agent.core.event import RealtimeEvent, EventType
 from boss_agent.db.models import Event
-from boss_agent.utils.constants import DEFAULT_MODEL, TOKEN_BUDGET
-from utils import parse_common_args, create_workspace_manager_for_connection
+from boss_agent.utils.constants import DEFAULT_MODEL, SESSION_SNAPSHOT_DIR, TOKEN_BUDGET, TURN_TIMEOUT_SECONDS
+from utils import parse_common_args, create_workspace_manager_for_connection, create_workspace_manager_for_session
 from boss_agent.agents.anthropic_fc import AnthropicFC
 from boss_agent.agents.base import BaseAgent
 from boss_agent.llm.base import LLMClient
 from boss_agent.utils import WorkspaceManager
-from boss_agent.llm import get_client
+from boss_agent.llm import client_registry, get_client, rate_limit, response_cache
 from boss_agent.utils.prompt_generator import enhance_user_prompt
 
 from fastapi.staticfiles import StaticFiles
@@ -69,17 +71,26 @@ active_agents: Dict[WebSocket, BaseAgent] = {}
 active_tasks: Dict[WebSocket, asyncio.Task[None]] = {}
 message_processors: Dict[WebSocket, asyncio.Task[None]] = {}
 global_args: Optional[argparse.Namespace] = None
+# Shared so the per-model token estimate calibration carries over between sessions.
+token_counter = TokenCounter()
 
 
-def map_model_name_to_client(model_name: str, ws_content: Dict[str, Any]) -> LLMClient:
+def map_model_name_to_client(
+    model_name: str,
+    ws_content: Dict[str, Any],
+    config: Optional[configparser.ConfigParser] = None,
+) -> LLMClient:
     assert global_args is not None
     if "claude" in model_name:
         tool_args = ws_content.get("tool_args", {})
         thinking_tokens = tool_args.get("thinking_tokens", False)
+        use_caching = config is not None and config.getboolean('llm', 'prompt_caching', fallback=False)
+        cache_layout = config.get('llm', 'cache_layout', fallback='incremental') if config is not None else 'recent'
         return get_client(
             "anthropic-direct",
             model_name=model_name,
-            use_caching=False,
+            use_caching=use_caching,
+            cache_layout=cache_layout,
             project_id=global_args.project_id,
             region=global_args.region,
             thinking_tokens=thinking_tokens,
@@ -140,8 +151,16 @@ async def websocket_endpoint(websocket: WebSocket):
                 if msg_type == "init_agent":
                     if session_initialized:
                         continue
+                    # Reopening an earlier session resumes it in its own workspace.
+                    existing_session = find_existing_session(content.get("session_id"), knowledge_base_path)
+                    if existing_session is not None:
+                        remove_empty_workspace(workspace_manager.session_workspace)
+                        session_uuid, session_workspace = existing_session
+                        workspace_manager = create_workspace_manager_for_session(
+                            knowledge_base_path, session_workspace, global_args.use_container_workspace
+                        )
                     model_name = content.get("model_name", DEFAULT_MODEL)
-                    client = map_model_name_to_client(model_name, content)
+                    client = map_model_name_to_client(model_name, content, config)
                     tool_args = content.get("tool_args", {})
                     agent = create_agent_for_connection(
                         client, session_uuid, workspace_manager, websocket, tool_args, config
@@ -154,7 +173,11 @@ async def websocket_endpoint(websocket: WebSocket):
                     await websocket.send_json(
                         RealtimeEvent(
                             type=EventType.AGENT_INITIALIZED,
-                            content={"message": "Agent initialized"},
+                            content={
+                                "message": "Agent initialized",
+                                "session_id": str(session_uuid),
+                                "restored_turns": len(agent.history) if isinstance(agent, AnthropicFC) else 0,
+                            },
                         ).model_dump()
                     )
 
@@ -190,7 +213,7 @@ async def websocket_endpoint(websocket: WebSocket):
                     text_to_enhance = content.get("text", "")
                     files_to_enhance = content.get("files", [])
                     model_name = content.get("model_name", DEFAULT_MODEL)
-                    client = map_model_name_to_client(model_name, content)
+                    client = map_model_name_to_client(model_name, content, config)
                     _, _, enhanced_prompt = await enhance_user_prompt(client, text_to_enhance, files_to_enhance)
                     await websocket.send_json(
                         RealtimeEvent(
@@ -252,9 +275,9 @@ async def run_agent_async(
         agent.message_queue.put_nowait(
             RealtimeEvent(type=EventType.USER_MESSAGE, content={"text": user_input})
         )
-        await anyio.to_thread.run_sync(
-            agent.run_agent, user_input, files, resume, tool_choice, abandon_on_cancel=True
-        )
+        # The agent loop is async end to end, so concurrent sessions share this
+        # event loop instead of each holding a worker thread for the whole query.
+        await agent.arun_agent(user_input, files, resume, tool_choice)
     except Exception as e:
         logger.error(f"Error running agent: {str(e)}")
         import traceback
@@ -277,6 +300,10 @@ def cleanup_connection(websocket: WebSocket):
         agent = active_agents[websocket]
         if isinstance(agent, AnthropicFC):
             agent.websocket = None
+            # Stop model calls and tools still running on behalf of the closed connection.
+            agent.cancel()
+            if agent.session_summarizer is not None:
+                agent.session_summarizer.close()
         if websocket in message_processors:
             del message_processors[websocket]
     if websocket in active_tasks and not active_tasks[websocket].done():
@@ -286,6 +313,37 @@ def cleanup_connection(websocket: WebSocket):
         del active_agents[websocket]
 
 
+def find_existing_session(
+    session_id: Optional[str], knowledge_base_path: str
+) -> Optional[tuple[uuid.UUID, Path]]:
+    """The ID and session workspace of the earlier session ``session_id`` names, if it exists.
+
+    Sessions recorded with the knowledge base itself as their workspace (as older
+    versions did) are not resumed, so that their writes never land in the shared
+    knowledge base.
+    """
+    if not session_id:
+        return None
+    try:
+        session_uuid = uuid.UUID(session_id)
+    except ValueError:
+        return None
+    workspace_dir = DatabaseManager().get_session_workspace(session_uuid)
+    if workspace_dir is None or not Path(workspace_dir).is_dir():
+        return None
+    if Path(workspace_dir).resolve() == Path(knowledge_base_path).resolve():
+        return None
+    return session_uuid, Path(workspace_dir)
+
+
+def remove_empty_workspace(workspace: Path):
+    """Remove the workspace created for a connection that resumes another session."""
+    try:
+        workspace.rmdir()
+    except OSError:
+        pass
+
+
 def create_agent_for_connection(
     client: LLMClient,
     session_id: uuid.UUID,
@@ -310,18 +368,18 @@ def create_agent_for_connection(
     db_manager.create_session(
         device_id=device_id,
         session_uuid=session_id,
-        workspace_path=workspace_manager.root,
+        workspace_path=workspace_manager.session_workspace,
     )
     logger_for_agent_logs.info(
-        f"Created new session {session_id} with workspace at {workspace_manager.root}"
+        f"Created new session {session_id} with workspace at {workspace_manager.session_workspace}"
     )
 
-    token_counter = TokenCounter()
     context_manager = LLMSummarizingContextManager(
-        client=client,
+        client=response_cache.wrap(client),
         token_counter=token_counter,
         logger=logger_for_agent_logs,
         token_budget=TOKEN_BUDGET,
+        prune_tool_outputs=config.getboolean('agent', 'prune_tool_outputs', fallback=True),
     )
 
     queue: asyncio.Queue[RealtimeEvent] = asyncio.Queue()
@@ -344,6 +402,17 @@ def create_agent_for_connection(
     
     max_turns = config.getint('agent', 'max_turns', fallback=200)
     max_output_tokens = config.getint('agent', 'max_output_tokens_per_turn', fallback=32000)
+    session_summary = config.getboolean('agent', 'session_summary', fallback=True)
+    session_summary_model = config.get('agent', 'session_summary_model', fallback='').strip()
+    turn_timeout_seconds = config.getfloat('agent', 'turn_timeout_seconds', fallback=TURN_TIMEOUT_SECONDS)
+    session_summary_client = (
+        map_model_name_to_client(session_summary_model, {}, config)
+        if session_summary and session_summary_model
+        else None
+    )
+
+    snapshot_dir = config.get('agent', 'snapshot_dir', fallback=SESSION_SNAPSHOT_DIR).strip()
+    snapshot = HistorySnapshot(snapshot_path(snapshot_dir, session_id)) if snapshot_dir else None
 
     agent = AnthropicFC(
         system_prompt=SYSTEM_PROMPT_WITH_SEQ_THINKING if tool_args.get("sequential_thinking", False) else SYSTEM_PROMPT,
@@ -357,6 +426,10 @@ def create_agent_for_connection(
         max_turns=max_turns,
         websocket=websocket,
         session_id=session_id,
+        session_summary=session_summary,
+        session_summary_client=session_summary_client,
+        turn_timeout_seconds=turn_timeout_seconds,
+        snapshot=snapshot,
     )
     agent.session_id = session_id
     return agent
@@ -386,6 +459,14 @@ def main():
     parser.add_argument("--port", type=int, default=8000, help="Port to run the server on")
     args = parser.parse_args()
     global_args = args
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    if tracing.configure_from_config(config):
+        logger.info("Writing trace spans to the configured trace file")
+    client_registry.configure_from_config(config)
+    rate_limit.configure_from_config(config)
+    if response_cache.configure_from_config(config):
+        logger.info("Caching temperature-0 auxiliary LLM calls on disk")
     setup_workspace(app, args.workspace)
     logger.info(f"Starting WebSocket server on {args.host}:{args.port}")
     uvicorn.run(app, host=args.host, port=args.port)